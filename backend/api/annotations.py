@@ -1,105 +1,132 @@
-from fastapi import APIRouter, HTTPException, Depends, Depends, Depends, Depends
-from typing import List, Optional
-from pydantic import BaseModel
+"""
+API Router de anotaciones
+Lectura común de las anotaciones de los visores PDF y DOCX
+(colección document_annotations, modelo models.annotation.DocumentAnnotation)
+y canal WebSocket para editarlas en tiempo real
+"""
+from fastapi import APIRouter, HTTPException, Query, WebSocket, WebSocketDisconnect
+from typing import Optional
 from bson import ObjectId
+import json
 
-from config.database import Database, DatabaseConfig
-from utils.security import get_current_user
-from utils.security import get_current_userfrom utils.security import get_current_user
-
-from utils.security import get_current_user
+from models.annotation import ANNOTATION_SOURCES
+from utils.annotation_store import annotation_store
+from utils.annotation_sync import annotation_channel
 
 router = APIRouter(prefix="/api/v1/annotations", tags=["annotations"])
 
-class AnnotationCreate(BaseModel):
-    project_id: str
-    page: int
-    annotation_data: dict
-    type: str = "correction"
-    comment: Optional[str] = None
-
-class AnnotationResponse(BaseModel):
-    _id: str
-    project_id: str
-    page: int
-    annotation_data: dict
-    type: str
-    comment: Optional[str]
-    created_by: str
-    created_at: str
-otatinCreae],
-    urrent_ser)
+@router.get("/project/{project_id}")
+async def get_project_annotations(
+    project_id: str,
+    version: Optional[int] = Query(None, ge=1, description="Versión (por defecto la actual)"),
+    source: Optional[str] = Query(None, description="pdf, docx o legacy (por defecto todas)")
 ):
+    """Obtener las anotaciones de una versión de un proyecto con una sola consulta indexada"""
+    if not ObjectId.is_valid(project_id):
+        raise HTTPException(status_code=400, detail="ID de proyecto inválido")
+    if source is not None and source not in ANNOTATION_SOURCES:
+        raise HTTPException(status_code=400, detail=f"source debe ser uno de: {', '.join(ANNOTATION_SOURCES)}")
 
-@router.post("/save", respoationCreate],
-    nse_model=dict)urrent_ser)
-):
+    try:
+        version = version or await annotation_store.current_version(project_id)
+        annotations = await annotation_store.find(project_id, version, source)
+        revision = await annotation_store.revision(project_id)
 
-async def save_annotations(ationCreate],
-    rrent_user)
-):
+        for annotation in annotations:
+            annotation["_id"] = str(annotation["_id"])
+            annotation["project_id"] = str(annotation["project_id"])
 
-    annotations: List[AnnotationCreate],
-    current_user: dict = Depends(get_current_user)
-):
-    """Guardar múltiples anotaciones para un proyecto"""
-    annotations_collection = Database.get_collection("annotations")
-    
-    saved_annotations = []
-    
-    for annotation in annotations:
-        annotation_doc = {
-            "project_id": ObjectId(annotation.project_id),
-            "page": annotation.page,
-            "annotation_data": annotation.annotation_data,
-            "type": annotation.type,
-            "comment": annotation.comment,
-            "created_by": ObjectId(current_user["_id"]),
-            "created_at": Database.get_current_time()
+        return {
+            "success": True,
+            "project_id": project_id,
+            "version": version,
+            "revision": revision,
+            "annotations": annotations,
+            "count": len(annotations)
         }
-        result = await annotations_collection.insert_one(annotation_doc)
-        saved_annotations.append(str(result.inserted_id))
-    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error obteniendo anotaciones: {str(e)}")
+
+@router.delete("/{project_id}/{annotation_id}")
+async def delete_annotation(project_id: str, annotation_id: str):
+    """Eliminar una anotación (queda marcada como borrada y sube la revisión del proyecto)"""
+    if not ObjectId.is_valid(project_id):
+        raise HTTPException(status_code=400, detail="ID de proyecto inválido")
+
+    deleted = await annotation_store.delete({"project_id": ObjectId(project_id), "id": annotation_id})
+    if deleted is None:
+        raise HTTPException(status_code=404, detail="Anotación no encontrada")
+
+    await annotation_channel.publish(project_id, deleted["revision"])
+
     return {
         "success": True,
-        "message": "Anotaciones guardadas exitosamente",
-        "annotation_ids": saved_annotations
+        "message": "Anotación eliminada exitosamente",
+        "revision": deleted["revision"]
     }
 
-@router.get("/project/{project_id}", response_model=List[AnnotationResponse])
-async def get_project_annotations(
-    project_id: str,
-    current_user: dict = Depends(get_current_user)
-):
-    """Obtener todas las anotaciones de un proyecto"""
-    annotations_collection = Database.get_collection("annotations")
-    
-    annotations = await annotations_collection.find({
-        "project_id": ObjectId(project_id)
-    }).to_list(length=None)
-    
-    result = []
-    for annotation in annotations:
-        annotation["_id"] = str(annotation["_id"])
-        annotation["project_id"] = str(annotation["project_id"])
-        annotation["created_by"] = str(annotation["created_by"])
-        result.append(annotation)
-    
-    return result
-
-@router.delete("/{annotation_id
-async def delete_annotation(annotation_id: str):
-    """Eliminar una anotación"""
-   a
-    # Check if annotation exists and user has permission
-    annotation = await annotations_collection.find_one({
-        "_id": ObjectId(annotation_id),
-        "created_by": ObjectId(current_user["_id"])
-    })
-    
-    if not annotation:
-        raise HTTPException(status_code=404, detail="Anotación no encontrada o sin permisos")
-    
-    await annotations_collection.delete_one({"_id": ObjectId(annotation_id)})
-    
-    return {"success": True, "message": "Anotación eliminada exitosamente"}
+@router.websocket("/ws/{project_id}")
+async def annotation_channel_endpoint(websocket: WebSocket, project_id: str, since: Optional[int] = None):
+    """
+    Canal de anotaciones de un proyecto
+
+    Mensajes del cliente:
+    - "ping" -> {"type": "pong"}
+    - {"type": "sync", "since": N} -> {"type": "sync", "seq", "ops"} con los
+      cambios posteriores a la secuencia N (también al conectar con ?since=N)
+    - {"type": "ops", "client_id", "ops": [{"op": "add" | "update" | "delete",
+      "source", "version", "annotation" | "id"}]} -> se guardan y se difunden
+      a todos los conectados como {"type": "ops", "seq", "origin", "ops"}
+    """
+    if not ObjectId.is_valid(project_id):
+        await websocket.close(code=1008)
+        return
+
+    await annotation_channel.connections.connect(websocket, project_id)
+    current_version = None
+    try:
+        if since is not None:
+            await websocket.send_json(await annotation_channel.catch_up(project_id, since))
+
+        while True:
+            data = await websocket.receive_text()
+            if data == "ping":
+                await websocket.send_json({"type": "pong"})
+                continue
+
+            try:
+                message = json.loads(data)
+            except json.JSONDecodeError:
+                continue
+            if not isinstance(message, dict):
+                continue
+
+            if message.get("type") == "sync":
+                await websocket.send_json(
+                    await annotation_channel.catch_up(project_id, int(message.get("since") or 0))
+                )
+
+            elif message.get("type") == "ops":
+                operations = message.get("ops") or []
+                try:
+                    # Sin versión, las operaciones van a la versión actual del proyecto
+                    if any(not operation.get("version") for operation in operations):
+                        if current_version is None:
+                            current_version = await annotation_store.current_version(project_id)
+                        for operation in operations:
+                            operation["version"] = operation.get("version") or current_version
+                    revision = await annotation_store.apply(project_id, operations)
+                except (ValueError, TypeError, AttributeError) as e:
+                    await websocket.send_json({
+                        "type": "error",
+                        "client_id": message.get("client_id"),
+                        "detail": str(e)
+                    })
+                    continue
+                await annotation_channel.publish(project_id, revision, origin=message.get("client_id"))
+
+    except WebSocketDisconnect:
+        annotation_channel.connections.disconnect(websocket, project_id)
+    except Exception as e:
+        print(f"Error en el canal de anotaciones del proyecto {project_id}: {e}")
+        annotation_channel.connections.disconnect(websocket, project_id)
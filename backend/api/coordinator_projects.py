@@ -8,12 +8,16 @@ Endpoints para gestión de proyectos aprobados por profesores
 
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from typing import List, Optional
 from datetime import datetime
 from bson import ObjectId
+from pymongo import ReturnDocument
 
 from config.database import Database, DatabaseConfig
+from utils.keyword_index import keyword_index, normalize_keyword
+from utils.project_counters import project_counters
+from utils.trending import trending_projects
 
 router = APIRouter(prefix="/api/v1/coordinator", tags=["coordinator-projects"])
 
@@ -85,16 +89,20 @@ async def get_approved_projects():
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
 @router.get("/published")
-async def get_published_projects():
+async def get_published_projects(
+    keyword: Optional[str] = Query(None, description="Filtrar por palabra clave")
+):
     """Obtener proyectos publicados en biblioteca digital"""
     try:
         db = Database.get_database()
         projects_collection = db.get_collection(DatabaseConfig.PROJECTS_COLLECTION)
         
         # Buscar proyectos con estado "published"
-        published_projects = await projects_collection.find({
-            "metadata.status": "published"
-        }).sort("published_at", -1).to_list(length=100)
+        filter_query = {"metadata.status": "published"}
+        if keyword:
+            filter_query["academic_info.keywords_normalized"] = normalize_keyword(keyword)
+        
+        published_projects = await projects_collection.find(filter_query).sort("published_at", -1).to_list(length=100)
         
         # Formatear proyectos para la biblioteca digital
         formatted_projects = []
@@ -130,21 +138,31 @@ async def get_published_projects():
             
             # Obtener el file_id del proyecto (primera versión, primer archivo)
             file_id = None
+            thumbnail_url = None
             if project.get("versions") and len(project["versions"]) > 0:
                 first_version = project["versions"][0]
                 if first_version.get("files") and len(first_version["files"]) > 0:
                     file_id = first_version["files"][0].get("file_id")
+                    thumbnail_url = first_version["files"][0].get("thumbnail_url")
+            
+            # Popularidad: valores guardados más los incrementos aún no volcados
+            metadata = project.get("metadata", {})
+            pending_counts = project_counters.pending(str(project["_id"]))
             
             formatted_project = {
                 "id": str(project["_id"]),
                 "title": project.get("title", "Sin título"),
                 "description": project.get("description", "Sin descripción disponible"),
                 "methodology": project.get("academic_info", {}).get("methodology", "No especificada"),
+                "keywords": project.get("academic_info", {}).get("keywords", []),
                 "file_id": file_id,  # Agregar file_id para descarga
+                "thumbnail_url": thumbnail_url,
                 "studentName": student.get("name", "Estudiante desconocido") if student else "Estudiante desconocido",
                 "teacherName": teacher.get("name", "Profesor desconocido") if teacher else "Profesor desconocido",
                 "career": student.get("university_data", {}).get("career", "No especificada") if student else "No especificada",
                 "publishedDate": project.get("published_at", datetime.utcnow()).strftime("%d/%m/%Y"),
+                "views": metadata.get("view_count", 0) + pending_counts.get("view_count", 0),
+                "downloads": metadata.get("download_count", 0) + pending_counts.get("download_count", 0),
                 "evaluation": {
                     "grade": evaluation_data.get("grade", 0),
                     "comments": len(evaluation_data.get("annotations", []))
@@ -183,9 +201,10 @@ async def unpublish_project(project_id: str):
         if project.get("metadata", {}).get("status") != "published":
             raise HTTPException(status_code=400, detail="El proyecto no está publicado")
         
-        # Cambiar el estado de "published" a "aprobado"
+        # Cambiar el estado de "published" a "aprobado" (solo si sigue publicado,
+        # para no descontar dos veces sus palabras clave)
         result = await projects_collection.update_one(
-            {"_id": project_object_id},
+            {"_id": project_object_id, "metadata.status": "published"},
             {
                 "$set": {
                     "metadata.status": "aprobado",
@@ -197,6 +216,10 @@ async def unpublish_project(project_id: str):
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="Proyecto no encontrado")
         
+        # Sacarlo del ranking de tendencias y de las sugerencias de palabras clave
+        trending_projects.discard(project_id)
+        keyword_index.remove(project.get("academic_info", {}).get("keywords", []))
+        
         return {
             "success": True,
             "message": "Proyecto eliminado de la biblioteca pública exitosamente"
@@ -215,12 +238,18 @@ async def reject_project(project_id: str):
         projects_collection = db.get_collection(DatabaseConfig.PROJECTS_COLLECTION)
         
         # Cambiar estado a "reprobado"
-        result = await projects_collection.update_one(
+        previous = await projects_collection.find_one_and_update(
             {"_id": ObjectId(project_id)},
-            {"$set": {"metadata.status": "reprobado", "updated_at": datetime.utcnow()}}
+            {"$set": {"metadata.status": "reprobado", "updated_at": datetime.utcnow()}},
+            projection={"metadata.status": 1, "academic_info.keywords": 1},
+            return_document=ReturnDocument.BEFORE
         )
         
-        if result.modified_count > 0:
+        if previous:
+            # Si estaba publicado, sale de la biblioteca como al retirarlo
+            if previous.get("metadata", {}).get("status") == "published":
+                trending_projects.discard(project_id)
+                keyword_index.remove(previous.get("academic_info", {}).get("keywords", []))
             return {
                 "success": True,
                 "message": "Proyecto rechazado exitosamente"
@@ -239,12 +268,17 @@ async def publish_project(project_id: str):
         projects_collection = db.get_collection(DatabaseConfig.PROJECTS_COLLECTION)
         
         # Cambiar estado a "published"
-        result = await projects_collection.update_one(
+        previous = await projects_collection.find_one_and_update(
             {"_id": ObjectId(project_id)},
-            {"$set": {"metadata.status": "published", "published_at": datetime.utcnow()}}
+            {"$set": {"metadata.status": "published", "published_at": datetime.utcnow()}},
+            projection={"metadata.status": 1, "academic_info.keywords": 1},
+            return_document=ReturnDocument.BEFORE
         )
         
-        if result.modified_count > 0:
+        if previous:
+            # Sus palabras clave pasan a sugerirse (una sola vez si ya estaba publicado)
+            if previous.get("metadata", {}).get("status") != "published":
+                keyword_index.add(previous.get("academic_info", {}).get("keywords", []))
             return {
                 "success": True,
                 "message": "Proyecto publicado en biblioteca digital exitosamente"
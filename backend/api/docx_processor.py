@@ -2,15 +2,22 @@
 API Router para procesamiento de archivos DOCX
 Extrae contenido, convierte a HTML y maneja anotaciones
 """
-from fastapi import APIRouter, HTTPException, UploadFile, File, Body
-from typing import List, Dict, Any, Optional
+from fastapi import APIRouter, HTTPException, UploadFile, File, Body, Query
+from fastapi.responses import FileResponse
+from typing import List, Dict, Any, Optional, Tuple
 from pydantic import BaseModel
 from bson import ObjectId
 from datetime import datetime
 import io
-import base64
+import re
 
 from config.database import Database, DatabaseConfig
+from utils.annotation_store import RevisionConflict, annotation_store
+from utils.annotation_sync import annotation_channel
+from utils.docx_cache import DOCX_IMAGES_DIR, parsed_docx_cache
+from utils.file_storage import FileStorage
+from utils.path_index import path_index
+from utils.pdf_export import annotated_pdf_exports
 
 router = APIRouter(prefix="/api/v1/docx", tags=["docx-processing"])
 
@@ -31,10 +38,9 @@ class TableData(BaseModel):
 class ImageData(BaseModel):
     """Modelo de imagen extraída"""
     id: str
-    data: str  # Base64
-    width: int
-    height: int
-    position: Dict[str, int]
+    url: str  # /api/v1/docx/images/{sha256}.{ext}
+    content_type: str
+    size: int
 
 class DocxContent(BaseModel):
     """Modelo de contenido extraído del DOCX"""
@@ -42,6 +48,7 @@ class DocxContent(BaseModel):
     paragraphs: List[Dict[str, Any]]
     tables: List[Dict[str, Any]]
     images: List[Dict[str, Any]]
+    outline: List[Dict[str, Any]] = []  # Títulos (tabla de contenido)
     metadata: Dict[str, Any]
 
 class Annotation(BaseModel):
@@ -60,6 +67,8 @@ class SaveAnnotationsRequest(BaseModel):
     """Modelo para guardar anotaciones"""
     project_id: str
     annotations: List[Annotation]
+    revision: Optional[int] = None  # Revisión sobre la que se editó (control de concurrencia)
+    version: Optional[int] = None  # Versión anotada (por defecto la actual del proyecto)
 
 class ExportRequest(BaseModel):
     """Modelo para exportar documento con correcciones"""
@@ -67,304 +76,94 @@ class ExportRequest(BaseModel):
     export_format: str  # 'docx' o 'pdf'
     apply_corrections: bool = False
 
+# Máximo de bloques por petición en /blocks
+MAX_BLOCKS_PER_REQUEST = 200
+
+async def load_project_docx(project_id: str) -> Tuple[dict, dict]:
+    """
+    Obtener el proyecto y el contenido parseado (desde caché si existe) de
+    su archivo DOCX
+
+    Returns:
+        (proyecto, contenido parseado)
+    """
+    # Obtener el proyecto de la base de datos
+    projects_collection = Database.get_collection("projects")
+    project = await projects_collection.find_one({"_id": ObjectId(project_id)})
+    
+    if not project:
+        raise HTTPException(status_code=404, detail="Proyecto no encontrado")
+    
+    # Obtener información del archivo desde la primera versión
+    versions = project.get("versions", [])
+    if not versions:
+        raise HTTPException(status_code=404, detail="El proyecto no tiene versiones")
+    
+    files = versions[0].get("files", [])
+    if not files:
+        raise HTTPException(status_code=404, detail="No hay archivos en la primera versión del proyecto")
+    
+    file_info = files[0]
+    file_path = file_info.get("file_path")
+    file_id = file_info.get("file_id")
+    
+    print(f"DEBUG - Project ID: {project_id}")
+    print(f"DEBUG - File info: {file_info}")
+    print(f"DEBUG - File path: {file_path}")
+    print(f"DEBUG - File ID: {file_id}")
+    
+    if not file_path and not file_id:
+        raise HTTPException(status_code=404, detail="Ni file_path ni file_id encontrados en el proyecto")
+    
+    # Construir ruta completa al archivo
+    from pathlib import Path
+    base_path = Path(__file__).parent.parent / "uploads"
+    
+    # Intentar con file_path primero, luego con file_id
+    if file_path:
+        full_path = base_path / file_path
+    elif file_id:
+        # Buscar el archivo por file_id en el directorio uploads
+        full_path = base_path / file_id
+    
+    print(f"DEBUG - Base path: {base_path}")
+    print(f"DEBUG - Full path: {full_path}")
+    print(f"DEBUG - File exists: {full_path.exists()}")
+    
+    if not full_path.exists():
+        # Ruta desactualizada: buscar el archivo por nombre en el índice
+        found_path = await path_index.find(file_path, file_id)
+        if found_path is None:
+            raise HTTPException(
+                status_code=404, 
+                detail=f"Archivo no encontrado. Buscado en: {base_path}, file_path: {file_path}, file_id: {file_id}"
+            )
+        full_path = found_path
+        print(f"DEBUG - Found file at: {full_path}")
+    
+    # Parsear (o recuperar de caché) el documento
+    parsed = await parsed_docx_cache.get(full_path)
+    return project, parsed
+
 @router.post("/parse/{project_id}", response_model=DocxContent)
 async def parse_docx(project_id: str):
     """
     Parsea el archivo DOCX del proyecto y extrae su contenido estructurado
+
+    El resultado se guarda en caché por contenido del archivo: abrir de nuevo
+    el mismo documento no lo vuelve a parsear.
     """
     try:
-        # Importar aquí para evitar errores si no están instaladas
-        try:
-            from docx import Document
-        except ImportError:
-            raise HTTPException(
-                status_code=500,
-                detail="python-docx no está instalado. Ejecuta: pip install python-docx"
-            )
-        
-        try:
-            import mammoth
-        except ImportError:
-            raise HTTPException(
-                status_code=500,
-                detail="mammoth no está instalado. Ejecuta: pip install mammoth"
-            )
-        
-        # Obtener el proyecto de la base de datos
-        projects_collection = Database.get_collection("projects")
-        project = await projects_collection.find_one({"_id": ObjectId(project_id)})
-        
-        if not project:
-            raise HTTPException(status_code=404, detail="Proyecto no encontrado")
-        
-        # Obtener información del archivo desde la primera versión
-        versions = project.get("versions", [])
-        if not versions:
-            raise HTTPException(status_code=404, detail="El proyecto no tiene versiones")
-        
-        files = versions[0].get("files", [])
-        if not files:
-            raise HTTPException(status_code=404, detail="No hay archivos en la primera versión del proyecto")
-        
-        file_info = files[0]
-        file_path = file_info.get("file_path")
-        file_id = file_info.get("file_id")
-        
-        print(f"DEBUG - Project ID: {project_id}")
-        print(f"DEBUG - File info: {file_info}")
-        print(f"DEBUG - File path: {file_path}")
-        print(f"DEBUG - File ID: {file_id}")
-        
-        if not file_path and not file_id:
-            raise HTTPException(status_code=404, detail="Ni file_path ni file_id encontrados en el proyecto")
-        
-        # Construir ruta completa al archivo
-        from pathlib import Path
-        base_path = Path(__file__).parent.parent / "uploads"
-        
-        # Intentar con file_path primero, luego con file_id
-        if file_path:
-            full_path = base_path / file_path
-        elif file_id:
-            # Buscar el archivo por file_id en el directorio uploads
-            full_path = base_path / file_id
-        
-        print(f"DEBUG - Base path: {base_path}")
-        print(f"DEBUG - Full path: {full_path}")
-        print(f"DEBUG - File exists: {full_path.exists()}")
-        
-        if not full_path.exists():
-            # Intentar buscar el archivo en subdirectorios
-            import os
-            found_files = []
-            for root, dirs, files_in_dir in os.walk(base_path):
-                for file in files_in_dir:
-                    if file_id and file == file_id:
-                        full_path = Path(root) / file
-                        print(f"DEBUG - Found file at: {full_path}")
-                        break
-                    elif file_path and file_path in str(Path(root) / file):
-                        full_path = Path(root) / file
-                        print(f"DEBUG - Found file at: {full_path}")
-                        break
-            
-            if not full_path.exists():
-                raise HTTPException(
-                    status_code=404, 
-                    detail=f"Archivo no encontrado. Buscado en: {base_path}, file_path: {file_path}, file_id: {file_id}"
-                )
-        
-        # Leer el documento con python-docx
-        document = Document(str(full_path))
-        
-        # Extraer párrafos
-        paragraphs = []
-        for idx, para in enumerate(document.paragraphs):
-            if para.text.strip():  # Solo párrafos con contenido
-                para_data = {
-                    "id": f"p{idx}",
-                    "text": para.text,
-                    "style": para.style.name if para.style else "Normal",
-                    "runs": [
-                        {
-                            "text": run.text,
-                            "bold": run.bold,
-                            "italic": run.italic,
-                            "underline": run.underline
-                        }
-                        for run in para.runs
-                    ],
-                    "position": {"page": 1, "index": idx}  # Simplificado
-                }
-                paragraphs.append(para_data)
-        
-        # Extraer tablas
-        tables = []
-        for idx, table in enumerate(document.tables):
-            rows = []
-            for row in table.rows:
-                cells = [cell.text for cell in row.cells]
-                rows.append(cells)
-            
-            tables.append({
-                "id": f"t{idx}",
-                "rows": rows,
-                "position": {"page": 1, "index": idx}
-            })
-        
-        # Extraer información de formato detallada con python-docx
-        paragraph_styles = []
-        for idx, para in enumerate(document.paragraphs):
-            style_info = {
-                'index': idx,
-                'alignment': str(para.alignment) if para.alignment else 'LEFT',
-                'left_indent': para.paragraph_format.left_indent.pt if para.paragraph_format.left_indent else 0,
-                'right_indent': para.paragraph_format.right_indent.pt if para.paragraph_format.right_indent else 0,
-                'first_line_indent': para.paragraph_format.first_line_indent.pt if para.paragraph_format.first_line_indent else 0,
-                'space_before': para.paragraph_format.space_before.pt if para.paragraph_format.space_before else 0,
-                'space_after': para.paragraph_format.space_after.pt if para.paragraph_format.space_after else 0,
-                'line_spacing': para.paragraph_format.line_spacing if para.paragraph_format.line_spacing else 1.15
-            }
-            paragraph_styles.append(style_info)
-        
-        # Convertir a HTML con mammoth con opciones de estilo mejoradas
-        with open(str(full_path), 'rb') as docx_file:
-            # Configurar opciones de conversión para preservar más estilos
-            style_map = """
-                p[style-name='Heading 1'] => h1.heading-1:fresh
-                p[style-name='Heading 2'] => h2.heading-2:fresh
-                p[style-name='Heading 3'] => h3.heading-3:fresh
-                p[style-name='Title'] => h1.doc-title:fresh
-                p[style-name='Subtitle'] => h2.doc-subtitle:fresh
-                p[style-name='Intense Quote'] => blockquote.intense-quote:fresh
-                p[style-name='Normal'] => p.normal:fresh
-                r[style-name='Strong'] => strong
-                r[style-name='Emphasis'] => em
-            """
-            
-            # Función para convertir imágenes a base64
-            def convert_image_to_base64(image):
-                with image.open() as image_bytes:
-                    encoded = base64.b64encode(image_bytes.read()).decode('ascii')
-                    return {
-                        "src": f"data:{image.content_type};base64,{encoded}"
-                    }
-            
-            result = mammoth.convert_to_html(
-                docx_file,
-                style_map=style_map,
-                include_default_style_map=True,
-                convert_image=mammoth.images.img_element(convert_image_to_base64)
-            )
-            html_content = result.value
-            
-            # Aplicar estilos de formato extraídos de python-docx
-            for idx, style_info in enumerate(paragraph_styles):
-                # Mapear alineación
-                alignment_map = {
-                    'WdParagraphAlignment.CENTER': 'center',
-                    'WdParagraphAlignment.RIGHT': 'right',
-                    'WdParagraphAlignment.JUSTIFY': 'justify',
-                    'WdParagraphAlignment.LEFT': 'left',
-                    '3': 'center',  # CENTER
-                    '2': 'right',   # RIGHT
-                    '3': 'justify', # JUSTIFY
-                    '0': 'left',    # LEFT
-                    'CENTER': 'center',
-                    'RIGHT': 'right',
-                    'JUSTIFY': 'justify',
-                    'LEFT': 'left'
-                }
-                
-                alignment = alignment_map.get(style_info['alignment'], 'left')
-                
-                # Crear estilo inline para cada párrafo
-                para_style = f"text-align: {alignment}; "
-                para_style += f"margin-left: {style_info['left_indent']}pt; "
-                para_style += f"margin-right: {style_info['right_indent']}pt; "
-                para_style += f"text-indent: {style_info['first_line_indent']}pt; "
-                para_style += f"margin-top: {style_info['space_before']}pt; "
-                para_style += f"margin-bottom: {style_info['space_after']}pt; "
-                
-                if isinstance(style_info['line_spacing'], (int, float)):
-                    para_style += f"line-height: {style_info['line_spacing']}; "
-            
-            # Agregar estilos CSS completos
-            css_styles = """
-                <style>
-                    body { 
-                        font-family: 'Calibri', 'Arial', sans-serif; 
-                        font-size: 11pt;
-                        margin: 0;
-                        padding: 0;
-                    }
-                    h1, h2, h3 { 
-                        font-weight: bold; 
-                        margin-top: 12pt; 
-                        margin-bottom: 6pt; 
-                    }
-                    h1.heading-1 { font-size: 16pt; color: #2e74b5; }
-                    h2.heading-2 { font-size: 13pt; color: #2e74b5; }
-                    h3.heading-3 { font-size: 12pt; color: #1f4d78; }
-                    h1.doc-title { 
-                        font-size: 26pt; 
-                        text-align: center; 
-                        font-weight: bold; 
-                        margin-bottom: 12pt;
-                    }
-                    h2.doc-subtitle { 
-                        font-size: 15pt; 
-                        text-align: center; 
-                        color: #595959;
-                        margin-bottom: 12pt;
-                    }
-                    p { 
-                        margin-top: 0pt; 
-                        margin-bottom: 8pt; 
-                        line-height: 1.15;
-                    }
-                    p.normal { 
-                        font-size: 11pt;
-                        margin-bottom: 8pt;
-                    }
-                    strong, b { font-weight: bold; }
-                    em, i { font-style: italic; }
-                    u { text-decoration: underline; }
-                    blockquote.intense-quote { 
-                        margin-left: 36pt; 
-                        margin-right: 36pt;
-                        font-style: italic; 
-                        border-left: 3px solid #2e74b5;
-                        padding-left: 12pt;
-                    }
-                    table {
-                        border-collapse: collapse;
-                        width: 100%;
-                        margin: 12pt 0;
-                    }
-                    td, th {
-                        border: 1px solid #d0d0d0;
-                        padding: 6pt;
-                    }
-                    /* Selección de texto para comentarios */
-                    .text-selected {
-                        background-color: #fff4cc;
-                        border-bottom: 2px solid #ffeb3b;
-                    }
-                    .text-commented {
-                        background-color: #fff9e6;
-                        cursor: pointer;
-                    }
-                    .text-commented:hover {
-                        background-color: #fff4cc;
-                    }
-                    /* Estilos para imágenes */
-                    img {
-                        max-width: 100%;
-                        height: auto;
-                        display: block;
-                        margin: 12pt auto;
-                    }
-                </style>
-            """
-            html_content = css_styles + html_content
-        
-        # Agregar IDs a los párrafos en el HTML
-        html_with_ids = html_content
-        for idx, para in enumerate(paragraphs):
-            # Buscar y reemplazar párrafos con IDs
-            if para["text"] in html_with_ids:
-                html_with_ids = html_with_ids.replace(
-                    f"<p>{para['text']}</p>",
-                    f"<p id='{para['id']}' data-para-id='{para['id']}'>{para['text']}</p>",
-                    1
-                )
-        
+        project, parsed = await load_project_docx(project_id)
+        paragraphs = parsed["paragraphs"]
+        tables = parsed["tables"]
+
         return {
-            "html": html_with_ids,
+            "html": parsed["html"],
             "paragraphs": paragraphs,
             "tables": tables,
-            "images": [],  # Por ahora sin imágenes
+            "images": parsed["images"],
+            "outline": parsed["outline"],
             "metadata": {
                 "title": project.get("title", "Sin título"),
                 "pages": len(paragraphs) // 20 + 1,  # Estimación
@@ -389,92 +188,265 @@ async def parse_docx(project_id: str):
         print(f"Error procesando DOCX: {error_detail}")
         raise HTTPException(status_code=500, detail=f"Error procesando DOCX: {str(e)}")
 
+def slice_blocks(parsed: dict, first: int, last: int) -> str:
+    """HTML de los bloques [first, last] del documento parseado"""
+    blocks = parsed["blocks"]
+    return parsed["html"][blocks[first]["start"]:blocks[last]["end"]]
+
+@router.get("/outline/{project_id}")
+async def get_docx_outline(project_id: str):
+    """
+    Esquema del documento para la primera carga del visor
+
+    Devuelve la hoja de estilos, los títulos y las secciones (sin su HTML).
+    El contenido se pide después por sección o por rango de bloques.
+    """
+    try:
+        project, parsed = await load_project_docx(project_id)
+
+        return {
+            "project_id": project_id,
+            "title": project.get("title", "Sin título"),
+            "css": parsed["html"][:parsed["content_start"]],
+            "outline": parsed["outline"],
+            "sections": parsed["sections"],
+            "blocks_count": len(parsed["blocks"]),
+            "paragraphs_count": len(parsed["paragraphs"])
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error obteniendo esquema: {str(e)}")
+
+@router.get("/sections/{project_id}/{section_id}")
+async def get_docx_section(project_id: str, section_id: str):
+    """
+    HTML de una sección del documento (desde un título hasta el siguiente)
+
+    Incluye los ids de las secciones vecinas para que el cliente las
+    precargue.
+    """
+    try:
+        _, parsed = await load_project_docx(project_id)
+        sections = parsed["sections"]
+
+        index = next((i for i, section in enumerate(sections) if section["id"] == section_id), None)
+        if index is None:
+            raise HTTPException(status_code=404, detail="Sección no encontrada")
+
+        section = sections[index]
+        return {
+            "project_id": project_id,
+            "section": section,
+            "html": slice_blocks(parsed, section["first_block"], section["last_block"]),
+            "previous": sections[index - 1]["id"] if index > 0 else None,
+            "next": sections[index + 1]["id"] if index + 1 < len(sections) else None
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error obteniendo sección: {str(e)}")
+
+@router.get("/blocks/{project_id}")
+async def get_docx_blocks(
+    project_id: str,
+    start: int = Query(0, ge=0, description="Primer bloque"),
+    count: int = Query(50, ge=1, le=MAX_BLOCKS_PER_REQUEST, description="Número de bloques")
+):
+    """
+    HTML de una ventana de bloques (párrafos, títulos, tablas, listas)
+
+    Para secciones muy largas o documentos sin títulos.
+    """
+    try:
+        _, parsed = await load_project_docx(project_id)
+        blocks_count = len(parsed["blocks"])
+
+        if start >= blocks_count:
+            raise HTTPException(status_code=404, detail="Rango fuera del documento")
+
+        end = min(start + count, blocks_count)
+        return {
+            "project_id": project_id,
+            "start": start,
+            "end": end,
+            "html": slice_blocks(parsed, start, end - 1),
+            "blocks_count": blocks_count,
+            "has_more": end < blocks_count
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error obteniendo bloques: {str(e)}")
+
 @router.post("/annotations/save")
 async def save_annotations(request: SaveAnnotationsRequest):
     """
     Guarda las anotaciones del docente sobre el documento
+
+    Solo se escriben las anotaciones nuevas, modificadas o eliminadas; con
+    revision, un guardado sobre una revisión desactualizada responde 409.
     """
     try:
         print("=" * 50)
         print("RECIBIENDO ANOTACIONES:")
         print(f"Project ID: {request.project_id}")
         print(f"Número de anotaciones: {len(request.annotations)}")
-        for idx, anno in enumerate(request.annotations):
-            print(f"\nAnotación {idx + 1}:")
-            print(f"  ID: {anno.id}")
-            print(f"  Type: {anno.type}")
-            print(f"  Text content: {anno.text_content[:50]}...")
-            print(f"  Selected text: {anno.selected_text[:50]}...")
-            print(f"  Position: {anno.position}")
-            print(f"  Created by: {anno.created_by}")
-            print(f"  Created at: {anno.created_at}")
-        print("=" * 50)
-        
-        annotations_collection = Database.get_collection("docx_annotations")
         
-        # Eliminar anotaciones anteriores del proyecto
-        await annotations_collection.delete_many({"project_id": ObjectId(request.project_id)})
-        
-        # Guardar nuevas anotaciones
-        if request.annotations:
-            annotations_data = []
-            for annotation in request.annotations:
-                anno_dict = annotation.dict()
-                anno_dict["project_id"] = ObjectId(request.project_id)
-                anno_dict["created_at"] = datetime.utcnow().isoformat()
-                annotations_data.append(anno_dict)
-            
-            await annotations_collection.insert_many(annotations_data)
+        # Campos del visor DOCX -> esquema común (models.annotation.DocumentAnnotation)
+        annotations_data = [
+            {
+                "id": annotation.id,
+                "type": annotation.type,
+                "comment": annotation.text_content,
+                "selected_text": annotation.selected_text,
+                "position": annotation.position,
+                "paragraph_id": annotation.paragraph_id,
+                "anchor_id": annotation.anchor_id,
+                "author_name": annotation.created_by,
+                "created_at": annotation.created_at
+            }
+            for annotation in request.annotations
+        ]
+        
+        version = request.version or await annotation_store.current_version(request.project_id)
+        result = await annotation_store.save(request.project_id, version, "docx", annotations_data, request.revision)
+        await annotation_channel.publish(request.project_id, result["revision"])
+        print(
+            f"✅ Revisión {result['revision']}: {result['upserted']} nuevas, "
+            f"{result['updated']} modificadas, {result['deleted']} eliminadas"
+        )
+        print("=" * 50)
         
         return {
             "success": True,
             "message": f"Se guardaron {len(request.annotations)} anotaciones",
-            "count": len(request.annotations)
+            "count": len(request.annotations),
+            "version": version,
+            **result
         }
         
+    except RevisionConflict as e:
+        raise HTTPException(
+            status_code=409,
+            detail={
+                "message": "Otra sesión modificó las anotaciones; recárgalas antes de guardar",
+                "revision": e.current_revision
+            }
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error guardando anotaciones: {str(e)}")
 
+async def load_annotations(project_id: str, version: Optional[int] = None) -> dict:
+    """
+    Anotaciones guardadas de una versión del proyecto (por defecto la
+    actual) con los campos del visor DOCX
+    """
+    version = version or await annotation_store.current_version(project_id)
+    documents = await annotation_store.find(project_id, version, "docx")
+    revision = await annotation_store.revision(project_id)
+    
+    # Esquema común -> campos del visor DOCX
+    annotations = [
+        {
+            "_id": str(anno["_id"]),
+            "project_id": str(anno["project_id"]),
+            "id": anno["id"],
+            "type": anno.get("type"),
+            "text_content": anno.get("comment", ""),
+            "selected_text": anno.get("selected_text") or "",
+            "position": anno.get("position") or {},
+            "paragraph_id": anno.get("paragraph_id"),
+            "anchor_id": anno.get("anchor_id"),
+            "created_by": anno.get("author_name") or "teacher",
+            "created_at": anno.get("created_at"),
+            "revision": anno.get("revision")
+        }
+        for anno in documents
+    ]
+    
+    return {
+        "success": True,
+        "version": version,
+        "annotations": annotations,
+        "count": len(annotations),
+        "revision": revision
+    }
+
 @router.get("/annotations/{project_id}")
-async def get_annotations(project_id: str):
+async def get_annotations(project_id: str, version: Optional[int] = Query(None, ge=1)):
     """
-    Obtiene las anotaciones guardadas de un proyecto
+    Obtiene las anotaciones guardadas de una versión del proyecto (por
+    defecto la actual)
     """
     try:
-        annotations_collection = Database.get_collection("docx_annotations")
-        
-        annotations = await annotations_collection.find({
-            "project_id": ObjectId(project_id)
-        }).to_list(length=None)
-        
-        # Convertir ObjectId a string
-        for anno in annotations:
-            anno["_id"] = str(anno["_id"])
-            anno["project_id"] = str(anno["project_id"])
-        
-        return {
-            "success": True,
-            "annotations": annotations,
-            "count": len(annotations)
-        }
+        return await load_annotations(project_id, version)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error obteniendo anotaciones: {str(e)}")
 
+async def export_project_pdf(project_id: str):
+    """
+    Generar (o leer de caché) el PDF del proyecto con sus anotaciones
+
+    Usa el PDF de la primera versión, el mismo que muestra el visor de
+    evaluación: el archivo subido o el convertido desde DOCX.
+
+    Returns:
+        (ruta del PDF exportado, proyecto, número de anotaciones)
+    """
+    projects_collection = Database.get_collection("projects")
+    project = await projects_collection.find_one(
+        {"_id": ObjectId(project_id)},
+        {"title": 1, "versions.files": 1, "versions.version_number": 1}
+    )
+    if not project:
+        raise HTTPException(status_code=404, detail="Proyecto no encontrado")
+
+    versions = project.get("versions", [])
+    files = versions[0].get("files", []) if versions else []
+    if not files:
+        raise HTTPException(status_code=404, detail="No hay archivos en la primera versión del proyecto")
+
+    file_info = files[0]
+    pdf_path = file_info.get("pdf_path") or file_info.get("file_path")
+    if not pdf_path or not pdf_path.lower().endswith(".pdf"):
+        raise HTTPException(
+            status_code=409,
+            detail="El proyecto no tiene PDF; conviértelo antes de exportar"
+        )
+
+    full_path = FileStorage.BASE_DIR / pdf_path
+    if not full_path.exists():
+        raise HTTPException(status_code=404, detail="PDF del proyecto no encontrado")
+
+    annotations = await annotation_store.find(
+        project_id,
+        versions[0].get("version_number", 1),
+        "pdf",
+        {"_id": 0, "id": 1, "page": 1, "rect": 1, "color": 1, "type": 1, "comment": 1, "author_name": 1}
+    )
+
+    export_path = await annotated_pdf_exports.export(full_path, annotations)
+    return export_path, project, len(annotations)
+
 @router.post("/export")
 async def export_with_annotations(request: ExportRequest):
     """
     Exporta el documento con anotaciones aplicadas
-    - PDF: Genera PDF con anotaciones visuales superpuestas
+    - PDF: Genera PDF con las anotaciones del visor de evaluación incrustadas
     - DOCX: Genera DOCX con correcciones aplicadas (si apply_corrections=True)
     """
     try:
         if request.export_format == 'pdf':
-            # TODO: Implementar generación de PDF con reportlab
+            _, _, annotations_count = await export_project_pdf(request.project_id)
             return {
                 "success": True,
-                "message": "PDF con anotaciones generado",
-                "download_url": f"/api/v1/projects/download/{request.project_id}_annotated.pdf"
+                "message": f"PDF con {annotations_count} anotaciones generado",
+                "download_url": f"/api/v1/docx/export/{request.project_id}/pdf"
             }
         
         elif request.export_format == 'docx':
@@ -495,9 +467,34 @@ async def export_with_annotations(request: ExportRequest):
         else:
             raise HTTPException(status_code=400, detail="Formato no soportado. Use 'pdf' o 'docx'")
             
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error exportando: {str(e)}")
 
+@router.get("/export/{project_id}/pdf")
+async def download_annotated_pdf(project_id: str):
+    """
+    Descargar el PDF del proyecto con sus anotaciones
+
+    Se genera al vuelo si las anotaciones cambiaron desde la última
+    exportación; si no, se sirve la copia en caché.
+    """
+    try:
+        export_path, project, _ = await export_project_pdf(project_id)
+        title = re.sub(r"[^\w\- ]+", "", project.get("title") or "proyecto").strip() or "proyecto"
+        return FileResponse(
+            path=str(export_path),
+            media_type="application/pdf",
+            filename=f"{title[:80]} - anotado.pdf",
+            headers={"Cache-Control": "no-cache"}
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error exportando PDF: {str(e)}")
+
 @router.get("/preview/{project_id}")
 async def get_document_preview(project_id: str):
     """
@@ -508,7 +505,7 @@ async def get_document_preview(project_id: str):
         content = await parse_docx(project_id)
         
         # Obtener anotaciones
-        annotations_result = await get_annotations(project_id)
+        annotations_result = await load_annotations(project_id)
         
         return {
             "project_id": project_id,
@@ -518,3 +515,50 @@ async def get_document_preview(project_id: str):
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error obteniendo preview: {str(e)}")
+
+IMAGE_NAME_PATTERN = re.compile(r"^[0-9a-f]{64}\.[a-z]{3,4}$")
+
+# Extensión guardada por utils.docx_parser.store_image -> tipo servido
+# (las desconocidas, "bin", como application/octet-stream)
+IMAGE_MEDIA_TYPES = {
+    "png": "image/png",
+    "jpg": "image/jpeg",
+    "gif": "image/gif",
+    "bmp": "image/bmp",
+    "tiff": "image/tiff",
+    "webp": "image/webp",
+    "svg": "image/svg+xml",
+    "emf": "image/x-emf",
+    "wmf": "image/x-wmf"
+}
+
+@router.get("/images/{image_name}")
+async def get_docx_image(image_name: str):
+    """
+    Servir una imagen extraída de un DOCX
+
+    El nombre es el hash de la imagen, por lo que el contenido de una URL
+    nunca cambia y el navegador puede guardarla en caché indefinidamente.
+    """
+    if not IMAGE_NAME_PATTERN.match(image_name):
+        raise HTTPException(status_code=404, detail="Imagen no encontrada")
+
+    image_path = DOCX_IMAGES_DIR / image_name
+    if not image_path.exists():
+        raise HTTPException(status_code=404, detail="Imagen no encontrada")
+
+    extension = image_path.suffix.lstrip(".")
+    headers = {
+        "Cache-Control": "public, max-age=31536000, immutable",
+        "X-Content-Type-Options": "nosniff"
+    }
+    if extension == "svg":
+        # SVG que no se pudo convertir a PNG: sin scripts y como descarga si se abre directamente
+        headers["Content-Security-Policy"] = "sandbox"
+        headers["Content-Disposition"] = f'attachment; filename="{image_name}"'
+
+    return FileResponse(
+        path=str(image_path),
+        media_type=IMAGE_MEDIA_TYPES.get(extension, "application/octet-stream"),
+        headers=headers
+    )
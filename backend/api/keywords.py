@@ -0,0 +1,27 @@
+"""
+API Router para Palabras Clave
+Autocompletado de palabras clave normalizadas de los proyectos publicados
+"""
+from fastapi import APIRouter, Query
+
+from utils.keyword_index import keyword_index
+
+router = APIRouter(prefix="/api/v1/keywords", tags=["keywords"])
+
+
+@router.get("/suggest")
+async def suggest_keywords(
+    q: str = Query("", description="Prefijo escrito por el usuario"),
+    limit: int = Query(10, ge=1, le=50)
+):
+    """
+    Sugerencias de palabras clave para el formulario de subida y el filtro de la biblioteca
+
+    Se responde desde el índice en memoria, sin consultar la base de datos.
+    """
+    suggestions = keyword_index.suggest(q, limit)
+    return {
+        "query": q,
+        "suggestions": suggestions,
+        "count": len(suggestions)
+    }
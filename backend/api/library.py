@@ -0,0 +1,64 @@
+"""
+API Router para estadísticas de la Biblioteca Digital
+Lectores únicos aproximados y proyectos en tendencia
+"""
+from fastapi import APIRouter, HTTPException, Query
+from typing import List, Optional
+from bson import ObjectId
+
+from utils.reader_sketches import reader_sketches
+from utils.trending import trending_projects
+
+router = APIRouter(prefix="/api/v1/library", tags=["library"])
+
+
+def parse_periods(periods: Optional[str]) -> Optional[List[str]]:
+    """Convertir "2025-01,2025-02" en lista de periodos"""
+    if not periods:
+        return None
+    return [period.strip() for period in periods.split(",") if period.strip()]
+
+
+@router.get("/projects/{project_id}/readers")
+async def get_project_readers(
+    project_id: str,
+    periods: Optional[str] = Query(None, description="Meses separados por comas (YYYY-MM)")
+):
+    """Lectores únicos aproximados de un proyecto"""
+    if not ObjectId.is_valid(project_id):
+        raise HTTPException(status_code=400, detail="ID de proyecto inválido")
+
+    try:
+        estimate = await reader_sketches.estimate(project_id=project_id, periods=parse_periods(periods))
+        return {"project_id": project_id, **estimate}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error obteniendo lectores: {str(e)}")
+
+
+@router.get("/readers")
+async def get_readers_summary(
+    career_code: Optional[str] = Query(None, description="Filtrar por carrera"),
+    periods: Optional[str] = Query(None, description="Meses separados por comas (YYYY-MM)")
+):
+    """Lectores únicos aproximados de todos los proyectos de una carrera y/o periodo"""
+    try:
+        estimate = await reader_sketches.estimate(career_code=career_code, periods=parse_periods(periods))
+        return {"career_code": career_code, **estimate}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error obteniendo lectores: {str(e)}")
+
+
+@router.get("/trending")
+async def get_trending_projects(limit: int = Query(10, ge=1, le=50)):
+    """
+    Proyectos publicados más leídos recientemente
+
+    El puntaje de cada lectura pierde la mitad de su peso cada semana. Se
+    responde desde memoria, sin consultar la base de datos.
+    """
+    projects = trending_projects.top(limit)
+    return {
+        "projects": projects,
+        "count": len(projects),
+        "half_life_days": trending_projects.HALF_LIFE_DAYS
+    }
@@ -6,11 +6,13 @@ Conversión de DOCX a PDF y manejo de anotaciones con coordenadas
 
 """
 
-from fastapi import APIRouter, HTTPException, UploadFile, File
+from fastapi import APIRouter, HTTPException, UploadFile, File, Response, Request, Query
+
+from fastapi.responses import FileResponse
 
 from typing import List, Dict, Any, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from bson import ObjectId
 
@@ -20,10 +22,32 @@ from pathlib import Path
 
 import io
 
+import asyncio
+
 
 
 from config.database import Database
 
+from utils.precompute import submission_precompute
+
+from utils.project_conversion import conversion_jobs, submit_project_conversion
+
+from utils.jobs import JobRegistry
+
+from utils.pdf_metadata import analyze_pdf
+
+from utils.annotation_store import RevisionConflict, annotation_store
+
+from utils.annotation_sync import annotation_channel
+
+from utils.annotation_index import annotation_trees, parse_pages, parse_rect
+
+from utils.path_index import path_index
+
+from utils.page_raster import IMAGE_FORMATS, normalize_scale, page_rasters, resolve_format
+
+from utils.text_layer import text_layers
+
 
 
 router = APIRouter(prefix="/api/v1/pdf-evaluation", tags=["pdf-evaluation"])
@@ -86,6 +110,10 @@ class SaveAnnotationsRequest(BaseModel):
 
     annotations: List[Annotation]
 
+    revision: Optional[int] = None  # Revisión sobre la que se editó (control de concurrencia)
+
+    version: Optional[int] = None  # Versión anotada (por defecto la actual del proyecto)
+
 
 
 
@@ -102,53 +130,57 @@ class ConvertToPDFRequest(BaseModel):
 
 
 
-@router.post("/convert-to-pdf/{project_id}")
+class SnapRequest(BaseModel):
 
-async def convert_docx_to_pdf(project_id: str):
+    """Request para ajustar una selección a las palabras de una página"""
 
-    """
+    page: int
 
-    Convierte el archivo DOCX del proyecto a PDF para evaluación
+    rect: List[float]  # [x0, y0, x1, y1] normalizadas
 
-    Usa PyMuPDF (fitz) para la conversión
+    version: int = 1
 
-    """
+    min_overlap: float = Field(0.5, gt=0, le=1)  # Fracción de cada palabra que debe quedar cubierta
 
-    try:
 
-        # Importar PyMuPDF
 
-        try:
 
-            import fitz  # PyMuPDF
 
-        except ImportError:
+class PrecomputeRequest(BaseModel):
 
-            raise HTTPException(
+    """Opciones del precálculo masivo de entregas"""
 
-                status_code=500,
+    concurrency: Optional[int] = Field(None, ge=1, le=16)  # Documentos a la vez
 
-                detail="PyMuPDF no está instalado. Ejecuta: pip install PyMuPDF"
+    limit: Optional[int] = Field(None, ge=1)  # Máximo de proyectos
 
-            )
+    resume: bool = True  # Continuar un recorrido interrumpido
 
-        
 
-        try:
 
-            from docx import Document
 
-        except ImportError:
 
-            raise HTTPException(
+@router.post("/convert-to-pdf/{project_id}")
 
-                status_code=500,
+async def convert_docx_to_pdf(project_id: str, response: Response):
 
-                detail="python-docx no está instalado. Ejecuta: pip install python-docx"
+    """
 
-            )
+    Convierte el archivo DOCX del proyecto a PDF para evaluación
 
-        
+
+
+    La conversión se ejecuta en el pool de procesos: la respuesta llega de
+
+    inmediato con un job_id que se consulta en /convert-to-pdf/jobs/{job_id}.
+
+    Peticiones simultáneas para el mismo archivo comparten el mismo trabajo.
+
+    Documentos idénticos (mismo SHA-256) reutilizan la conversión en caché.
+
+    """
+
+    try:
 
         # Obtener el proyecto
 
@@ -210,21 +242,11 @@ async def convert_docx_to_pdf(project_id: str):
 
         
 
-        # Buscar el archivo si no existe en la ruta directa
+        # Buscar el archivo por nombre si la ruta guardada quedó desactualizada
 
         if not full_path.exists():
 
-            import os
-
-            for root, dirs, files_in_dir in os.walk(base_path):
-
-                for file in files_in_dir:
-
-                    if (file_id and file == file_id) or (file_path and file_path in str(Path(root) / file)):
-
-                        full_path = Path(root) / file
-
-                        break
+            full_path = await path_index.find(file_path, file_id) or full_path
 
         
 
@@ -254,6 +276,8 @@ async def convert_docx_to_pdf(project_id: str):
 
                 "success": True,
 
+                "status": "completed",
+
                 "message": "El archivo ya es PDF",
 
                 "pdf_path": str(pdf_path.relative_to(base_path)),
@@ -272,6 +296,8 @@ async def convert_docx_to_pdf(project_id: str):
 
                 "success": True,
 
+                "status": "completed",
+
                 "message": "PDF ya convertido previamente",
 
                 "pdf_path": str(pdf_path.relative_to(base_path)),
@@ -282,219 +308,251 @@ async def convert_docx_to_pdf(project_id: str):
 
         
 
-        # Convertir DOCX a PDF usando python-docx + reportlab
+        job = submit_project_conversion(project, full_path, pdf_path, base_path)
 
-        # Nota: Para una conversión más profesional en producción, usar LibreOffice/unoconv
+        
+
+        response.status_code = 202
 
-        from reportlab.lib.pagesizes import letter
+        return {
 
-        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
+            "success": True,
 
-        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+            "message": "Conversión en proceso",
 
-        from reportlab.lib.units import inch
+            "status": job["status"],
 
-        from reportlab.lib.enums import TA_JUSTIFY, TA_CENTER, TA_LEFT
+            "job_id": job["job_id"],
 
-        
+            "status_url": f"/api/v1/pdf-evaluation/convert-to-pdf/jobs/{job['job_id']}"
 
-        # Leer el documento DOCX
+        }
 
-        document = Document(str(full_path))
+    
 
-        
+    except HTTPException:
 
-        # Crear el PDF
+        raise
 
-        pdf_doc = SimpleDocTemplate(
+    except Exception as e:
 
-            str(pdf_path),
+        import traceback
 
-            pagesize=letter,
+        error_detail = traceback.format_exc()
 
-            rightMargin=72,
+        print(f"Error convirtiendo a PDF: {error_detail}")
 
-            leftMargin=72,
+        raise HTTPException(
 
-            topMargin=72,
+            status_code=500,
 
-            bottomMargin=18
+            detail=f"Error convirtiendo a PDF: {str(e)}"
 
         )
 
-        
 
-        # Estilos
 
-        styles = getSampleStyleSheet()
 
-        styles.add(ParagraphStyle(
 
-            name='Justify',
+@router.get("/convert-to-pdf/jobs/{job_id}")
 
-            parent=styles['Normal'],
+async def get_conversion_job(job_id: str):
 
-            alignment=TA_JUSTIFY,
+    """
 
-            fontSize=11,
+    Estado de una conversión: queued, running, completed o failed
 
-            leading=14
 
-        ))
 
-        
+    Al completarse, "result" incluye pdf_path y pdf_url.
 
-        # Construir el contenido
+    """
 
-        story = []
+    job = conversion_jobs.get(job_id)
 
-        
+    if not job:
 
-        for para in document.paragraphs:
+        raise HTTPException(status_code=404, detail="Trabajo de conversión no encontrado")
 
-            if para.text.strip():
+    
 
-                # Detectar si es título
+    return {"success": job["status"] != "failed", **JobRegistry.public(job)}
 
-                if para.style.name.startswith('Heading'):
 
-                    style = styles['Heading1'] if '1' in para.style.name else styles['Heading2']
 
-                else:
 
-                    style = styles['Justify']
 
-                
+@router.post("/precompute")
 
-                p = Paragraph(para.text, style)
+async def start_precompute(response: Response, request: PrecomputeRequest = PrecomputeRequest()):
 
-                story.append(p)
+    """
 
-                story.append(Spacer(1, 0.2 * inch))
+    Convertir y parsear en segundo plano los DOCX pendientes (administración)
 
-        
 
-        # Generar el PDF
 
-        pdf_doc.build(story)
+    Pensado para después de una fecha de entrega: evita que la primera
 
-        
+    apertura de cada documento espere la conversión. También se ejecuta
 
-        # Subir el PDF a Cloudinary si está configurado
+    cada noche (PRECOMPUTE_HOUR).
 
-        storage_type = os.getenv("STORAGE_TYPE", "local")
+    """
 
-        pdf_url = f"/uploads/{pdf_path.relative_to(base_path)}"
+    started = submission_precompute.trigger(request.concurrency, request.limit, request.resume)
 
-        cloudinary_info = {}
+    response.status_code = 202 if started else 200
 
-        
+    return {
 
-        if storage_type == "cloudinary":
+        "success": True,
 
-            # Leer el PDF generado
+        "message": "Precálculo iniciado" if started else "Ya hay un precálculo en curso",
 
-            with open(pdf_path, 'rb') as f:
+        "progress": submission_precompute.progress
 
-                pdf_content = f.read()
+    }
 
-            
 
-            # Subir a Cloudinary
 
-            from utils.cloudinary_storage import CloudinaryStorage
 
-            cloudinary_result = CloudinaryStorage.upload_pdf(
 
-                pdf_content, 
+@router.get("/precompute")
 
-                f"{project['title']}.pdf", 
+async def get_precompute_progress():
 
-                project['created_by']
+    """Progreso del último precálculo de entregas"""
 
-            )
+    return {
 
-            
+        "success": True,
+
+        "running": submission_precompute.running,
 
-            if cloudinary_result["success"]:
+        "progress": submission_precompute.progress
 
-                pdf_url = cloudinary_result["file_url"]
+    }
 
-                cloudinary_info = {
 
-                    "pdf_url": pdf_url,
 
-                    "pdf_cloudinary": True,
 
-                    "pdf_public_id": cloudinary_result["public_id"]
 
-                }
+@router.post("/annotations/save")
 
-                print(f"☁️ PDF subido a Cloudinary: {pdf_url}")
+async def save_annotations(request: SaveAnnotationsRequest):
 
-            else:
+    """
 
-                print(f"❌ Error subiendo a Cloudinary: {cloudinary_result.get('error')}")
+    Guarda las anotaciones del profesor sobre el PDF
 
-        
+    Estructura: { project_id, page, rect: [x0, y0, x1, y1], color, comment, author }
 
-        # Guardar la información del PDF en el proyecto
+    Solo se escriben las anotaciones nuevas, modificadas o eliminadas. Si el
 
-        update_data = {
+    request trae la revisión sobre la que se editó y otro guardado la cambió
 
-            f"versions.0.files.0.pdf_path": str(pdf_path.relative_to(base_path)),
+    entretanto, responde 409 con la revisión actual.
 
-            f"versions.0.files.0.pdf_generated_at": datetime.utcnow(),
+    """
 
-            f"versions.0.files.0.pdf_url": pdf_url
+    try:
 
-        }
+        print("=" * 60)
+
+        print("GUARDANDO ANOTACIONES PDF:")
+
+        print(f"Project ID: {request.project_id}")
+
+        print(f"Número de anotaciones: {len(request.annotations)}")
 
         
 
-        # Agregar información de Cloudinary si aplica
+        annotations_data = []
+
+        for idx, annotation in enumerate(request.annotations):
+
+            anno_dict = {
+
+                "id": annotation.id or f"anno_{datetime.utcnow().timestamp()}_{idx}",
+
+                "page": annotation.page,
+
+                "rect": annotation.rect,
+
+                "color": annotation.color,
+
+                "type": annotation.type,
+
+                "comment": annotation.comment,
+
+                "selected_text": annotation.selected_text,
 
-        if cloudinary_info:
+                "author_id": annotation.author_id,
 
-            for key, value in cloudinary_info.items():
+                "author_name": annotation.author_name
 
-                update_data[f"versions.0.files.0.{key}"] = value
+            }
+
+            # Sin fecha se asigna al insertarla; así no cambia en cada guardado
+
+            if annotation.created_at:
+
+                anno_dict["created_at"] = annotation.created_at
+
+            annotations_data.append(anno_dict)
 
         
 
-        await projects_collection.update_one(
+        version = request.version or await annotation_store.current_version(request.project_id)
 
-            {"_id": ObjectId(project_id)},
+        result = await annotation_store.save(request.project_id, version, "pdf", annotations_data, request.revision)
+
+        await annotation_channel.publish(request.project_id, result["revision"])
 
-            {"$set": update_data}
+        print(
+
+            f"✅ Revisión {result['revision']}: {result['upserted']} nuevas, "
+
+            f"{result['updated']} modificadas, {result['deleted']} eliminadas, "
+
+            f"{result['unchanged']} sin cambios"
 
         )
 
+        print("=" * 60)
+
         
 
         return {
 
             "success": True,
 
-            "message": "DOCX convertido a PDF exitosamente",
+            "message": f"Se guardaron {len(request.annotations)} anotaciones",
 
-            "pdf_path": str(pdf_path.relative_to(base_path)),
+            "count": len(request.annotations),
 
-            "pdf_url": pdf_url,
+            "version": version,
 
-            "cloudinary": storage_type == "cloudinary" and cloudinary_info.get("pdf_cloudinary", False)
+            **result
 
         }
 
         
 
-    except ImportError as e:
+    except RevisionConflict as e:
 
         raise HTTPException(
 
-            status_code=500,
+            status_code=409,
 
-            detail=f"Librerías no instaladas: {str(e)}"
+            detail={
+
+                "message": "Otra sesión modificó las anotaciones; recárgalas antes de guardar",
+
+                "revision": e.current_revision
+
+            }
 
         )
 
@@ -504,13 +562,13 @@ async def convert_docx_to_pdf(project_id: str):
 
         error_detail = traceback.format_exc()
 
-        print(f"Error convirtiendo a PDF: {error_detail}")
+        print(f"Error guardando anotaciones: {error_detail}")
 
         raise HTTPException(
 
             status_code=500,
 
-            detail=f"Error convirtiendo a PDF: {str(e)}"
+            detail=f"Error guardando anotaciones: {str(e)}"
 
         )
 
@@ -518,115 +576,219 @@ async def convert_docx_to_pdf(project_id: str):
 
 
 
-@router.post("/annotations/save")
+@router.get("/annotations/{project_id}")
 
-async def save_annotations(request: SaveAnnotationsRequest):
+async def get_annotations(
+
+    project_id: str,
+
+    version: Optional[int] = Query(None, ge=1),
+
+    pages: Optional[str] = Query(None, description="Páginas visibles, p. ej. 1,3,5-8 (por defecto todas)"),
+
+    rect: Optional[str] = Query(None, description="Recorte visible x0,y0,x1,y1 normalizado (requiere pages)")
+
+):
 
     """
 
-    Guarda las anotaciones del profesor sobre el PDF
+    Obtiene las anotaciones guardadas de una versión del proyecto
 
-    Estructura: { project_id, page, rect: [x0, y0, x1, y1], color, comment, author }
+    (por defecto la actual)
+
+    Con pages solo se leen esas páginas, y con rect solo las anotaciones
+
+    que tocan ese recorte (índice espacial por página)
 
     """
 
     try:
 
-        print("=" * 60)
+        page_list = parse_pages(pages) if pages else None
 
-        print("GUARDANDO ANOTACIONES PDF:")
+        viewport = parse_rect(rect) if rect else None
 
-        print(f"Project ID: {request.project_id}")
+    except ValueError as e:
 
-        print(f"Número de anotaciones: {len(request.annotations)}")
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if viewport is not None and page_list is None:
+
+        raise HTTPException(status_code=400, detail="rect requiere pages")
+
+    try:
+
+        version = version or await annotation_store.current_version(project_id)
+
+        revision = await annotation_store.revision(project_id)
+
+        if viewport is None:
+
+            annotations = await annotation_store.find(project_id, version, "pdf", pages=page_list)
+
+        else:
+
+            trees = await annotation_trees.get_pages(project_id, version, page_list, "pdf", revision)
+
+            annotations = [
+
+                dict(annotation)
+
+                for page in page_list
+
+                for annotation in trees[page].intersecting(viewport)
+
+            ]
 
         
 
-        annotations_collection = Database.get_collection("pdf_annotations")
+        # Convertir ObjectId a string
+
+        for anno in annotations:
+
+            anno["_id"] = str(anno["_id"])
+
+            anno["project_id"] = str(anno["project_id"])
 
         
 
-        # Eliminar anotaciones anteriores del proyecto
+        print(f"📄 Recuperadas {len(annotations)} anotaciones para proyecto {project_id}")
 
-        await annotations_collection.delete_many({
+        
 
-            "project_id": ObjectId(request.project_id)
+        return {
 
-        })
+            "success": True,
+
+            "project_id": project_id,
+
+            "version": version,
+
+            "annotations": annotations,
+
+            "count": len(annotations),
+
+            "revision": revision
+
+        }
 
         
 
-        # Guardar nuevas anotaciones
+    except Exception as e:
+
+        raise HTTPException(
 
-        if request.annotations:
+            status_code=500,
 
-            annotations_data = []
+            detail=f"Error obteniendo anotaciones: {str(e)}"
 
-            for idx, annotation in enumerate(request.annotations):
+        )
 
-                print(f"\nAnotación {idx + 1}:")
 
-                print(f"  Página: {annotation.page}")
 
-                print(f"  Rect: {annotation.rect}")
 
-                print(f"  Color: {annotation.color}")
 
-                print(f"  Comentario: {annotation.comment[:50]}...")
+@router.get("/pdf-info/{project_id}")
 
-                print(f"  Autor: {annotation.author_name}")
+async def get_pdf_info(project_id: str):
 
-                
+    """
 
-                anno_dict = {
+    Obtiene información del PDF del proyecto (número de páginas, dimensiones, etc.)
 
-                    "id": annotation.id or f"anno_{datetime.utcnow().timestamp()}_{idx}",
 
-                    "project_id": ObjectId(request.project_id),
 
-                    "page": annotation.page,
+    Los datos se calculan al subir o convertir el archivo y se guardan en
 
-                    "rect": annotation.rect,
+    files[0].metadata; aquí solo se leen. Los archivos anteriores a ese
 
-                    "color": annotation.color,
+    cambio se analizan una vez y se guardan para las siguientes consultas.
 
-                    "type": annotation.type,
+    """
 
-                    "comment": annotation.comment,
+    try:
 
-                    "selected_text": annotation.selected_text,
+        projects_collection = Database.get_collection("projects")
 
-                    "author_id": annotation.author_id,
+        project = await projects_collection.find_one(
 
-                    "author_name": annotation.author_name,
+            {"_id": ObjectId(project_id)},
 
-                    "created_at": annotation.created_at or datetime.utcnow().isoformat()
+            {
 
-                }
+                "versions.files.pdf_path": 1,
 
-                annotations_data.append(anno_dict)
+                "versions.files.file_path": 1,
 
-            
+                "versions.files.metadata": 1
+
+            }
+
+        )
+
+        
+
+        if not project:
+
+            raise HTTPException(status_code=404, detail="Proyecto no encontrado")
+
+        
 
-            result = await annotations_collection.insert_many(annotations_data)
+        versions = project.get("versions", [])
+
+        if not versions:
+
+            raise HTTPException(status_code=404, detail="El proyecto no tiene versiones")
+
+        
+
+        files = versions[0].get("files", [])
+
+        if not files:
+
+            raise HTTPException(status_code=404, detail="No hay archivos en el proyecto")
+
+        
+
+        file_info = files[0]
+
+        pdf_path = file_info.get("pdf_path") or file_info.get("file_path")
+
+        if not pdf_path:
+
+            raise HTTPException(status_code=404, detail="No se encontró el PDF")
+
+        
 
-            print(f"\n✅ Guardadas {len(result.inserted_ids)} anotaciones")
+        metadata = file_info.get("metadata") or {}
 
-            print("=" * 60)
+        if not metadata.get("page_sizes"):
+
+            # Archivo subido antes de guardar los metadatos: analizar y guardar
+
+            full_path = Path(__file__).parent.parent / "uploads" / pdf_path
+
+            if not full_path.exists():
+
+                raise HTTPException(status_code=404, detail=f"PDF no encontrado: {full_path}")
 
             
 
-            return {
+            metadata = await analyze_pdf(full_path)
 
-                "success": True,
+            if metadata is None:
 
-                "message": f"Se guardaron {len(request.annotations)} anotaciones",
+                raise HTTPException(status_code=500, detail="No se pudo leer el PDF")
 
-                "count": len(request.annotations),
+            
 
-                "ids": [str(id) for id in result.inserted_ids]
+            await projects_collection.update_one(
 
-            }
+                {"_id": ObjectId(project_id)},
+
+                {"$set": {"versions.0.files.0.metadata": metadata}}
+
+            )
 
         
 
@@ -634,27 +796,39 @@ async def save_annotations(request: SaveAnnotationsRequest):
 
             "success": True,
 
-            "message": "No hay anotaciones para guardar",
+            "project_id": project_id,
 
-            "count": 0
+            "pdf_path": str(pdf_path),
 
-        }
+            "total_pages": metadata["pages"],
 
-        
+            "word_count": metadata.get("word_count"),
 
-    except Exception as e:
+            "pdf_version": metadata.get("pdf_version"),
 
-        import traceback
+            "pages": [
 
-        error_detail = traceback.format_exc()
+                {"page": number, "width": width, "height": height}
 
-        print(f"Error guardando anotaciones: {error_detail}")
+                for number, (width, height) in enumerate(metadata["page_sizes"], start=1)
+
+            ]
+
+        }
+
+    
+
+    except HTTPException:
+
+        raise
+
+    except Exception as e:
 
         raise HTTPException(
 
             status_code=500,
 
-            detail=f"Error guardando anotaciones: {str(e)}"
+            detail=f"Error obteniendo información del PDF: {str(e)}"
 
         )
 
@@ -662,57 +836,161 @@ async def save_annotations(request: SaveAnnotationsRequest):
 
 
 
-@router.get("/annotations/{project_id}")
+async def resolve_version_pdf(project_id: str, version: int) -> Path:
+
+    """
+
+    Ruta local del PDF de una versión del proyecto (el archivo subido o el
+
+    convertido desde DOCX)
+
+    """
+
+    projects_collection = Database.get_collection("projects")
+
+    project = await projects_collection.find_one(
+
+        {"_id": ObjectId(project_id)},
+
+        {
+
+            "versions.version_number": 1,
+
+            "versions.files.pdf_path": 1,
+
+            "versions.files.file_path": 1
+
+        }
+
+    )
+
+    if not project:
+
+        raise HTTPException(status_code=404, detail="Proyecto no encontrado")
+
+    
+
+    version_data = next(
+
+        (v for v in project.get("versions", []) if v.get("version_number", 1) == version),
+
+        None
+
+    )
+
+    if not version_data or not version_data.get("files"):
+
+        raise HTTPException(status_code=404, detail="Versión no encontrada")
+
+    
+
+    file_info = version_data["files"][0]
+
+    pdf_path = file_info.get("pdf_path") or file_info.get("file_path")
+
+    if not pdf_path or not pdf_path.lower().endswith(".pdf"):
+
+        raise HTTPException(status_code=404, detail="La versión no tiene PDF")
+
+    
+
+    full_path = Path(__file__).parent.parent / "uploads" / pdf_path
+
+    if not full_path.exists():
+
+        raise HTTPException(status_code=404, detail=f"PDF no encontrado: {full_path}")
+
+    
+
+    return full_path
+
+
+
+
+
+@router.get("/pages/{project_id}/{version}/{page}")
+
+async def get_page_image(
+
+    project_id: str,
+
+    version: int,
+
+    page: int,
 
-async def get_annotations(project_id: str):
+    request: Request,
+
+    scale: float = Query(1.5, gt=0, description="Zoom (1.0 = 72 dpi), se ajusta a múltiplos de 0.25"),
+
+    image_format: str = Query("webp", alias="format", pattern="^(webp|png)$")
+
+):
 
     """
 
-    Obtiene todas las anotaciones guardadas de un proyecto
+    Imagen de una página del PDF renderizada en el servidor
+
+
+
+    Las páginas se guardan en una caché en disco (LRU por tamaño), así que
+
+    una página abierta por varios docentes se renderiza una sola vez. La
+
+    respuesta incluye ETag: el navegador revalida con If-None-Match y
+
+    recibe 304 si la página no cambió.
 
     """
 
     try:
 
-        annotations_collection = Database.get_collection("pdf_annotations")
+        full_path = await resolve_version_pdf(project_id, version)
 
         
 
-        annotations = await annotations_collection.find({
+        scale = normalize_scale(scale)
 
-            "project_id": ObjectId(project_id)
+        image_format = resolve_format(image_format)
 
-        }).to_list(length=None)
+        key = await page_rasters.get_key(full_path, page, scale, image_format)
 
-        
+        etag = f'"{key}"'
 
-        # Convertir ObjectId a string
+        headers = {"ETag": etag, "Cache-Control": "private, max-age=3600"}
 
-        for anno in annotations:
+        
 
-            anno["_id"] = str(anno["_id"])
+        if request.headers.get("if-none-match") == etag:
 
-            anno["project_id"] = str(anno["project_id"])
+            return Response(status_code=304, headers=headers)
 
         
 
-        print(f"📄 Recuperadas {len(annotations)} anotaciones para proyecto {project_id}")
+        try:
+
+            image_path, _ = await page_rasters.get(key, full_path, page, scale, image_format)
+
+        except IndexError as e:
+
+            raise HTTPException(status_code=404, detail=f"Página no encontrada: {str(e)}")
 
         
 
-        return {
+        return FileResponse(
 
-            "success": True,
+            path=str(image_path),
 
-            "project_id": project_id,
+            media_type=IMAGE_FORMATS[image_format],
 
-            "annotations": annotations,
+            headers=headers
 
-            "count": len(annotations)
+        )
 
-        }
+    
 
-        
+    except HTTPException:
+
+        raise
 
     except Exception as e:
 
@@ -720,7 +998,7 @@ async def get_annotations(project_id: str):
 
             status_code=500,
 
-            detail=f"Error obteniendo anotaciones: {str(e)}"
+            detail=f"Error renderizando la página: {str(e)}"
 
         )
 
@@ -728,117 +1006,131 @@ async def get_annotations(project_id: str):
 
 
 
-@router.get("/pdf-info/{project_id}")
+@router.post("/text-layer/{project_id}/snap")
 
-async def get_pdf_info(project_id: str):
+async def snap_to_words(project_id: str, request: SnapRequest):
 
     """
 
-    Obtiene información del PDF del proyecto (número de páginas, dimensiones, etc.)
+    Ajustar un rectángulo de selección a las palabras del PDF
+
+
+
+    Devuelve las palabras cubiertas, un rectángulo por línea para dibujar
+
+    el resaltado y el texto seleccionado tal como aparece en el PDF. Las
+
+    coordenadas son las normalizadas del visor ([0, 1], origen arriba a la
+
+    izquierda).
 
     """
 
     try:
 
-        try:
+        if len(request.rect) != 4:
 
-            import fitz  # PyMuPDF
+            raise HTTPException(status_code=400, detail="rect debe ser [x0, y0, x1, y1]")
 
-        except ImportError:
+        
 
-            raise HTTPException(
+        full_path = await resolve_version_pdf(project_id, request.version)
 
-                status_code=500,
+        index = await text_layers.get_page(full_path, request.page)
 
-                detail="PyMuPDF no está instalado"
+        if index is None:
 
-            )
+            raise HTTPException(status_code=404, detail="Página no encontrada")
 
         
 
-        # Obtener el proyecto
+        return {
 
-        projects_collection = Database.get_collection("projects")
+            "success": True,
 
-        project = await projects_collection.find_one({"_id": ObjectId(project_id)})
+            "page": request.page,
 
-        
+            **index.snap(request.rect, request.min_overlap)
 
-        if not project:
+        }
 
-            raise HTTPException(status_code=404, detail="Proyecto no encontrado")
+    
 
-        
+    except HTTPException:
 
-        # Obtener ruta del PDF
+        raise
 
-        versions = project.get("versions", [])
+    except Exception as e:
 
-        if not versions:
+        raise HTTPException(
 
-            raise HTTPException(status_code=404, detail="El proyecto no tiene versiones")
+            status_code=500,
 
-        
+            detail=f"Error ajustando la selección: {str(e)}"
 
-        files = versions[0].get("files", [])
+        )
 
-        if not files:
 
-            raise HTTPException(status_code=404, detail="No hay archivos en el proyecto")
 
-        
 
-        file_info = files[0]
 
-        pdf_path = file_info.get("pdf_path") or file_info.get("file_path")
+@router.get("/annotations/{project_id}/hit")
 
-        
+async def hit_test_annotations(
 
-        if not pdf_path:
+    project_id: str,
 
-            raise HTTPException(status_code=404, detail="No se encontró el PDF")
+    page: int = Query(..., ge=1),
 
-        
+    x: float = Query(..., description="Punto normalizado [0, 1] del clic"),
 
-        # Construir ruta completa
+    y: float = Query(..., description="Punto normalizado [0, 1] del clic"),
 
-        base_path = Path(__file__).parent.parent / "uploads"
+    tolerance: float = Query(0.0, ge=0, le=0.05, description="Margen alrededor del punto"),
 
-        full_path = base_path / pdf_path
+    version: Optional[int] = Query(None, ge=1)
 
-        
+):
 
-        if not full_path.exists():
+    """
 
-            raise HTTPException(status_code=404, detail=f"PDF no encontrado: {full_path}")
+    Anotaciones bajo un punto de una página (qué comentario se pulsó)
 
-        
 
-        # Abrir el PDF y obtener información
 
-        doc = fitz.open(str(full_path))
+    Se resuelve con el R-tree en memoria de la página, que solo se vuelve a
 
-        
+    leer de MongoDB cuando cambia la revisión del proyecto. La primera
 
-        pages_info = []
+    anotación es la de menor área (la que se ve encima).
 
-        for page_num in range(len(doc)):
+    """
 
-            page = doc[page_num]
+    if not ObjectId.is_valid(project_id):
 
-            pages_info.append({
+        raise HTTPException(status_code=400, detail="ID de proyecto inválido")
 
-                "page": page_num + 1,
+    
 
-                "width": page.rect.width,
+    try:
 
-                "height": page.rect.height
+        version = version or await annotation_store.current_version(project_id)
 
-            })
+        tree = await annotation_trees.get_page(project_id, version, page, "pdf")
 
         
 
-        doc.close()
+        annotations = []
+
+        for annotation in tree.hit(x, y, tolerance):
+
+            annotation = dict(annotation)
+
+            annotation["_id"] = str(annotation["_id"])
+
+            annotation["project_id"] = str(annotation["project_id"])
+
+            annotations.append(annotation)
 
         
 
@@ -846,17 +1138,17 @@ async def get_pdf_info(project_id: str):
 
             "success": True,
 
-            "project_id": project_id,
+            "page": page,
 
-            "pdf_path": str(pdf_path),
+            "version": version,
 
-            "total_pages": len(pages_info),
+            "annotations": annotations,
 
-            "pages": pages_info
+            "count": len(annotations)
 
         }
 
-        
+    
 
     except Exception as e:
 
@@ -864,7 +1156,7 @@ async def get_pdf_info(project_id: str):
 
             status_code=500,
 
-            detail=f"Error obteniendo información del PDF: {str(e)}"
+            detail=f"Error buscando anotaciones: {str(e)}"
 
         )
 
@@ -872,46 +1164,62 @@ async def get_pdf_info(project_id: str):
 
 
 
-@router.delete("/annotations/{annotation_id}")
+@router.delete("/annotations/{project_id}/{annotation_id}")
 
-async def delete_annotation(annotation_id: str):
+async def delete_annotation(project_id: str, annotation_id: str):
 
     """
 
-    Elimina una anotación específica
+    Elimina una anotación específica de un proyecto (por _id o por su id de anotación)
+
+    Los id de anotación solo son únicos dentro de cada proyecto
 
     """
 
+    if not ObjectId.is_valid(project_id):
+
+        raise HTTPException(status_code=400, detail="ID de proyecto inválido")
+
     try:
 
-        annotations_collection = Database.get_collection("pdf_annotations")
+        query = {"project_id": ObjectId(project_id)}
 
-        
+        if ObjectId.is_valid(annotation_id):
 
-        result = await annotations_collection.delete_one({
+            query["_id"] = ObjectId(annotation_id)
 
-            "_id": ObjectId(annotation_id)
+        else:
+
+            query["id"] = annotation_id
 
-        })
+        deleted = await annotation_store.delete(query)
 
         
 
-        if result.deleted_count == 0:
+        if deleted is None:
 
             raise HTTPException(status_code=404, detail="Anotación no encontrada")
 
+        await annotation_channel.publish(project_id, deleted["revision"])
+
         
 
         return {
 
             "success": True,
 
-            "message": "Anotación eliminada exitosamente"
+            "message": "Anotación eliminada exitosamente",
+
+            "revision": deleted["revision"]
 
         }
 
         
 
+    except HTTPException:
+
+        raise
+
     except Exception as e:
 
         raise HTTPException(
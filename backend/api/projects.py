@@ -38,6 +38,10 @@ import os
 
 
 
+import re
+
+
+
 from pydantic import BaseModel
 
 
@@ -58,6 +62,38 @@ from utils.file_storage import FileStorage
 
 
 
+from utils.keyword_index import normalize_keyword
+
+
+
+from utils.thumbnails import Thumbnails
+
+
+
+from utils.ingest import ingest_pdf
+
+
+
+from utils.pdf_metadata import ANALYSIS_VERSION, analyze_pdf, check_requirements
+
+
+
+from utils.text_diff import version_diffs
+
+
+
+from utils.project_counters import project_counters
+
+
+
+from utils.reader_sketches import reader_sketches
+
+
+
+from utils.trending import trending_projects, trending_summary
+
+
+
 
 
 async def check_student_group_responsible_permission(student_id: str, teacher_id: str = None) -> bool:
@@ -105,6 +141,19 @@ async def check_student_group_responsible_permission(student_id: str, teacher_id
 router = APIRouter(prefix="/api/v1/projects", tags=["projects"])
 
 
+def record_project_read(project: dict, counter: str, viewer_id: Optional[str] = None):
+    """
+    Registrar una lectura de un proyecto en los contadores, lectores únicos y
+    tendencias. Todo se acumula en memoria y se vuelca en lote más tarde.
+    """
+    project_id = str(project["_id"])
+    project_counters.increment(project_id, counter)
+    if viewer_id:
+        reader_sketches.record(project_id, viewer_id, project.get("academic_info", {}).get("career_code", ""))
+    if project.get("metadata", {}).get("status") == "published":
+        trending_projects.record(project_id, trending_summary(project))
+
+
 
 
 
@@ -805,7 +854,10 @@ async def get_projects(
 
 
 @router.get("/{project_id}")
-async def get_project(project_id: str):
+async def get_project(
+    project_id: str,
+    viewer_id: Optional[str] = Query(None, description="Usuario que consulta el proyecto")
+):
 
 
     """Obtener un proyecto por ID"""
@@ -840,7 +892,11 @@ async def get_project(project_id: str):
 
 
 
-        
+        # Contar la vista sin escribir en la base de datos en esta petición
+
+
+
+        record_project_read(project, "view_count", viewer_id)
 
 
 
@@ -1048,12 +1104,508 @@ async def get_project_versions(project_id: str):
 
 
 
+@router.get("/{project_id}/requirements")
+
+
+
+async def check_project_requirements(project_id: str):
+
+
+
+    """
+
+
+
+    Verificar el documento del proyecto contra los requisitos de su materia
+
+
+
+    (páginas mínimas y máximas, secciones obligatorias)
+
+
+
+    Usa los metadatos calculados al subir o convertir el archivo, sin
+
+
+
+    abrirlo. Los archivos anteriores a ese análisis se analizan una vez y
+
+
+
+    se guardan.
+
+
+
+    """
+
+
+
+    try:
+
+
+
+        projects_collection = Database.get_collection(DatabaseConfig.PROJECTS_COLLECTION)
+
+
+
+        project = await projects_collection.find_one(
+
+
+
+            {"_id": ObjectId(project_id)},
+
+
+
+            {
+
+
+
+                "academic_info.subject_code": 1,
+
+
+
+                "versions.files.pdf_path": 1,
+
+
+
+                "versions.files.file_path": 1,
+
+
+
+                "versions.files.metadata": 1
+
+
+
+            }
+
+
+
+        )
+
+
+
+        if not project:
+
+
+
+            raise HTTPException(status_code=404, detail="Proyecto no encontrado")
+
+
+
+        subject_code = project.get("academic_info", {}).get("subject_code")
+
+
+
+        if not subject_code:
+
+
+
+            raise HTTPException(status_code=404, detail="El proyecto no tiene materia asignada")
+
+
+
+        subjects_collection = Database.get_collection(DatabaseConfig.SUBJECTS_COLLECTION)
+
+
+
+        subject = await subjects_collection.find_one({"code": subject_code}, {"name": 1, "requirements": 1})
+
+
+
+        if not subject:
+
+
+
+            raise HTTPException(status_code=404, detail="Materia no encontrada")
+
+
+
+        versions = project.get("versions", [])
+
+
+
+        files = versions[0].get("files", []) if versions else []
+
+
+
+        if not files:
+
+
+
+            raise HTTPException(status_code=404, detail="No hay archivos en el proyecto")
+
+
+
+        metadata = files[0].get("metadata") or {}
+
+
+
+        if metadata.get("analysis_version", 1) < ANALYSIS_VERSION:
+
+
+
+            # Archivo analizado antes de detectar secciones: analizar y guardar
+
+
+
+            pdf_path = files[0].get("pdf_path") or files[0].get("file_path")
+
+
+
+            if not pdf_path or not pdf_path.lower().endswith(".pdf"):
+
+
+
+                raise HTTPException(status_code=409, detail="El documento aún no se ha convertido a PDF")
+
+
+
+            metadata = await analyze_pdf(FileStorage.BASE_DIR / pdf_path)
+
+
+
+            if metadata is None:
+
+
+
+                raise HTTPException(status_code=500, detail="No se pudo leer el PDF")
+
+
+
+            await projects_collection.update_one(
+
+
+
+                {"_id": ObjectId(project_id)},
+
+
+
+                {"$set": {"versions.0.files.0.metadata": metadata}}
+
+
+
+            )
+
+
+
+        return {
+
+
+
+            "success": True,
+
+
+
+            "project_id": project_id,
+
+
+
+            "subject_code": subject_code,
+
+
+
+            "subject_name": subject.get("name"),
+
+
+
+            **check_requirements(metadata, subject.get("requirements") or {})
+
+
+
+        }
+
+
+
+    except HTTPException:
+
+
+
+        raise
+
+
+
+    except Exception as e:
+
+
+
+        raise HTTPException(status_code=500, detail=f"Error verificando requisitos: {str(e)}")
+
+
+
+@router.get("/{project_id}/versions/compare")
+
+
+
+async def compare_project_versions(
+
+
+
+    project_id: str,
+
+
+
+    from_version: Optional[int] = Query(None, ge=1, description="Versión anterior (por defecto la previa a to_version)"),
+
+
+
+    to_version: Optional[int] = Query(None, ge=1, description="Versión nueva (por defecto la actual)")
+
+
+
+):
+
+
+
+    """
+
+
+
+    Comparar el texto de dos versiones del documento del proyecto
+
+
+
+    Alinea las líneas que no cambiaron y devuelve solo los tramos
+
+
+
+    añadidos, eliminados o modificados (estos con detalle por palabra) y
+
+
+
+    las páginas de la versión nueva que tienen cambios. Usa el texto
+
+
+
+    guardado al analizar cada PDF; la comparación se calcula una vez por
+
+
+
+    par de textos y se guarda.
+
+
+
+    """
+
+
+
+    if not ObjectId.is_valid(project_id):
+
+
+
+        raise HTTPException(status_code=400, detail="ID de proyecto inválido")
+
+
+
+    try:
+
+
+
+        projects_collection = Database.get_collection(DatabaseConfig.PROJECTS_COLLECTION)
+
+
+
+        project = await projects_collection.find_one(
+
+
+
+            {"_id": ObjectId(project_id)},
+
+
+
+            {
+
+
+
+                "metadata.current_version": 1,
+
+
+
+                "versions.version_number": 1,
+
+
+
+                "versions.files.pdf_path": 1,
+
+
+
+                "versions.files.file_path": 1,
+
+
+
+                "versions.files.metadata": 1
+
+
+
+            }
+
+
+
+        )
+
+
+
+        if not project:
+
+
+
+            raise HTTPException(status_code=404, detail="Proyecto no encontrado")
+
+
+
+        versions = project.get("versions", [])
+
+
+
+        to_version = to_version or project.get("metadata", {}).get("current_version") or 1
+
+
+
+        from_version = from_version or to_version - 1
+
+
+
+        if from_version < 1 or from_version == to_version:
+
+
+
+            raise HTTPException(status_code=400, detail="Se necesitan dos versiones distintas para comparar")
+
+
+
+        text_ids = []
+
+
+
+        for number in (from_version, to_version):
+
+
+
+            index = next((i for i, v in enumerate(versions) if v.get("version_number", 1) == number), None)
+
+
+
+            files = versions[index].get("files", []) if index is not None else []
+
+
+
+            if not files:
+
+
+
+                raise HTTPException(status_code=404, detail=f"Versión {number} no encontrada")
+
+
+
+            metadata = files[0].get("metadata") or {}
+
+
+
+            if not metadata.get("text_id"):
 
 
 
+                # Archivo guardado antes de extraer el texto: analizar y guardar
 
 
 
+                pdf_path = files[0].get("pdf_path") or files[0].get("file_path")
+
+
+
+                if not pdf_path or not pdf_path.lower().endswith(".pdf"):
+
+
+
+                    raise HTTPException(status_code=409, detail=f"La versión {number} aún no se ha convertido a PDF")
+
+
+
+                metadata = await analyze_pdf(FileStorage.BASE_DIR / pdf_path)
+
+
+
+                if metadata is None:
+
+
+
+                    raise HTTPException(status_code=500, detail=f"No se pudo leer el PDF de la versión {number}")
+
+
+
+                await projects_collection.update_one(
+
+
+
+                    {"_id": ObjectId(project_id)},
+
+
+
+                    {"$set": {f"versions.{index}.files.0.metadata": metadata}}
+
+
+
+                )
+
+
+
+            text_ids.append(metadata["text_id"])
+
+
+
+        comparison = await version_diffs.compare(text_ids[0], text_ids[1])
+
+
+
+        if comparison is None:
+
+
+
+            raise HTTPException(status_code=404, detail="No se encontró el texto de alguna de las versiones")
+
+
+
+        return {
+
+
+
+            "success": True,
+
+
+
+            "project_id": project_id,
+
+
+
+            "from_version": from_version,
+
+
+
+            "to_version": to_version,
+
+
+
+            **comparison
+
+
+
+        }
+
+
+
+    except HTTPException:
+
+
+
+        raise
+
+
+
+    except Exception as e:
+
+
+
+        raise HTTPException(status_code=500, detail=f"Error comparando versiones: {str(e)}")
+
 
 
 def convert_objectids(obj):
@@ -1411,6 +1963,34 @@ async def upload_project(
 
 
 
+    # Una sola apertura del PDF en el pool de procesos: metadatos (páginas,
+
+
+
+    # palabras, esquema, títulos de sección), miniatura de la portada para la
+
+
+
+    # biblioteca y versión optimizada si así ocupa menos
+
+
+
+    ingest = await ingest_pdf(content, student_id)
+
+
+
+    content = ingest["content"]
+
+
+
+    thumbnail_url = ingest["thumbnail_url"]
+
+
+
+    pdf_metadata = ingest["metadata"]
+
+
+
     # Guardar archivo
 
 
@@ -1435,11 +2015,14 @@ async def upload_project(
 
 
 
-    # Procesar keywords
-
-
-
-    keywords_list = [k.strip() for k in keywords.split(',') if k.strip()] if keywords else []
+    # Procesar keywords (se descartan repeticiones que solo difieren en acentos o mayúsculas)
+    keywords_list = []
+    keywords_normalized = []
+    for keyword in (keywords.split(',') if keywords else []):
+        normalized = normalize_keyword(keyword)
+        if normalized and normalized not in keywords_normalized:
+            keywords_list.append(" ".join(keyword.split()))
+            keywords_normalized.append(normalized)
 
 
 
@@ -1519,6 +2102,10 @@ async def upload_project(
 
 
 
+            "keywords_normalized": keywords_normalized,
+
+
+
             "subject": student.get("assigned_teacher", {}).get("subject_name", ""),
 
 
@@ -1595,7 +2182,15 @@ async def upload_project(
 
 
 
-                        "cloudinary": file_info.get("cloudinary", False)
+                        "cloudinary": file_info.get("cloudinary", False),
+
+
+
+                        "thumbnail_url": thumbnail_url,
+
+
+
+                        "metadata": pdf_metadata
 
 
 
@@ -1833,7 +2428,10 @@ async def check_student_can_create_project(student_id: str):
 
 
 
-async def download_file(file_id: str):
+async def download_file(
+    file_id: str,
+    viewer_id: Optional[str] = Query(None, description="Usuario que descarga el archivo")
+):
 
 
 
@@ -1953,6 +2551,10 @@ async def download_file(file_id: str):
 
 
 
+    record_project_read(project, "download_count", viewer_id)
+
+
+
     
 
 
@@ -2052,9 +2654,26 @@ async def download_file(file_id: str):
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
 
-    
+THUMBNAIL_NAME_PATTERN = re.compile(r"^[0-9a-f]{64}\.(webp|png)$")
 
 
+@router.get("/thumbnails/{student_id}/{thumbnail_name}")
+async def get_thumbnail(student_id: str, thumbnail_name: str):
+    """
+    Servir la miniatura de portada de un proyecto
 
+    El nombre es el hash del PDF, por lo que el contenido de una URL nunca
+    cambia y el navegador puede guardarla en caché de forma indefinida.
+    """
+    if not ObjectId.is_valid(student_id) or not THUMBNAIL_NAME_PATTERN.match(thumbnail_name):
+        raise HTTPException(status_code=404, detail="Miniatura no encontrada")
 
+    thumbnail_path = Thumbnails.get_directory(student_id) / thumbnail_name
+    if not thumbnail_path.exists():
+        raise HTTPException(status_code=404, detail="Miniatura no encontrada")
 
+    return FileResponse(
+        path=str(thumbnail_path),
+        media_type=f"image/{thumbnail_path.suffix.lstrip('.')}",
+        headers={"Cache-Control": "public, max-age=31536000, immutable"}
+    )
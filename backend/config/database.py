@@ -22,6 +22,13 @@ class DatabaseConfig:
     SYNC_LOGS_COLLECTION = "sync_logs"
     NOTIFICATIONS_COLLECTION = "notifications"
     ARCHIVED_FILES_COLLECTION = "archived_files"
+    READER_SKETCHES_COLLECTION = "project_reader_sketches"
+    TRENDING_COLLECTION = "trending_scores"
+    TEXT_LAYERS_COLLECTION = "pdf_text_layers"
+    DOCUMENT_TEXTS_COLLECTION = "document_texts"
+    ANNOTATIONS_COLLECTION = "document_annotations"
+    ANNOTATION_REVISIONS_COLLECTION = "annotation_revisions"
+    VERSION_DIFFS_COLLECTION = "version_diffs"
     
     # Configuración de storage
     MAX_FILE_SIZE_MB = 10
@@ -94,6 +101,7 @@ async def init_database():
     await db[DatabaseConfig.PROJECTS_COLLECTION].create_index("metadata.status")
     await db[DatabaseConfig.PROJECTS_COLLECTION].create_index("academic_info.career_code")
     await db[DatabaseConfig.PROJECTS_COLLECTION].create_index("academic_info.year")
+    await db[DatabaseConfig.PROJECTS_COLLECTION].create_index("academic_info.keywords_normalized")
     await db[DatabaseConfig.PROJECTS_COLLECTION].create_index("evaluation.assigned_to")
     await db[DatabaseConfig.PROJECTS_COLLECTION].create_index([("title", "text"), ("description", "text")])
     
@@ -125,4 +133,31 @@ async def init_database():
     await db[DatabaseConfig.NOTIFICATIONS_COLLECTION].create_index("read")
     await db[DatabaseConfig.NOTIFICATIONS_COLLECTION].create_index("created_at")
     
+    # Índices para project_reader_sketches
+    await db[DatabaseConfig.READER_SKETCHES_COLLECTION].create_index(
+        [("project_id", 1), ("period", 1)], unique=True
+    )
+    await db[DatabaseConfig.READER_SKETCHES_COLLECTION].create_index([("career_code", 1), ("period", 1)])
+    
+    # Índices para trending_scores
+    await db[DatabaseConfig.TRENDING_COLLECTION].create_index("project_id", unique=True)
+    
+    # Índices para pdf_text_layers
+    await db[DatabaseConfig.TEXT_LAYERS_COLLECTION].create_index(
+        [("pdf_sha256", 1), ("layer_version", 1), ("page", 1)], unique=True
+    )
+    
+    # Índices para document_annotations
+    await db[DatabaseConfig.ANNOTATIONS_COLLECTION].create_index(
+        [("project_id", 1), ("version", 1), ("page", 1)]
+    )
+    await db[DatabaseConfig.ANNOTATIONS_COLLECTION].create_index([("project_id", 1), ("id", 1)], unique=True)
+    # Cambios desde una revisión (canal de anotaciones en tiempo real)
+    await db[DatabaseConfig.ANNOTATIONS_COLLECTION].create_index([("project_id", 1), ("revision", 1)])
+    # Las anotaciones borradas se conservan como marcas y se purgan a los 30 días
+    await db[DatabaseConfig.ANNOTATIONS_COLLECTION].create_index("deleted_at", expireAfterSeconds=30 * 24 * 3600)
+    
+    # Comparaciones entre versiones: se recalculan si se piden después de 90 días
+    await db[DatabaseConfig.VERSION_DIFFS_COLLECTION].create_index("created_at", expireAfterSeconds=90 * 24 * 3600)
+    
     print("✅ Índices creados exitosamente")
@@ -28,6 +28,8 @@ from fastapi.staticfiles import StaticFiles
 
 from contextlib import asynccontextmanager
 
+import asyncio
+
 
 
 from pathlib import Path
@@ -42,12 +44,29 @@ from config.database import Database, DatabaseConfig
 
 
 
-from api import users, projects, careers, subjects, auth, feedback, docx_processor, pdf_evaluation, chat, storage, notifications, coordinator_projects, debug, debug_projects, simple_chat, group_responsibles
+from api import users, projects, careers, subjects, auth, feedback, docx_processor, pdf_evaluation, chat, storage, notifications, coordinator_projects, debug, debug_projects, simple_chat, group_responsibles, keywords, library, annotations
 
 
 
 from utils.file_storage import FileStorage
 
+from utils.path_index import path_index
+
+from utils.keyword_index import keyword_index
+
+from utils.workers import WorkerPool
+
+from utils.project_counters import project_counters
+
+from utils.reader_sketches import reader_sketches
+
+from utils.trending import trending_projects
+
+from utils.metrics import metrics
+
+from utils.precompute import submission_precompute
+
+from utils.libreoffice import office_pool
 
 
 
@@ -84,6 +103,24 @@ async def lifespan(app: FastAPI):
 
     FileStorage.initialize()  # Inicializar Cloudinary si está configurado
 
+    path_index.start()  # Índice de archivos subidos, construido en segundo plano
+
+    await keyword_index.rebuild()  # Índice de palabras clave para autocompletado
+
+    project_counters.start()  # Volcado periódico de vistas y descargas
+
+    reader_sketches.start()  # Volcado periódico de lectores únicos
+
+    await trending_projects.load()  # Último checkpoint del ranking de tendencias
+
+    trending_projects.start()
+
+    submission_precompute.start()  # Conversión y parseo nocturno de entregas pendientes
+
+    await WorkerPool.warm_up()  # Procesos de documentos listos antes de la primera petición
+
+    await office_pool.start()  # Instancias de LibreOffice si CONVERTER_BACKEND=libreoffice
+
 
 
     print("✅ Aplicación iniciada correctamente")
@@ -110,6 +147,18 @@ async def lifespan(app: FastAPI):
 
 
 
+    await project_counters.stop()  # Volcar contadores pendientes
+
+    await reader_sketches.stop()
+
+    await trending_projects.stop()
+
+    await submission_precompute.stop()
+
+    await office_pool.stop()
+
+    WorkerPool.shutdown()
+
     await Database.close_db()
 
 
@@ -262,6 +311,12 @@ app.include_router(simple_chat.router)
 
 app.include_router(group_responsibles.router)
 
+app.include_router(keywords.router)
+
+app.include_router(library.router)
+
+app.include_router(annotations.router)
+
 
 
 # Montar archivos estáticos DESPUÉS de los routers
@@ -430,6 +485,15 @@ async def health_check():
 
 
 
+@app.get("/metrics")
+async def get_metrics():
+    """Contadores internos (aciertos de caché, expulsiones...) desde el arranque"""
+    # El cálculo inicial del tamaño de las cachés recorre el disco
+    return await asyncio.to_thread(metrics.snapshot)
+
+
+
+
 
 
 
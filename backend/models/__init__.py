@@ -12,6 +12,7 @@ from .career import Career, UniversitySync
 from .report import Report, ReportFile, GeneratedFor
 from .sync_log import SyncLog, SyncStats, SyncError
 from .notification import Notification
+from .annotation import DocumentAnnotation
 
 __all__ = [
     "User",
@@ -39,4 +40,5 @@ __all__ = [
     "SyncStats",
     "SyncError",
     "Notification",
+    "DocumentAnnotation",
 ]
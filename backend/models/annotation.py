@@ -0,0 +1,91 @@
+"""
+Modelo de Anotación de documento
+Esquema único de las anotaciones de los visores PDF y DOCX, guardadas en
+la colección document_annotations
+"""
+from datetime import datetime
+from typing import Optional, List, Dict, Any
+from pydantic import BaseModel, Field
+from bson import ObjectId
+
+
+class PyObjectId(ObjectId):
+    @classmethod
+    def __get_pydantic_core_schema__(cls, source_type, handler):
+        from pydantic_core import core_schema
+        return core_schema.union_schema([
+            core_schema.is_instance_schema(ObjectId),
+            core_schema.no_info_plain_validator_function(cls.validate),
+        ])
+
+    @classmethod
+    def validate(cls, v):
+        if isinstance(v, ObjectId):
+            return v
+        if isinstance(v, str) and ObjectId.is_valid(v):
+            return ObjectId(v)
+        raise ValueError("Invalid ObjectId")
+
+
+# Visor que creó la anotación
+ANNOTATION_SOURCES = ("pdf", "docx", "legacy")
+
+
+class DocumentAnnotation(BaseModel):
+    """
+    Anotación sobre una versión del documento de un proyecto
+
+    Se identifica por (project_id, id); version y page permiten leer con una
+    sola consulta indexada las anotaciones de una versión o de una página.
+    """
+    id: str = Field(..., description="Identificador asignado por el visor")
+    project_id: PyObjectId
+    version: int = Field(1, description="version_number de la versión anotada")
+    source: str = Field("pdf", description="pdf, docx, legacy")
+    page: int = 1
+
+    type: str = Field("highlight", description="highlight, underline, strikeout, comment, error, suggestion")
+    color: Optional[str] = None
+    comment: str = ""
+    selected_text: Optional[str] = None
+
+    # Visor PDF: rectángulo normalizado [x0, y0, x1, y1]
+    rect: Optional[List[float]] = None
+    # Visor DOCX: posición de la caja y elementos del HTML vinculados
+    position: Optional[Dict[str, float]] = None
+    paragraph_id: Optional[str] = None
+    anchor_id: Optional[str] = None
+    # Datos propios de otros orígenes (anotaciones migradas)
+    data: Optional[Dict[str, Any]] = None
+
+    author_id: Optional[str] = None
+    author_name: Optional[str] = None
+    created_at: Optional[str] = None
+    updated_at: Optional[datetime] = None
+
+    # Control de cambios (utils.annotation_store)
+    revision: int = 0
+    created_revision: Optional[int] = None
+    content_hash: Optional[str] = None
+    deleted: bool = False
+    deleted_at: Optional[datetime] = None
+
+    class Config:
+        arbitrary_types_allowed = True
+        json_encoders = {ObjectId: str}
+        schema_extra = {
+            "example": {
+                "id": "anno_1718035200000",
+                "project_id": "507f1f77bcf86cd799439011",
+                "version": 1,
+                "source": "pdf",
+                "page": 3,
+                "type": "highlight",
+                "color": "yellow",
+                "comment": "Falta citar la fuente",
+                "selected_text": "Según estudios recientes...",
+                "rect": [0.12, 0.30, 0.58, 0.34],
+                "author_id": "507f1f77bcf86cd799439012",
+                "author_name": "Prof. Martínez"
+            }
+        }
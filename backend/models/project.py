@@ -37,6 +37,9 @@ class FileMetadata(BaseModel):
     """Metadata del archivo"""
     pages: Optional[int] = None
     word_count: Optional[int] = None
+    page_sizes: Optional[List[List[float]]] = None  # [ancho, alto] en puntos por página
+    pdf_version: Optional[str] = None
+    analyzed_at: Optional[datetime] = None
     created_at: Optional[datetime] = None
 
 
@@ -0,0 +1,73 @@
+"""
+Script para normalizar las palabras clave de los proyectos existentes
+Completa academic_info.keywords_normalized, usado por el filtro de la biblioteca
+"""
+import asyncio
+import sys
+from pathlib import Path
+from datetime import datetime
+
+from pymongo import UpdateOne
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from config.database import Database, DatabaseConfig
+from utils.keyword_index import normalize_keyword
+
+
+async def backfill_keywords():
+    """Calcular las palabras clave normalizadas de cada proyecto"""
+    print("🔄 Normalizando palabras clave de proyectos...")
+
+    projects_collection = Database.get_collection(DatabaseConfig.PROJECTS_COLLECTION)
+    projects = await projects_collection.find(
+        {"academic_info.keywords.0": {"$exists": True}},
+        {"academic_info.keywords": 1, "academic_info.keywords_normalized": 1}
+    ).to_list(length=None)
+
+    operations = []
+    for project in projects:
+        keywords = project.get("academic_info", {}).get("keywords", [])
+        normalized = []
+        for keyword in keywords:
+            value = normalize_keyword(keyword) if isinstance(keyword, str) else ""
+            if value and value not in normalized:
+                normalized.append(value)
+
+        if normalized != project.get("academic_info", {}).get("keywords_normalized"):
+            operations.append(UpdateOne(
+                {"_id": project["_id"]},
+                {"$set": {
+                    "academic_info.keywords_normalized": normalized,
+                    "updated_at": datetime.utcnow()
+                }}
+            ))
+
+    if operations:
+        await projects_collection.bulk_write(operations, ordered=False)
+
+    print(f"   ✅ {len(operations)} de {len(projects)} proyectos actualizados")
+    return len(operations)
+
+
+async def main():
+    """Función principal"""
+    print("=" * 60)
+    print("🔑 NORMALIZACIÓN DE PALABRAS CLAVE")
+    print("=" * 60)
+    print()
+
+    try:
+        await Database.connect_db()
+        await backfill_keywords()
+        print()
+        print("✅ Normalización completada")
+    except Exception as e:
+        print(f"❌ Error en la normalización: {e}")
+        sys.exit(1)
+    finally:
+        await Database.close_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
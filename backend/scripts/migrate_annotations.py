@@ -0,0 +1,169 @@
+"""
+Script para migrar las anotaciones a la colección común document_annotations
+Copia las de pdf_annotations (visor PDF), docx_annotations (visor DOCX) y
+annotations (API antigua) al esquema de models.annotation.DocumentAnnotation,
+asignándoles la versión actual de su proyecto
+
+Es idempotente: una anotación que ya existe en document_annotations no se
+toca, así que puede volver a ejecutarse sin pisar cambios posteriores. Las
+colecciones antiguas no se borran.
+
+Uso:
+    python scripts/migrate_annotations.py [--dry-run]
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+from datetime import datetime
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from config.database import Database, DatabaseConfig
+from utils.annotation_store import AnnotationStore, content_hash
+
+BATCH_SIZE = 1000
+
+
+def from_pdf(document: dict) -> dict:
+    """Anotación de pdf_annotations -> campos comunes"""
+    return {
+        "id": document.get("id") or str(document["_id"]),
+        "page": document.get("page", 1),
+        "type": document.get("type", "highlight"),
+        "color": document.get("color"),
+        "comment": document.get("comment") or "",
+        "selected_text": document.get("selected_text"),
+        "rect": document.get("rect"),
+        "author_id": document.get("author_id"),
+        "author_name": document.get("author_name"),
+        "created_at": document.get("created_at")
+    }
+
+
+def from_docx(document: dict) -> dict:
+    """Anotación de docx_annotations -> campos comunes"""
+    return {
+        "id": document.get("id") or str(document["_id"]),
+        "type": document.get("type", "comment"),
+        "comment": document.get("text_content") or "",
+        "selected_text": document.get("selected_text"),
+        "position": document.get("position"),
+        "paragraph_id": document.get("paragraph_id"),
+        "anchor_id": document.get("anchor_id"),
+        "author_name": document.get("created_by"),
+        "created_at": document.get("created_at")
+    }
+
+
+def from_legacy(document: dict) -> dict:
+    """Anotación de la colección annotations (API antigua) -> campos comunes"""
+    created_at = document.get("created_at")
+    return {
+        "id": f"legacy_{document['_id']}",
+        "page": document.get("page", 1),
+        "type": document.get("type", "correction"),
+        "comment": document.get("comment") or "",
+        "data": document.get("annotation_data"),
+        "author_id": str(document["created_by"]) if document.get("created_by") else None,
+        "created_at": created_at.isoformat() if isinstance(created_at, datetime) else created_at
+    }
+
+
+SOURCES = [
+    ("pdf_annotations", "pdf", from_pdf),
+    ("docx_annotations", "docx", from_docx),
+    ("annotations", "legacy", from_legacy),
+]
+
+
+async def migrate_annotations(dry_run: bool = False) -> dict:
+    """Copiar las anotaciones de las colecciones antiguas"""
+    target = Database.get_collection(DatabaseConfig.ANNOTATIONS_COLLECTION)
+    versions = {}
+    totals = {}
+
+    for collection_name, source, convert in SOURCES:
+        print(f"🔄 Migrando {collection_name} ({source})...")
+        collection = Database.get_collection(collection_name)
+        operations = []
+        read = 0
+        inserted = 0
+        skipped = 0
+
+        async def flush():
+            nonlocal inserted
+            if operations and not dry_run:
+                result = await target.bulk_write(operations, ordered=False)
+                inserted += result.upserted_count
+            operations.clear()
+
+        async for document in collection.find({"deleted": {"$ne": True}}):
+            read += 1
+            project_id = str(document.get("project_id") or "")
+            if not ObjectId.is_valid(project_id):
+                skipped += 1
+                continue
+
+            if project_id not in versions:
+                versions[project_id] = await AnnotationStore.current_version(project_id)
+            version = versions[project_id]
+
+            try:
+                annotation = AnnotationStore.normalize(convert(document), project_id, version, source)
+            except (ValueError, TypeError) as e:
+                print(f"   ⚠️ Anotación {document['_id']} omitida: {e}")
+                skipped += 1
+                continue
+
+            operations.append(UpdateOne(
+                {"project_id": ObjectId(project_id), "id": annotation["id"]},
+                {"$setOnInsert": {
+                    **annotation,
+                    "project_id": ObjectId(project_id),
+                    "version": version,
+                    "source": source,
+                    "content_hash": content_hash(annotation),
+                    "revision": 0,
+                    "updated_at": datetime.utcnow()
+                }},
+                upsert=True
+            ))
+            if len(operations) >= BATCH_SIZE:
+                await flush()
+
+        await flush()
+        totals[collection_name] = {"read": read, "inserted": inserted, "skipped": skipped}
+        print(f"   ✅ {read} leídas, {inserted} nuevas, {skipped} omitidas")
+
+    return totals
+
+
+async def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description="Migrar anotaciones a document_annotations")
+    parser.add_argument("--dry-run", action="store_true", help="Solo leer y validar, sin escribir")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("📝 MIGRACIÓN DE ANOTACIONES")
+    print("=" * 60)
+    print()
+
+    try:
+        await Database.connect_db()
+        await migrate_annotations(args.dry_run)
+        print()
+        print("✅ Migración completada" + (" (sin escribir, --dry-run)" if args.dry_run else ""))
+    except Exception as e:
+        print(f"❌ Error en la migración: {e}")
+        sys.exit(1)
+    finally:
+        await Database.close_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,63 @@
+"""
+Script para convertir y parsear las entregas DOCX pendientes
+Útil justo después de una fecha de entrega, para que los docentes no esperen
+la conversión al abrir cada documento por primera vez
+
+Uso:
+    python scripts/precompute_submissions.py [--concurrency N] [--limit N] [--restart] [--dry-run]
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from config.database import Database
+from utils.libreoffice import office_pool
+from utils.precompute import submission_precompute
+from utils.workers import WorkerPool
+
+
+async def main(args: argparse.Namespace):
+    """Función principal"""
+    print("=" * 60)
+    print("🌙 PRECÁLCULO DE ENTREGAS")
+    print("=" * 60)
+    print()
+
+    try:
+        await Database.connect_db()
+
+        if args.dry_run:
+            pending = await submission_precompute.scan(args.limit)
+            for entry in pending:
+                tasks = [name for name, needed in (("PDF", entry["needs_pdf"]), ("parseo", entry["needs_parse"])) if needed]
+                print(f"   • {entry['project_id']} {entry['project'].get('title', '')[:50]}: {', '.join(tasks)}")
+            print()
+            print(f"📋 {len(pending)} proyectos pendientes")
+            return
+
+        # Mismo convertidor (y misma clave de caché) que la aplicación
+        await office_pool.start()
+        progress = await submission_precompute.run(args.concurrency, args.limit, resume=not args.restart)
+        for project_id, error in progress["errors"].items():
+            print(f"   ❌ {project_id}: {error}")
+        print()
+        print("✅ Precálculo completado")
+    except Exception as e:
+        print(f"❌ Error en el precálculo: {e}")
+        sys.exit(1)
+    finally:
+        await office_pool.stop()
+        WorkerPool.shutdown()
+        await Database.close_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convertir y parsear las entregas DOCX pendientes")
+    parser.add_argument("--concurrency", type=int, default=None, help="Documentos procesados a la vez")
+    parser.add_argument("--limit", type=int, default=None, help="Máximo de proyectos a procesar")
+    parser.add_argument("--restart", action="store_true", help="Ignorar el checkpoint de un recorrido interrumpido")
+    parser.add_argument("--dry-run", action="store_true", help="Solo listar los proyectos pendientes")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,43 @@
+"""
+Prueba de las anclas de párrafo del HTML de los DOCX (utils.docx_html)
+
+Ejecutar desde backend/: python test_docx_anchors.py (o con pytest)
+"""
+import re
+
+from utils.docx_html import add_paragraph_anchors
+
+
+def anchor_ids(html):
+    return re.findall(r'<p[^>]* id="([^"]+)"', html)
+
+
+def test_resync_after_unmatched_paragraphs():
+    """Más de MATCH_LOOKAHEAD párrafos seguidos sin coincidir (llamadas a notas al pie)"""
+    texts = ["A1", "B2", "C3", "D4", "E5", "F6", "G7"]
+    paragraphs = [{"id": f"p{index}", "text": text} for index, text in enumerate(texts)]
+    # mammoth añade la llamada a la nota al pie; python-docx no la incluye en el texto
+    html = "".join(f'<p>{text}<sup><a href="#fn{index}">[{index}]</a></sup></p>'
+                   for index, text in enumerate(texts[:4]))
+    html += "".join(f"<p>{text}</p>" for text in texts[4:])
+
+    result, _, _ = add_paragraph_anchors(html, paragraphs, {})
+
+    assert anchor_ids(result) == ["b0", "b1", "b2", "b3", "p4", "p5", "p6"]
+
+
+def test_repeated_text_does_not_jump_ahead():
+    """Un texto repetido lejos no se empareja fuera de MATCH_LOOKAHEAD"""
+    texts = ["Intro", "X1", "X2", "X3", "X4", "X5", "Tabla", "Fin"]
+    paragraphs = [{"id": f"p{index}", "text": text} for index, text in enumerate(texts)]
+    html = "<p>Tabla</p>" + "".join(f"<p>{text}</p>" for text in texts)
+
+    result, _, _ = add_paragraph_anchors(html, paragraphs, {})
+
+    assert anchor_ids(result) == ["b0", "p0", "p1", "p2", "p3", "p4", "p5", "p6", "p7"]
+
+
+if __name__ == "__main__":
+    test_resync_after_unmatched_paragraphs()
+    test_repeated_text_does_not_jump_ahead()
+    print("✅ Anclas de párrafo correctas")
@@ -0,0 +1,261 @@
+"""
+Índice espacial de las anotaciones de una página
+R-tree en memoria, por (proyecto, versión, página), para filtrar por el
+rectángulo visible del visor y para saber qué anotación hay bajo un clic
+"""
+import math
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from .annotation_store import annotation_store
+
+
+Rect = Tuple[float, float, float, float]
+
+
+def normalize_rect(rect: List[float]) -> Rect:
+    """[x0, y0, x1, y1] con las esquinas en cualquier orden -> (min x, min y, max x, max y)"""
+    x0, y0, x1, y1 = (float(value) for value in rect[:4])
+    return min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1)
+
+
+# Máximo de páginas por consulta (pages=1-5000 no debe leer toda la tesis de golpe)
+MAX_PAGES_PER_QUERY = 200
+
+
+def parse_pages(value: str) -> List[int]:
+    """
+    "1,3,5-8" -> [1, 3, 5, 6, 7, 8]
+
+    Raises:
+        ValueError: si el formato no es válido o pide más de MAX_PAGES_PER_QUERY páginas
+    """
+    pages = set()
+    for part in value.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        first, _, last = part.partition("-")
+        try:
+            start = int(first)
+            end = int(last) if last else start
+        except ValueError:
+            raise ValueError(f"Rango de páginas inválido: {part}")
+        if start < 1 or end < start:
+            raise ValueError(f"Rango de páginas inválido: {part}")
+        if end - start + 1 > MAX_PAGES_PER_QUERY:
+            raise ValueError(f"Se pueden pedir como máximo {MAX_PAGES_PER_QUERY} páginas")
+        # Los rangos que se solapan ("1-199,1-5") cuentan sus páginas una vez
+        pages.update(range(start, end + 1))
+        if len(pages) > MAX_PAGES_PER_QUERY:
+            raise ValueError(f"Se pueden pedir como máximo {MAX_PAGES_PER_QUERY} páginas")
+    if not pages:
+        raise ValueError("No se indicó ninguna página")
+    return sorted(pages)
+
+
+def parse_rect(value: str) -> Rect:
+    """
+    "x0,y0,x1,y1" (normalizadas, como Annotation.rect) -> rectángulo
+
+    Raises:
+        ValueError: si no son cuatro números
+    """
+    try:
+        values = [float(part) for part in value.split(",")]
+    except ValueError:
+        raise ValueError("rect debe ser x0,y0,x1,y1")
+    if len(values) != 4 or not all(math.isfinite(v) for v in values):
+        raise ValueError("rect debe ser x0,y0,x1,y1")
+    return normalize_rect(values)
+
+
+def _bounds(rects: List[Rect]) -> Rect:
+    return (
+        min(r[0] for r in rects),
+        min(r[1] for r in rects),
+        max(r[2] for r in rects),
+        max(r[3] for r in rects)
+    )
+
+
+def _intersects(a: Rect, b: Rect) -> bool:
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+class PageAnnotationTree:
+    """
+    R-tree estático de los rectángulos de las anotaciones de una página
+
+    Se construye de una vez con Sort-Tile-Recursive: los rectángulos se
+    ordenan por x en franjas verticales y cada franja por y, y se agrupan en
+    nodos de NODE_CAPACITY hijos, nivel a nivel hasta la raíz. Una consulta
+    solo desciende por los nodos cuya caja toca el rectángulo buscado. Las
+    anotaciones sin rect no entran en el árbol.
+    """
+
+    NODE_CAPACITY = 8
+
+    def __init__(self, annotations: List[dict]):
+        self.annotations = annotations
+        entries = []
+        for index, annotation in enumerate(annotations):
+            rect = annotation.get("rect")
+            if rect and len(rect) >= 4:
+                entries.append((normalize_rect(rect), index))
+
+        # Cada nodo es (caja, hijos, es_hoja); en las hojas los hijos son (rect, índice)
+        self.root = None
+        level = [(rect, index, True) for rect, index in entries]
+        leaf_level = True
+        while level:
+            nodes = self._pack(level, leaf_level)
+            leaf_level = False
+            if len(nodes) == 1:
+                self.root = nodes[0]
+                break
+            level = nodes
+
+    def _pack(self, items: list, leaf_level: bool) -> list:
+        """Agrupar un nivel en nodos de NODE_CAPACITY elementos (Sort-Tile-Recursive)"""
+        capacity = self.NODE_CAPACITY
+        node_count = math.ceil(len(items) / capacity)
+        slice_size = math.ceil(math.sqrt(node_count)) * capacity
+
+        items = sorted(items, key=lambda item: item[0][0] + item[0][2])
+        nodes = []
+        for start in range(0, len(items), slice_size):
+            tile = sorted(items[start:start + slice_size], key=lambda item: item[0][1] + item[0][3])
+            for offset in range(0, len(tile), capacity):
+                children = tile[offset:offset + capacity]
+                if leaf_level:
+                    children = [(rect, index) for rect, index, _ in children]
+                nodes.append((_bounds([child[0] for child in children]), children, leaf_level))
+        return nodes
+
+    def __len__(self) -> int:
+        return len(self.annotations)
+
+    def search(self, rect: List[float]) -> List[int]:
+        """Índices de las anotaciones cuyo rectángulo toca rect, en el orden de la lista"""
+        if self.root is None:
+            return []
+        query = normalize_rect(rect)
+
+        found = []
+        stack = [self.root]
+        while stack:
+            box, children, leaf = stack.pop()
+            if not _intersects(box, query):
+                continue
+            if leaf:
+                found.extend(index for child_rect, index in children if _intersects(child_rect, query))
+            else:
+                stack.extend(children)
+        return sorted(found)
+
+    def intersecting(self, rect: List[float]) -> List[dict]:
+        """Anotaciones con rectángulo que toca rect (las que se ven en ese recorte de la página)"""
+        return [self.annotations[index] for index in self.search(rect)]
+
+    def hit(self, x: float, y: float, tolerance: float = 0.0) -> List[dict]:
+        """
+        Anotaciones bajo un punto, la más pequeña primero
+
+        Con anotaciones superpuestas (un comentario dentro de un resaltado),
+        la de menor área es la que el usuario ve encima y quiere seleccionar.
+        """
+        indices = self.search([x - tolerance, y - tolerance, x + tolerance, y + tolerance])
+
+        def area(index: int) -> float:
+            x0, y0, x1, y1 = normalize_rect(self.annotations[index]["rect"])
+            return (x1 - x0) * (y1 - y0)
+
+        return [self.annotations[index] for index in sorted(indices, key=area)]
+
+
+class AnnotationTrees:
+    """
+    Árboles de las páginas consultadas recientemente
+
+    Cada árbol recuerda la revisión confirmada del proyecto con la que se
+    construyó; si el proyecto tiene una más nueva (cualquier guardado,
+    borrado u operación del canal) se vuelve a leer la página de MongoDB.
+    Se usa la confirmada y no la reservada: una página leída mientras una
+    escritura aún no termina queda guardada con la revisión anterior, y se
+    relee en cuanto esa escritura se confirma.
+    """
+
+    MEMORY_PAGES = 256
+
+    def __init__(self):
+        self._trees: "OrderedDict[tuple, Tuple[int, PageAnnotationTree]]" = OrderedDict()
+
+    async def get_page(
+        self,
+        project_id: str,
+        version: int,
+        page: int,
+        source: Optional[str] = "pdf",
+        revision: Optional[int] = None
+    ) -> PageAnnotationTree:
+        """
+        Árbol de las anotaciones vigentes de una página
+
+        Args:
+            revision: Revisión confirmada del proyecto (annotation_store.revision),
+                      si quien llama ya la leyó
+        """
+        trees = await self.get_pages(project_id, version, [page], source, revision)
+        return trees[page]
+
+    async def get_pages(
+        self,
+        project_id: str,
+        version: int,
+        pages: List[int],
+        source: Optional[str] = "pdf",
+        revision: Optional[int] = None
+    ) -> Dict[int, PageAnnotationTree]:
+        """
+        Árboles de varias páginas (las visibles en el visor)
+
+        Las páginas que no están en memoria o son de una revisión anterior
+        se leen con una sola consulta a MongoDB.
+
+        Returns:
+            página -> árbol, para todas las páginas pedidas
+        """
+        if revision is None:
+            revision = await annotation_store.revision(project_id)
+
+        trees: Dict[int, PageAnnotationTree] = {}
+        missing = []
+        for page in pages:
+            key = (project_id, version, page, source)
+            cached = self._trees.get(key)
+            if cached is not None and cached[0] == revision:
+                self._trees.move_to_end(key)
+                trees[page] = cached[1]
+            else:
+                missing.append(page)
+        if not missing:
+            return trees
+
+        by_page: Dict[int, List[dict]] = {page: [] for page in missing}
+        for annotation in await annotation_store.find(project_id, version, source, pages=missing):
+            by_page.setdefault(annotation["page"], []).append(annotation)
+
+        for page in missing:
+            tree = PageAnnotationTree(by_page[page])
+            trees[page] = tree
+            key = (project_id, version, page, source)
+            self._trees[key] = (revision, tree)
+            self._trees.move_to_end(key)
+        while len(self._trees) > self.MEMORY_PAGES:
+            self._trees.popitem(last=False)
+        return trees
+
+
+# Instancia global de los árboles de anotaciones
+annotation_trees = AnnotationTrees()
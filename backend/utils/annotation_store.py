@@ -0,0 +1,451 @@
+"""
+Almacén de anotaciones de los documentos
+Una sola colección (document_annotations) para los visores PDF y DOCX.
+Compara la lista que envía el visor con la guardada y escribe, en un solo
+bulk_write, solo las anotaciones nuevas, modificadas o eliminadas
+"""
+import asyncio
+import hashlib
+import json
+import time
+from datetime import datetime
+from typing import List, Optional
+
+from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from config.database import Database, DatabaseConfig
+from models.annotation import DocumentAnnotation
+
+
+class RevisionConflict(Exception):
+    """La lista se editó a partir de una revisión que ya no es la actual"""
+
+    def __init__(self, current_revision: int):
+        super().__init__(f"Las anotaciones cambiaron (revisión actual {current_revision})")
+        self.current_revision = current_revision
+
+
+def content_hash(document: dict) -> str:
+    """
+    Huella del contenido de una anotación, para saber si cambió
+
+    created_at no cuenta: el visor la recibe al recargar y la devuelve en el
+    siguiente guardado aunque la anotación no se haya tocado.
+    """
+    content = {key: value for key, value in document.items() if key != "created_at"}
+    encoded = json.dumps(content, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+# Campos de models.annotation.DocumentAnnotation que escribe el visor
+CONTENT_FIELDS = {
+    "page", "type", "color", "comment", "selected_text", "rect", "position",
+    "paragraph_id", "anchor_id", "data", "author_id", "author_name", "created_at"
+}
+
+
+class AnnotationStore:
+    """
+    Anotaciones guardadas por diferencias
+
+    Cada anotación es un documento identificado por (project_id, id) y
+    asociado a una versión del proyecto y al visor que la creó (source). Al
+    guardar la lista completa de un visor para una versión:
+    - las nuevas o con contenido distinto se escriben con un upsert
+    - las que ya no están se marcan como borradas (deleted) en vez de
+      eliminarse; el índice TTL sobre deleted_at las purga después
+    - las que no cambiaron no se tocan
+
+    Cada proyecto tiene un número de revisión, común a sus versiones y
+    visores, que sube con cada guardado.
+    El visor envía la revisión sobre la que editó; si otro guardado la
+    cambió entretanto, se rechaza con RevisionConflict en lugar de pisarlo.
+
+    La revisión se reserva antes de escribir, así que dos escrituras pueden
+    terminar en otro orden. Por eso el documento de revisiones lleva además
+    committed: la última revisión hasta la que todas las escrituras ya
+    terminaron. Solo avanza en orden, y es la que se devuelve a los visores,
+    al canal y a la caché de árboles.
+    """
+
+    # Campos internos que no se devuelven al visor
+    INTERNAL_FIELDS = {"content_hash": 0, "deleted": 0, "deleted_at": 0}
+    # Espera máxima a que terminen las escrituras de revisiones anteriores;
+    # pasado ese tiempo se da por perdida la que falta (proceso caído)
+    COMMIT_TIMEOUT_SECONDS = 10.0
+
+    def __init__(self, collection_name: str):
+        self.collection_name = collection_name
+
+    @property
+    def collection(self):
+        return Database.get_collection(self.collection_name)
+
+    @staticmethod
+    def live_filter(project_id: str, version: Optional[int] = None, source: Optional[str] = None) -> dict:
+        """
+        Filtro de las anotaciones vigentes (sin borrar) de un proyecto
+
+        Sigue el orden del índice (project_id, version, page): con o sin
+        versión, la consulta usa el índice.
+        """
+        query = {"project_id": ObjectId(project_id)}
+        if version is not None:
+            query["version"] = version
+        if source is not None:
+            query["source"] = source
+        query["deleted"] = {"$ne": True}
+        return query
+
+    @staticmethod
+    async def current_version(project_id: str) -> int:
+        """version_number de la versión actual del proyecto (la que muestran los visores)"""
+        projects_collection = Database.get_collection(DatabaseConfig.PROJECTS_COLLECTION)
+        project = await projects_collection.find_one(
+            {"_id": ObjectId(project_id)},
+            {"metadata.current_version": 1}
+        )
+        return ((project or {}).get("metadata") or {}).get("current_version") or 1
+
+    async def find(
+        self,
+        project_id: str,
+        version: Optional[int] = None,
+        source: Optional[str] = None,
+        projection: Optional[dict] = None,
+        pages: Optional[List[int]] = None
+    ) -> List[dict]:
+        """
+        Anotaciones vigentes de un proyecto, ordenadas por página
+
+        Con pages solo se leen esas páginas; con versión, el filtro cae
+        dentro del índice (project_id, version, page).
+        """
+        query = self.live_filter(project_id, version, source)
+        if pages is not None:
+            query["page"] = {"$in": list(pages)}
+        return await self.collection.find(
+            query,
+            projection or self.INTERNAL_FIELDS
+        ).sort("page", 1).to_list(length=None)
+
+    def _revision_id(self, project_id: str) -> str:
+        return project_id
+
+    async def revision(self, project_id: str) -> int:
+        """
+        Revisión confirmada de las anotaciones de un proyecto (0 si nunca se
+        guardaron): todas las escrituras hasta ella ya están en la colección
+        """
+        revisions_collection = Database.get_collection(DatabaseConfig.ANNOTATION_REVISIONS_COLLECTION)
+        document = await revisions_collection.find_one({"_id": self._revision_id(project_id)})
+        if document is None:
+            return 0
+        return document.get("committed", document["revision"])
+
+    async def _next_revision(self, project_id: str, base_revision: Optional[int]) -> int:
+        """
+        Reservar la siguiente revisión
+
+        Con base_revision el incremento es condicional: solo uno de dos
+        guardados concurrentes sobre la misma revisión lo consigue.
+        """
+        revisions_collection = Database.get_collection(DatabaseConfig.ANNOTATION_REVISIONS_COLLECTION)
+        query = {"_id": self._revision_id(project_id)}
+        if base_revision is not None:
+            query["revision"] = base_revision
+
+        try:
+            document = await revisions_collection.find_one_and_update(
+                query,
+                # Pipeline: un documento creado antes de existir committed lo
+                # inicia con su revisión (entonces no quedaban escrituras pendientes)
+                [{"$set": {
+                    "committed": {"$ifNull": ["$committed", {"$ifNull": ["$revision", 0]}]},
+                    "revision": {"$add": [{"$ifNull": ["$revision", 0]}, 1]},
+                    "updated_at": datetime.utcnow()
+                }}],
+                # Sin revisión previa (base 0) el documento se crea
+                upsert=base_revision is None or base_revision == 0,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            document = None
+
+        if document is None:
+            raise RevisionConflict(await self.revision(project_id))
+        return document["revision"]
+
+    async def _advance(self, project_id: str) -> int:
+        """
+        Avanzar committed por las revisiones consecutivas ya escritas
+
+        Returns:
+            committed tras avanzar
+        """
+        revisions_collection = Database.get_collection(DatabaseConfig.ANNOTATION_REVISIONS_COLLECTION)
+        revision_id = self._revision_id(project_id)
+        while True:
+            document = await revisions_collection.find_one({"_id": revision_id})
+            committed = document["committed"]
+            done = set(document.get("done", []))
+            ready = []
+            while committed + len(ready) + 1 in done:
+                ready.append(committed + len(ready) + 1)
+            if not ready:
+                return committed
+            # Condicional: si otro guardado avanzó antes, se relee y se sigue desde ahí
+            await revisions_collection.update_one(
+                {"_id": revision_id, "committed": committed},
+                {"$set": {"committed": ready[-1]}, "$pull": {"done": {"$lte": ready[-1]}}}
+            )
+
+    async def _commit(self, project_id: str, revision: int):
+        """
+        Marcar escrita una revisión (con éxito o no) y esperar a que lo estén
+        todas las anteriores, para que al volver committed ya la incluya
+        """
+        revisions_collection = Database.get_collection(DatabaseConfig.ANNOTATION_REVISIONS_COLLECTION)
+        revision_id = self._revision_id(project_id)
+        await revisions_collection.update_one({"_id": revision_id}, {"$addToSet": {"done": revision}})
+
+        deadline = time.monotonic() + self.COMMIT_TIMEOUT_SECONDS
+        delay = 0.005
+        while await self._advance(project_id) < revision:
+            if time.monotonic() > deadline:
+                print(f"⚠️ Revisiones de anotaciones sin terminar en el proyecto {project_id}; "
+                      f"se confirma hasta {revision}")
+                await revisions_collection.update_one(
+                    {"_id": revision_id},
+                    {"$max": {"committed": revision}, "$pull": {"done": {"$lte": revision}}}
+                )
+                return
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.2)
+
+    async def save(
+        self,
+        project_id: str,
+        version: int,
+        source: str,
+        annotations: List[dict],
+        base_revision: Optional[int] = None
+    ) -> dict:
+        """
+        Guardar la lista completa de anotaciones de un visor para una versión
+
+        Args:
+            version: version_number de la versión anotada
+            source: Visor que guarda ("pdf" o "docx"); solo se comparan y
+                    marcan como borradas las anotaciones de ese visor
+            annotations: Documentos con los campos de DocumentAnnotation,
+                         cada uno con su "id"; si no traen created_at se les
+                         asigna al insertarlos
+            base_revision: Revisión sobre la que editó el visor (None = sin
+                           control de concurrencia)
+
+        Returns:
+            dict con revision, upserted, updated, deleted y unchanged; sin
+            cambios no se reserva revisión y se devuelve la confirmada
+
+        Raises:
+            RevisionConflict: si base_revision ya no es la revisión actual
+        """
+        # Validar toda la lista y calcular las diferencias antes de reservar
+        # la revisión: una anotación inválida o un guardado sin cambios
+        # (autoguardado) no deben mover el contador (409 y cachés invalidadas)
+        normalized = [self.normalize(annotation, project_id, version, source) for annotation in annotations]
+
+        stored = {
+            document["id"]: document.get("content_hash")
+            for document in await self.collection.find(
+                self.live_filter(project_id, version, source), {"_id": 0, "id": 1, "content_hash": 1}
+            ).to_list(length=None)
+        }
+
+        upserts = []
+        changed = 0
+        new = 0
+        sent_ids = set()
+        for annotation in normalized:
+            sent_ids.add(annotation["id"])
+            digest = content_hash(annotation)
+            if stored.get(annotation["id"]) == digest:
+                continue
+
+            upserts.append((annotation, digest))
+            if annotation["id"] in stored:
+                changed += 1
+            else:
+                new += 1
+
+        removed = [annotation_id for annotation_id in stored if annotation_id not in sent_ids]
+
+        if not upserts and not removed:
+            return {
+                "revision": await self.revision(project_id),
+                "upserted": 0,
+                "updated": 0,
+                "deleted": 0,
+                "unchanged": len(sent_ids)
+            }
+
+        revision = await self._next_revision(project_id, base_revision)
+        project_object_id = ObjectId(project_id)
+        now = datetime.utcnow()
+        operations = [
+            self._upsert(project_object_id, version, source, annotation, digest, revision, now)
+            for annotation, digest in upserts
+        ]
+        for annotation_id in removed:
+            operations.append(self._tombstone(project_object_id, annotation_id, revision, now))
+
+        try:
+            await self.collection.bulk_write(operations, ordered=False)
+        finally:
+            await self._commit(project_id, revision)
+
+        return {
+            "revision": revision,
+            "upserted": new,
+            "updated": changed,
+            "deleted": len(removed),
+            "unchanged": len(sent_ids) - new - changed
+        }
+
+    async def apply(self, project_id: str, operations: List[dict]) -> int:
+        """
+        Aplicar operaciones sueltas (canal en tiempo real)
+
+        Cada operación es {"op": "add" | "update" | "delete", "version",
+        "source"} con "annotation" (add/update) o "id" (delete). No hay
+        control de revisión: cada operación toca una sola anotación y la
+        última en llegar gana.
+
+        Returns:
+            Revisión (número de secuencia) asignada a las operaciones
+
+        Raises:
+            ValueError: si alguna operación no es válida (no se aplica ninguna)
+        """
+        project_object_id = ObjectId(project_id)
+        prepared = []
+        for operation in operations:
+            kind = operation.get("op")
+            if kind == "delete":
+                if not operation.get("id"):
+                    raise ValueError("La operación delete necesita id")
+                prepared.append((kind, operation["id"], None))
+            elif kind in ("add", "update"):
+                version = operation.get("version") or 1
+                source = operation.get("source") or "pdf"
+                annotation = self.normalize(operation.get("annotation") or {}, project_id, version, source)
+                prepared.append((kind, (version, source), annotation))
+            else:
+                raise ValueError(f"Operación desconocida: {kind}")
+
+        revision = await self._next_revision(project_id, None)
+        now = datetime.utcnow()
+        writes = []
+        for kind, target, annotation in prepared:
+            if kind == "delete":
+                writes.append(self._tombstone(project_object_id, target, revision, now))
+            else:
+                version, source = target
+                writes.append(self._upsert(
+                    project_object_id, version, source, annotation, content_hash(annotation), revision, now
+                ))
+
+        try:
+            if writes:
+                await self.collection.bulk_write(writes, ordered=False)
+        finally:
+            await self._commit(project_id, revision)
+        return revision
+
+    async def changes(self, project_id: str, since: int, until: Optional[int] = None) -> List[dict]:
+        """
+        Anotaciones modificadas o borradas después de la revisión since
+
+        Cada documento guarda la revisión en que cambió por última vez, así
+        que la colección hace de registro de operaciones: las borradas se
+        devuelven como marcas hasta que el índice TTL las purga.
+        """
+        revision_filter = {"$gt": since}
+        if until is not None:
+            revision_filter["$lte"] = until
+        return await self.collection.find(
+            {"project_id": ObjectId(project_id), "revision": revision_filter},
+            {"content_hash": 0}
+        ).sort("revision", 1).to_list(length=None)
+
+    @staticmethod
+    def _upsert(project_object_id: ObjectId, version: int, source: str, annotation: dict,
+                digest: str, revision: int, now: datetime) -> UpdateOne:
+        # Los campos vacíos se quitan del documento en lugar de guardarse como null
+        update = {
+            "$set": {
+                **{key: value for key, value in annotation.items() if value is not None},
+                "project_id": project_object_id,
+                "version": version,
+                "source": source,
+                "content_hash": digest,
+                "revision": revision,
+                "updated_at": now
+            },
+            "$unset": {
+                **{key: "" for key, value in annotation.items() if value is None and key != "created_at"},
+                "deleted": "",
+                "deleted_at": ""
+            },
+            "$setOnInsert": {"created_revision": revision}
+        }
+        if not annotation.get("created_at"):
+            update["$setOnInsert"]["created_at"] = now.isoformat()
+        return UpdateOne({"project_id": project_object_id, "id": annotation["id"]}, update, upsert=True)
+
+    @staticmethod
+    def _tombstone(project_object_id: ObjectId, annotation_id: str, revision: int, now: datetime) -> UpdateOne:
+        return UpdateOne(
+            {"project_id": project_object_id, "id": annotation_id, "deleted": {"$ne": True}},
+            {"$set": {"deleted": True, "deleted_at": now, "revision": revision, "updated_at": now}}
+        )
+
+    @staticmethod
+    def normalize(annotation: dict, project_id: str, version: int, source: str) -> dict:
+        """Validar una anotación con el modelo compartido y dejar solo sus campos de contenido"""
+        document = DocumentAnnotation(**{**annotation, "project_id": project_id, "version": version, "source": source})
+        return {"id": document.id, **document.dict(include=CONTENT_FIELDS)}
+
+    async def delete(self, query: dict) -> Optional[dict]:
+        """
+        Marcar como borrada una anotación y subir la revisión de su proyecto
+
+        Returns:
+            La anotación borrada o None si no existía
+        """
+        now = datetime.utcnow()
+        document = await self.collection.find_one_and_update(
+            {**query, "deleted": {"$ne": True}},
+            {"$set": {"deleted": True, "deleted_at": now, "updated_at": now}},
+            {"_id": 0, "id": 1, "project_id": 1}
+        )
+        if document is None:
+            return None
+
+        revision = await self._next_revision(str(document["project_id"]), None)
+        try:
+            await self.collection.update_one(
+                {"project_id": document["project_id"], "id": document["id"]},
+                {"$set": {"revision": revision}}
+            )
+        finally:
+            await self._commit(str(document["project_id"]), revision)
+        document["revision"] = revision
+        return document
+
+
+# Instancia global del almacén de anotaciones
+annotation_store = AnnotationStore(DatabaseConfig.ANNOTATIONS_COLLECTION)
@@ -0,0 +1,49 @@
+"""
+Hash de contenido de archivos
+SHA-256 memorizado por (ruta, mtime, tamaño) para no releer archivos sin cambios
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Tuple, Union
+
+
+CHUNK_SIZE = 1024 * 1024
+MAX_ENTRIES = 4096
+
+_memo: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def file_sha256(path: Union[str, Path]) -> str:
+    """
+    SHA-256 (hex) del contenido de un archivo
+
+    El resultado se recuerda mientras el archivo no cambie de mtime ni de
+    tamaño. Lee el archivo por bloques: llamar con asyncio.to_thread desde
+    código asíncrono.
+    """
+    path = str(path)
+    stat = os.stat(path)
+    memo_key = (path, stat.st_mtime_ns, stat.st_size)
+
+    with _lock:
+        digest = _memo.get(memo_key)
+        if digest is not None:
+            _memo.move_to_end(memo_key)
+            return digest
+
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            hasher.update(chunk)
+    digest = hasher.hexdigest()
+
+    with _lock:
+        _memo[memo_key] = digest
+        if len(_memo) > MAX_ENTRIES:
+            _memo.popitem(last=False)
+
+    return digest
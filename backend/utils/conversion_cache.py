@@ -0,0 +1,65 @@
+"""
+Caché de conversiones DOCX -> PDF
+Los PDF se guardan por SHA-256 del DOCX y versión del conversor, así un mismo
+documento subido por varios estudiantes se convierte una sola vez
+
+El conversor es LibreOffice si está activo (utils.libreoffice) y, si no,
+python-docx + reportlab en el pool de procesos
+"""
+import asyncio
+import os
+from pathlib import Path
+
+from .content_hash import file_sha256
+from .disk_cache import DiskCache, link_or_copy
+from .docx_conversion import CONVERTER_VERSION, convert_docx_file
+from .file_storage import FileStorage
+from .libreoffice import LIBREOFFICE_VERSION, office_pool
+from .workers import WorkerPool
+
+
+conversion_cache = DiskCache(
+    "conversion",
+    FileStorage.CACHE_DIR / "conversions",
+    max_bytes=int(os.getenv("CONVERSION_CACHE_MAX_MB", "512")) * 1024 * 1024
+)
+
+
+def conversion_key(digest: str) -> str:
+    """Clave de caché de un DOCX con el conversor actual"""
+    version = LIBREOFFICE_VERSION if office_pool.enabled else CONVERTER_VERSION
+    return f"{digest}-{version}.pdf"
+
+
+async def convert_docx_cached(source_path: Path, pdf_path: Path) -> dict:
+    """
+    Dejar en pdf_path la conversión de source_path, convirtiendo solo si no
+    está en caché
+
+    Returns:
+        dict con sha256 del DOCX y cached (True si no hubo que convertir)
+    """
+    digest = await asyncio.to_thread(file_sha256, source_path)
+    key = conversion_key(digest)
+
+    cached_path = await asyncio.to_thread(conversion_cache.get, key)
+    if cached_path is not None:
+        try:
+            await asyncio.to_thread(link_or_copy, cached_path, pdf_path)
+            return {"sha256": digest, "cached": True}
+        except FileNotFoundError:
+            # Expulsada entre la búsqueda y la copia: convertir de nuevo
+            pass
+
+    temp_path = conversion_cache.temp_path(key)
+    try:
+        if office_pool.enabled:
+            result = await office_pool.convert(source_path, temp_path)
+        else:
+            result = await WorkerPool.run(convert_docx_file, str(source_path), str(temp_path))
+        cached_path = await asyncio.to_thread(conversion_cache.put_file, key, temp_path)
+    finally:
+        temp_path.unlink(missing_ok=True)
+
+    await asyncio.to_thread(link_or_copy, cached_path, pdf_path)
+    return {"sha256": digest, "cached": False, **result}
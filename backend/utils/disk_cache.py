@@ -0,0 +1,149 @@
+"""
+Caché en disco con presupuesto de tamaño
+Archivos direccionados por clave con expulsión LRU (menos usados recientemente)
+"""
+import os
+import shutil
+import threading
+import uuid
+from pathlib import Path
+from typing import Optional
+
+from .metrics import metrics
+
+
+def link_or_copy(source: Path, destination: Path):
+    """Publicar un archivo de la caché en otra ruta (enlace duro si es posible)"""
+    destination = Path(destination)
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = destination.with_name(f".{destination.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        os.link(source, temp_path)
+    except OSError:
+        shutil.copyfile(source, temp_path)
+    os.replace(temp_path, destination)
+
+
+class DiskCache:
+    """
+    Directorio de archivos derivados (PDF convertidos, páginas renderizadas...)
+
+    Cada entrada es un archivo cuyo nombre es la clave. Un acierto actualiza
+    el mtime del archivo, que sirve como marca de último uso: al superar
+    max_bytes se borran los archivos con mtime más antiguo hasta bajar al
+    LOW_WATERMARK del presupuesto.
+
+    Los métodos hacen E/S de disco: llamarlos con asyncio.to_thread desde
+    código asíncrono.
+    """
+
+    # Fracción del presupuesto que queda ocupada tras una expulsión
+    LOW_WATERMARK = 0.9
+
+    def __init__(self, name: str, directory: Path, max_bytes: int):
+        self.name = name
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._total_bytes: Optional[int] = None
+        self._lock = threading.Lock()
+        metrics.register_gauge(f"{name}_cache", self.stats)
+
+    def path_for(self, key: str) -> Path:
+        """Ruta de una entrada (subdirectorio por los dos primeros caracteres)"""
+        return self.directory / key[:2] / key
+
+    def get(self, key: str) -> Optional[Path]:
+        """
+        Buscar una entrada
+
+        Returns:
+            Ruta del archivo si está en caché, None si no
+        """
+        path = self.path_for(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            metrics.increment(f"{self.name}_cache_misses")
+            return None
+
+        metrics.increment(f"{self.name}_cache_hits")
+        return path
+
+    def temp_path(self, key: str) -> Path:
+        """
+        Ruta temporal dentro de la caché para generar una entrada
+
+        Generar el archivo aquí y luego llamar a put_file() garantiza que el
+        rename final sea atómico (mismo sistema de archivos).
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        return self.directory / f".{key}.{uuid.uuid4().hex}.tmp"
+
+    def put_file(self, key: str, source: Path) -> Path:
+        """Mover un archivo ya generado a la caché"""
+        path = self.path_for(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        size = Path(source).stat().st_size
+        previous = path.stat().st_size if path.exists() else 0
+        os.replace(source, path)
+        self._added(size - previous)
+        return path
+
+    def put_bytes(self, key: str, data: bytes) -> Path:
+        """Guardar contenido en la caché"""
+        temp_path = self.temp_path(key)
+        temp_path.write_bytes(data)
+        return self.put_file(key, temp_path)
+
+    def _added(self, size: int):
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = self._scan_size()
+            else:
+                self._total_bytes += size
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _entries(self):
+        if not self.directory.exists():
+            return
+        for path in self.directory.glob("*/*"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            yield path, stat
+
+    def _scan_size(self) -> int:
+        return sum(stat.st_size for _, stat in self._entries())
+
+    def _evict(self):
+        """Borrar las entradas menos usadas hasta bajar del LOW_WATERMARK"""
+        entries = sorted(self._entries(), key=lambda entry: entry[1].st_mtime_ns)
+        total = sum(stat.st_size for _, stat in entries)
+        target = self.max_bytes * self.LOW_WATERMARK
+        evicted = 0
+
+        for path, stat in entries:
+            if total <= target:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total -= stat.st_size
+            evicted += 1
+
+        self._total_bytes = total
+        metrics.increment(f"{self.name}_cache_evictions", evicted)
+        print(f"🧹 Caché {self.name}: {evicted} entradas expulsadas")
+
+    def stats(self) -> dict:
+        """Tamaño actual y presupuesto de la caché"""
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = self._scan_size()
+        return {
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes
+        }
@@ -0,0 +1,132 @@
+"""
+Caché de DOCX parseados
+Resultado de parse_docx_file por SHA-256 del archivo y versión del parser:
+LRU en memoria delante de JSON comprimido con gzip en disco
+"""
+import asyncio
+import gzip
+import json
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict
+
+from .content_hash import file_sha256
+from .disk_cache import DiskCache
+from .docx_parser import PARSER_VERSION, parse_docx_file
+from .file_storage import FileStorage
+from .metrics import metrics
+from .single_flight import SingleFlight
+from .workers import WorkerPool
+
+
+# Imágenes extraídas de los documentos (direccionadas por contenido)
+DOCX_IMAGES_DIR = FileStorage.CACHE_DIR / "docx_images"
+
+
+class ParsedDocxCache:
+    """
+    Documentos parseados en dos niveles
+
+    1. Memoria: los MEMORY_ENTRIES documentos usados más recientemente.
+    2. Disco: JSON con gzip en data/cache/docx_parse, con presupuesto LRU.
+
+    Si varias peticiones piden el mismo documento sin caché, se parsea una
+    sola vez y todas esperan el mismo resultado.
+    """
+
+    MEMORY_ENTRIES = int(os.getenv("DOCX_PARSE_MEMORY_ENTRIES", "16"))
+
+    def __init__(self):
+        self.disk = DiskCache(
+            "docx_parse",
+            FileStorage.CACHE_DIR / "docx_parse",
+            max_bytes=int(os.getenv("DOCX_PARSE_CACHE_MAX_MB", "256")) * 1024 * 1024
+        )
+        self._memory: "OrderedDict[str, dict]" = OrderedDict()
+        self._pending = SingleFlight()
+
+    @staticmethod
+    def cache_key(digest: str) -> str:
+        return f"{digest}-{PARSER_VERSION}.json.gz"
+
+    async def get(self, source_path: Path) -> dict:
+        """
+        Contenido parseado de un DOCX (html, paragraphs, tables, images)
+
+        El diccionario devuelto es compartido: no modificarlo.
+        """
+        digest = await asyncio.to_thread(file_sha256, source_path)
+        key = self.cache_key(digest)
+
+        parsed = self._memory.get(key)
+        if parsed is not None:
+            self._memory.move_to_end(key)
+            metrics.increment("docx_parse_memory_hits")
+            return parsed
+
+        return await self._fetch(key, source_path, remember=True)
+
+    async def warm(self, source_path: Path) -> bool:
+        """
+        Dejar un DOCX parseado en disco sin ocupar la caché en memoria
+        (precálculo masivo antes de que los docentes lo abran)
+
+        Returns:
+            True si hubo que parsearlo
+        """
+        if await asyncio.to_thread(self.is_cached, source_path):
+            return False
+
+        key = self.cache_key(file_sha256(source_path))
+        await self._fetch(key, source_path, remember=False)
+        return True
+
+    def is_cached(self, source_path: Path) -> bool:
+        """Si el DOCX ya está parseado en memoria o en disco (bloqueante)"""
+        key = self.cache_key(file_sha256(source_path))
+        return key in self._memory or self.disk.path_for(key).exists()
+
+    async def _fetch(self, key: str, source_path: Path, remember: bool) -> dict:
+        """Leer de disco o parsear, una sola vez por documento a la vez"""
+        async def load():
+            parsed = await self._load_or_parse(key, source_path)
+            if remember:
+                self._remember(key, parsed)
+            return parsed
+
+        return await self._pending.run(key, load)
+
+    async def _load_or_parse(self, key: str, source_path: Path) -> dict:
+        parsed = await asyncio.to_thread(self._read_disk, key)
+        if parsed is not None:
+            return parsed
+
+        parsed = await WorkerPool.run(parse_docx_file, str(source_path), str(DOCX_IMAGES_DIR))
+        await asyncio.to_thread(self._write_disk, key, parsed)
+        return parsed
+
+    def _read_disk(self, key: str):
+        path = self.disk.get(key)
+        if path is None:
+            return None
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Entrada de caché DOCX ilegible, se vuelve a parsear: {e}")
+            return None
+
+    def _write_disk(self, key: str, parsed: dict):
+        data = gzip.compress(json.dumps(parsed, ensure_ascii=False).encode("utf-8"), compresslevel=6)
+        self.disk.put_bytes(key, data)
+
+    def _remember(self, key: str, parsed: dict):
+        self._memory[key] = parsed
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.MEMORY_ENTRIES:
+            self._memory.popitem(last=False)
+
+
+# Instancia global de la caché
+parsed_docx_cache = ParsedDocxCache()
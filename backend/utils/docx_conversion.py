@@ -0,0 +1,76 @@
+"""
+Conversión de DOCX a PDF con python-docx + reportlab
+Se ejecuta dentro del pool de procesos (utils.workers)
+"""
+from xml.sax.saxutils import escape
+
+
+# Cambiar al modificar la salida del conversor
+CONVERTER_VERSION = "reportlab-1"
+
+
+def convert_docx_file(source_path: str, pdf_path: str) -> dict:
+    """
+    Convertir un DOCX a PDF
+
+    Conserva solo el texto de los párrafos; para tablas, imágenes y
+    diseño fieles usar CONVERTER_BACKEND=libreoffice (utils.libreoffice)
+
+    Args:
+        source_path: Ruta del DOCX
+        pdf_path: Ruta donde escribir el PDF
+
+    Returns:
+        dict con el número de párrafos convertidos
+    """
+    from docx import Document
+    from reportlab.lib.pagesizes import letter
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.units import inch
+    from reportlab.lib.enums import TA_JUSTIFY
+
+    # Leer el documento DOCX
+    document = Document(source_path)
+
+    # Crear el PDF
+    pdf_doc = SimpleDocTemplate(
+        pdf_path,
+        pagesize=letter,
+        rightMargin=72,
+        leftMargin=72,
+        topMargin=72,
+        bottomMargin=18
+    )
+
+    # Estilos
+    styles = getSampleStyleSheet()
+    styles.add(ParagraphStyle(
+        name='Justify',
+        parent=styles['Normal'],
+        alignment=TA_JUSTIFY,
+        fontSize=11,
+        leading=14
+    ))
+
+    # Construir el contenido
+    story = []
+    for para in document.paragraphs:
+        if para.text.strip():
+            # Detectar si es título
+            if para.style.name.startswith('Heading'):
+                style = styles['Heading1'] if '1' in para.style.name else styles['Heading2']
+            else:
+                style = styles['Justify']
+
+            # Paragraph interpreta marcado XML: escapar "&", "<" y ">" del texto
+            story.append(Paragraph(escape(para.text), style))
+            story.append(Spacer(1, 0.2 * inch))
+
+    # build() consume la lista: contar antes
+    paragraphs = len(story) // 2
+
+    # Generar el PDF
+    pdf_doc.build(story)
+
+    return {"paragraphs": paragraphs}
@@ -0,0 +1,287 @@
+"""
+Post-proceso del HTML generado por mammoth
+Asigna IDs estables a cada párrafo, aplica el formato extraído con python-docx
+y calcula bloques y esquema (títulos) en una sola pasada sobre el HTML
+"""
+import re
+from bisect import bisect_left
+from collections import Counter
+from html import escape, unescape
+from html.parser import HTMLParser
+from typing import Dict, List, Optional, Tuple
+
+
+# Elementos de bloque que reciben un ancla (los que el visor usa para comentar)
+ANCHOR_TAGS = {"p", "h1", "h2", "h3", "h4", "h5", "h6", "li", "blockquote"}
+
+# Párrafos de python-docx que se pueden saltar buscando el siguiente que
+# coincide (mammoth omite párrafos vacíos y añade los de las tablas). Más
+# allá solo se salta hasta un párrafo cuyo texto es único en el documento
+MATCH_LOOKAHEAD = 3
+
+HEADING_TAGS = {"h1": 1, "h2": 2, "h3": 3, "h4": 4, "h5": 5, "h6": 6}
+
+# Elementos sin etiqueta de cierre
+VOID_TAGS = {"br", "img", "hr", "col", "wbr", "input", "meta", "link"}
+
+# WD_PARAGRAPH_ALIGNMENT: LEFT=0, CENTER=1, RIGHT=2, JUSTIFY=3
+ALIGNMENTS = {1: "center", 2: "right", 3: "justify"}
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def paragraph_inline_style(para) -> str:
+    """
+    Estilo CSS en línea de un párrafo de python-docx
+
+    Solo incluye el formato aplicado directamente al párrafo, para no
+    repetir en cada elemento los valores por defecto de la hoja de estilos.
+    """
+    paragraph_format = para.paragraph_format
+    declarations = []
+
+    if para.alignment is not None:
+        alignment = ALIGNMENTS.get(int(para.alignment))
+        if alignment:
+            declarations.append(f"text-align: {alignment}")
+
+    for prop, length in (
+        ("margin-left", paragraph_format.left_indent),
+        ("margin-right", paragraph_format.right_indent),
+        ("text-indent", paragraph_format.first_line_indent),
+        ("margin-top", paragraph_format.space_before),
+        ("margin-bottom", paragraph_format.space_after)
+    ):
+        if length is not None:
+            declarations.append(f"{prop}: {round(length.pt, 2)}pt")
+
+    line_spacing = paragraph_format.line_spacing
+    if line_spacing is not None:
+        if hasattr(line_spacing, "pt"):
+            # Interlineado exacto (Length)
+            declarations.append(f"line-height: {round(line_spacing.pt, 2)}pt")
+        else:
+            # Múltiplo del interlineado sencillo
+            declarations.append(f"line-height: {round(line_spacing, 2)}")
+
+    return "; ".join(declarations)
+
+
+class _AnchorCollector(HTMLParser):
+    """
+    Copia el HTML token a token dejando un hueco en cada etiqueta de apertura
+    de bloque; el texto de cada bloque se acumula para emparejarlo después.
+    También registra qué tokens abren y cierran cada elemento de primer nivel.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.out: List[Optional[str]] = []
+        # (posición en out, etiqueta, atributos, fragmentos de texto)
+        self.anchors: List[tuple] = []
+        self._open: List[tuple] = []
+        # [token inicial, token final (exclusivo), etiqueta]
+        self.top_level: List[list] = []
+        self._depth = 0
+
+    def _open_element(self, tag):
+        if self._depth == 0:
+            self.top_level.append([len(self.out), None, tag])
+        if tag in VOID_TAGS:
+            if self._depth == 0:
+                self.top_level[-1][1] = len(self.out) + 1
+        else:
+            self._depth += 1
+
+    def handle_starttag(self, tag, attrs):
+        self._open_element(tag)
+        if tag in ANCHOR_TAGS:
+            anchor = (len(self.out), tag, attrs, [])
+            self.out.append(None)
+            self.anchors.append(anchor)
+            self._open.append(anchor)
+        else:
+            self.out.append(self.get_starttag_text())
+
+    def handle_startendtag(self, tag, attrs):
+        if self._depth == 0:
+            self.top_level.append([len(self.out), len(self.out) + 1, tag])
+        self.out.append(self.get_starttag_text())
+        if tag == "br" and self._open:
+            # python-docx representa los saltos de línea como "\n"
+            self._open[-1][3].append(" ")
+
+    def handle_endtag(self, tag):
+        if tag in ANCHOR_TAGS and self._open and self._open[-1][1] == tag:
+            self._open.pop()
+        self.out.append(f"</{tag}>")
+        if tag not in VOID_TAGS and self._depth > 0:
+            self._depth -= 1
+            if self._depth == 0:
+                self.top_level[-1][1] = len(self.out)
+
+    def _add_text(self, raw: str, text: str):
+        self.out.append(raw)
+        if self._open:
+            self._open[-1][3].append(text)
+
+    def handle_data(self, data):
+        self._add_text(data, data)
+
+    def handle_entityref(self, name):
+        self._add_text(f"&{name};", unescape(f"&{name};"))
+
+    def handle_charref(self, name):
+        self._add_text(f"&#{name};", unescape(f"&#{name};"))
+
+    def handle_comment(self, data):
+        self.out.append(f"<!--{data}-->")
+
+
+def _render_start_tag(tag: str, attrs: list, extra: Dict[str, str]) -> str:
+    merged = [(name, value) for name, value in attrs if name not in extra]
+    merged.extend(extra.items())
+    rendered = "".join(
+        f' {name}="{escape(value)}"' if value is not None else f" {name}"
+        for name, value in merged
+    )
+    return f"<{tag}{rendered}>"
+
+
+def add_paragraph_anchors(html: str, paragraphs: List[dict],
+                          styles: Dict[str, str]) -> Tuple[str, List[dict], List[dict]]:
+    """
+    Añadir id (y formato en línea) a cada párrafo del HTML
+
+    Los bloques se emparejan en orden con los párrafos de python-docx
+    comparando su texto; los que coinciden reciben el id del párrafo
+    ("p{índice}"), data-para-id y su formato. Los demás (celdas de tabla,
+    párrafos solo con imágenes...) reciben "b{n}" según su posición, de modo
+    que todos tienen un ancla estable entre cargas del mismo documento.
+
+    Cada bloque se empareja con la siguiente aparición de su texto: dentro
+    de MATCH_LOOKAHEAD párrafos, o a cualquier distancia si el texto es único
+    tanto entre los párrafos como entre los bloques.
+    Así, tras una racha de párrafos que no coinciden (llamadas a notas al
+    pie, campos, cambios controlados) el emparejamiento se resincroniza.
+
+    Lineal en el tamaño del HTML: una pasada del tokenizador y otra sobre
+    la lista de bloques.
+
+    Returns:
+        (html, blocks, outline)
+        - blocks: elementos de primer nivel con su rango [start, end) en el
+          HTML devuelto y el id de su primer ancla
+        - outline: títulos de primer nivel (h1-h6) con su nivel, texto y
+          bloque
+    """
+    collector = _AnchorCollector()
+    collector.feed(html)
+    collector.close()
+    out = collector.out
+
+    # texto normalizado -> índices de los párrafos con ese texto, en orden
+    positions: Dict[str, List[int]] = {}
+    for index, para in enumerate(paragraphs):
+        positions.setdefault(normalize_text(para["text"]), []).append(index)
+    block_texts = [normalize_text("".join(anchor[3])) for anchor in collector.anchors]
+    block_counts = Counter(block_texts)
+    next_para = 0
+    anchor_ids = []
+    anchor_texts = []
+
+    for block_index, (position, tag, attrs, _) in enumerate(collector.anchors):
+        text = block_texts[block_index]
+        match = None
+        candidates = positions.get(text) if text else None
+        if candidates:
+            found = bisect_left(candidates, next_para)
+            if found < len(candidates):
+                candidate = candidates[found]
+                if candidate <= next_para + MATCH_LOOKAHEAD or \
+                        (len(candidates) == 1 and block_counts[text] == 1):
+                    match = candidate
+
+        if match is not None:
+            para_id = paragraphs[match]["id"]
+            extra = {"id": para_id, "data-para-id": para_id}
+            if styles.get(para_id):
+                extra["style"] = styles[para_id]
+            next_para = match + 1
+        else:
+            extra = {"id": f"b{block_index}"}
+
+        out[position] = _render_start_tag(tag, attrs, extra)
+        anchor_ids.append(extra["id"])
+        anchor_texts.append(text)
+
+    # Desplazamiento de cada token en el HTML final
+    offsets = [0]
+    for token in out:
+        offsets.append(offsets[-1] + len(token))
+
+    blocks = []
+    outline = []
+    anchor_index = 0
+    anchors = collector.anchors
+    for start, end, tag in collector.top_level:
+        end = end if end is not None else len(out)
+        # Primer ancla dentro del bloque (las anclas están ordenadas por posición)
+        while anchor_index < len(anchors) and anchors[anchor_index][0] < start:
+            anchor_index += 1
+        first_anchor = None
+        if anchor_index < len(anchors) and anchors[anchor_index][0] < end:
+            first_anchor = anchor_index
+
+        block = {
+            "tag": tag,
+            "id": anchor_ids[first_anchor] if first_anchor is not None else None,
+            "start": offsets[start],
+            "end": offsets[end]
+        }
+        if tag in HEADING_TAGS and first_anchor is not None and anchors[first_anchor][0] == start:
+            outline.append({
+                "id": block["id"],
+                "level": HEADING_TAGS[tag],
+                "text": anchor_texts[first_anchor],
+                "block": len(blocks)
+            })
+        blocks.append(block)
+
+    return "".join(out), blocks, outline
+
+
+def build_sections(blocks: List[dict], outline: List[dict]) -> List[dict]:
+    """
+    Dividir el documento en secciones, una por título
+
+    El contenido anterior al primer título (portada, resumen...) forma una
+    sección inicial sin título. Cada sección abarca los bloques
+    [first_block, last_block].
+    """
+    if not blocks:
+        return []
+
+    sections = []
+    if not outline or outline[0]["block"] > 0:
+        sections.append({"id": None, "title": None, "level": 0, "heading_id": None, "first_block": 0})
+
+    for heading in outline:
+        sections.append({
+            "id": None,
+            "title": heading["text"],
+            "level": heading["level"],
+            "heading_id": heading["id"],
+            "first_block": heading["block"]
+        })
+
+    for index, section in enumerate(sections):
+        section["id"] = f"s{index}"
+        following = sections[index + 1]["first_block"] if index + 1 < len(sections) else len(blocks)
+        section["last_block"] = following - 1
+
+    return sections
@@ -0,0 +1,348 @@
+"""
+Parseo de DOCX a HTML y contenido estructurado
+Se ejecuta dentro del pool de procesos (utils.workers); el resultado se
+guarda en caché (utils.docx_cache)
+"""
+import hashlib
+import io
+import os
+from pathlib import Path
+from typing import Optional, Tuple
+
+from .docx_html import add_paragraph_anchors, build_sections, paragraph_inline_style
+
+
+# Cambiar al modificar la salida del parser para invalidar la caché
+PARSER_VERSION = "6"
+
+DOCX_IMAGES_URL = "/api/v1/docx/images"
+
+# Ancho máximo de las imágenes servidas (0 = sin reducir)
+IMAGE_MAX_WIDTH = int(os.getenv("DOCX_IMAGE_MAX_WIDTH", "1600"))
+
+IMAGE_EXTENSIONS = {
+    "image/png": "png",
+    "image/jpeg": "jpg",
+    "image/gif": "gif",
+    "image/bmp": "bmp",
+    "image/tiff": "tiff",
+    "image/webp": "webp",
+    "image/svg+xml": "svg",
+    "image/x-emf": "emf",
+    "image/x-wmf": "wmf"
+}
+
+# Escala al convertir los SVG en PNG (limitada por IMAGE_MAX_WIDTH)
+SVG_RASTER_ZOOM = 2.0
+
+# Formatos que Pillow puede reducir y volver a guardar en el mismo formato
+RESIZABLE_FORMATS = {"png": "PNG", "jpg": "JPEG", "webp": "WEBP"}
+
+
+def downscale_image(data: bytes, extension: str, max_width: int) -> bytes:
+    """Reducir una imagen más ancha que max_width (si Pillow está disponible)"""
+    image_format = RESIZABLE_FORMATS.get(extension)
+    if not max_width or not image_format:
+        return data
+
+    try:
+        from PIL import Image
+    except ImportError:
+        return data
+
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            if image.width <= max_width:
+                return data
+            height = max(1, round(image.height * max_width / image.width))
+            resized = image.resize((max_width, height), Image.LANCZOS)
+            buffer = io.BytesIO()
+            if image_format == "JPEG":
+                resized.convert("RGB").save(buffer, format="JPEG", quality=85, optimize=True)
+            else:
+                resized.save(buffer, format=image_format, optimize=True)
+    except Exception:
+        # Imagen que Pillow no entiende: servir la original
+        return data
+
+    return buffer.getvalue() if buffer.tell() < len(data) else data
+
+
+def rasterize_svg(data: bytes, max_width: int) -> Optional[bytes]:
+    """
+    Convertir un SVG en PNG con PyMuPDF
+
+    Un SVG servido desde el mismo origen puede ejecutar scripts si se abre
+    directamente; el PNG no. Devuelve None si el SVG no se puede leer.
+    """
+    try:
+        import fitz  # PyMuPDF
+
+        with fitz.open(stream=data, filetype="svg") as doc:
+            page = doc[0]
+            zoom = SVG_RASTER_ZOOM
+            if max_width:
+                zoom = min(zoom, max_width / (page.rect.width or 1))
+            return page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=True).tobytes("png")
+    except Exception:
+        return None
+
+
+def store_image(data: bytes, content_type: str, images_dir: Path) -> Tuple[str, int]:
+    """
+    Guardar una imagen del documento direccionada por contenido
+
+    El nombre es el SHA-256 de la imagen original y del ancho máximo, así que
+    la misma imagen en varios documentos se guarda una sola vez y el contenido
+    de cada URL nunca cambia. Los SVG se guardan convertidos a PNG.
+
+    Returns:
+        (nombre del archivo, tamaño en bytes)
+    """
+    extension = IMAGE_EXTENSIONS.get(content_type, "bin")
+    hasher = hashlib.sha256(data)
+    hasher.update(f":{IMAGE_MAX_WIDTH}".encode())
+    digest = hasher.hexdigest()
+
+    if extension == "svg":
+        png_path = images_dir / f"{digest}.png"
+        if png_path.exists():
+            return png_path.name, png_path.stat().st_size
+        rasterized = rasterize_svg(data, IMAGE_MAX_WIDTH)
+        if rasterized is not None:
+            data, extension = rasterized, "png"
+
+    name = f"{digest}.{extension}"
+    image_path = images_dir / name
+    if image_path.exists():
+        return name, image_path.stat().st_size
+
+    stored = downscale_image(data, extension, IMAGE_MAX_WIDTH)
+    images_dir.mkdir(parents=True, exist_ok=True)
+    temp_path = image_path.with_name(f".{name}.{os.getpid()}.tmp")
+    temp_path.write_bytes(stored)
+    temp_path.replace(image_path)
+    return name, len(stored)
+
+
+def paragraph_style_name(para, style_names: dict) -> str:
+    """
+    Nombre del estilo de un párrafo, resuelto una vez por id de estilo
+
+    para.style recorre todos los estilos del documento en cada llamada.
+    python-docx no expone el id del estilo (w:pStyle) sin resolverlo, así
+    que este es el único acceso a su XML interno; si cambia en otra
+    versión, se vuelve a resolver párrafo a párrafo en vez de fallar.
+    """
+    try:
+        properties = para._p.pPr
+        style_id = properties.pStyle.val if properties is not None and properties.pStyle is not None else None
+    except AttributeError:
+        return para.style.name if para.style else "Normal"
+
+    if style_id not in style_names:
+        style_names[style_id] = para.style.name if para.style else "Normal"
+    return style_names[style_id]
+
+
+def parse_docx_file(source_path: str, images_dir: str) -> dict:
+    """
+    Extraer párrafos, tablas, imágenes y HTML de un DOCX
+
+    Abre el documento con python-docx (párrafos, tablas, formato) y con
+    mammoth (HTML). Las imágenes se guardan como archivos en images_dir y
+    el HTML las referencia por URL en lugar de incrustarlas en base64.
+
+    Returns:
+        dict con html, paragraphs, tables, images y la estructura del HTML:
+        content_start (fin de la hoja de estilos), blocks, outline y sections
+    """
+    try:
+        from docx import Document
+    except ImportError:
+        raise ImportError("python-docx no está instalado. Ejecuta: pip install python-docx")
+
+    try:
+        import mammoth
+    except ImportError:
+        raise ImportError("mammoth no está instalado. Ejecuta: pip install mammoth")
+
+    # Leer el documento con python-docx
+    document = Document(source_path)
+
+    # Extraer párrafos y su formato (estilo CSS en línea por id)
+    paragraphs = []
+    paragraph_styles = {}
+    # id de estilo -> nombre (ver paragraph_style_name)
+    style_names = {}
+    for idx, para in enumerate(document.paragraphs):
+        text = para.text
+        if text.strip():  # Solo párrafos con contenido
+            para_data = {
+                "id": f"p{idx}",
+                "text": text,
+                "style": paragraph_style_name(para, style_names),
+                "runs": [
+                    {
+                        "text": run.text,
+                        "bold": run.bold,
+                        "italic": run.italic,
+                        "underline": run.underline
+                    }
+                    for run in para.runs
+                ],
+                "position": {"page": 1, "index": idx}  # Simplificado
+            }
+            paragraphs.append(para_data)
+            paragraph_styles[para_data["id"]] = paragraph_inline_style(para)
+
+    # Extraer tablas
+    tables = []
+    for idx, table in enumerate(document.tables):
+        rows = []
+        for row in table.rows:
+            cells = [cell.text for cell in row.cells]
+            rows.append(cells)
+
+        tables.append({
+            "id": f"t{idx}",
+            "rows": rows,
+            "position": {"page": 1, "index": idx}
+        })
+
+    # Convertir a HTML con mammoth con opciones de estilo mejoradas
+    with open(source_path, 'rb') as docx_file:
+        # Configurar opciones de conversión para preservar más estilos
+        style_map = """
+            p[style-name='Heading 1'] => h1.heading-1:fresh
+            p[style-name='Heading 2'] => h2.heading-2:fresh
+            p[style-name='Heading 3'] => h3.heading-3:fresh
+            p[style-name='Title'] => h1.doc-title:fresh
+            p[style-name='Subtitle'] => h2.doc-subtitle:fresh
+            p[style-name='Intense Quote'] => blockquote.intense-quote:fresh
+            p[style-name='Normal'] => p.normal:fresh
+            r[style-name='Strong'] => strong
+            r[style-name='Emphasis'] => em
+        """
+
+        # Extraer las imágenes a archivos servidos por URL
+        images = []
+
+        def convert_image_to_url(image):
+            with image.open() as image_bytes:
+                data = image_bytes.read()
+            name, size = store_image(data, image.content_type, Path(images_dir))
+            images.append({
+                "id": f"img{len(images)}",
+                "url": f"{DOCX_IMAGES_URL}/{name}",
+                "content_type": image.content_type,
+                "size": size
+            })
+            return {"src": f"{DOCX_IMAGES_URL}/{name}"}
+
+        result = mammoth.convert_to_html(
+            docx_file,
+            style_map=style_map,
+            include_default_style_map=True,
+            convert_image=mammoth.images.img_element(convert_image_to_url)
+        )
+        html_content = result.value
+
+        # Agregar estilos CSS completos
+        css_styles = """
+            <style>
+                body { 
+                    font-family: 'Calibri', 'Arial', sans-serif; 
+                    font-size: 11pt;
+                    margin: 0;
+                    padding: 0;
+                }
+                h1, h2, h3 { 
+                    font-weight: bold; 
+                    margin-top: 12pt; 
+                    margin-bottom: 6pt; 
+                }
+                h1.heading-1 { font-size: 16pt; color: #2e74b5; }
+                h2.heading-2 { font-size: 13pt; color: #2e74b5; }
+                h3.heading-3 { font-size: 12pt; color: #1f4d78; }
+                h1.doc-title { 
+                    font-size: 26pt; 
+                    text-align: center; 
+                    font-weight: bold; 
+                    margin-bottom: 12pt;
+                }
+                h2.doc-subtitle { 
+                    font-size: 15pt; 
+                    text-align: center; 
+                    color: #595959;
+                    margin-bottom: 12pt;
+                }
+                p { 
+                    margin-top: 0pt; 
+                    margin-bottom: 8pt; 
+                    line-height: 1.15;
+                }
+                p.normal { 
+                    font-size: 11pt;
+                    margin-bottom: 8pt;
+                }
+                strong, b { font-weight: bold; }
+                em, i { font-style: italic; }
+                u { text-decoration: underline; }
+                blockquote.intense-quote { 
+                    margin-left: 36pt; 
+                    margin-right: 36pt;
+                    font-style: italic; 
+                    border-left: 3px solid #2e74b5;
+                    padding-left: 12pt;
+                }
+                table {
+                    border-collapse: collapse;
+                    width: 100%;
+                    margin: 12pt 0;
+                }
+                td, th {
+                    border: 1px solid #d0d0d0;
+                    padding: 6pt;
+                }
+                /* Selección de texto para comentarios */
+                .text-selected {
+                    background-color: #fff4cc;
+                    border-bottom: 2px solid #ffeb3b;
+                }
+                .text-commented {
+                    background-color: #fff9e6;
+                    cursor: pointer;
+                }
+                .text-commented:hover {
+                    background-color: #fff4cc;
+                }
+                /* Estilos para imágenes */
+                img {
+                    max-width: 100%;
+                    height: auto;
+                    display: block;
+                    margin: 12pt auto;
+                }
+            </style>
+        """
+        # IDs estables, formato de python-docx, bloques y títulos en una sola pasada
+        body, blocks, outline = add_paragraph_anchors(html_content, paragraphs, paragraph_styles)
+        html_with_ids = css_styles + body
+
+        # Rangos relativos al HTML completo (hoja de estilos incluida)
+        content_start = len(css_styles)
+        for block in blocks:
+            block["start"] += content_start
+            block["end"] += content_start
+
+    return {
+        "html": html_with_ids,
+        "paragraphs": paragraphs,
+        "tables": tables,
+        "images": images,
+        "content_start": content_start,
+        "blocks": blocks,
+        "outline": outline,
+        "sections": build_sections(blocks, outline)
+    }
@@ -15,6 +15,9 @@ class FileStorage:
     # Directorio base para almacenar archivos
     BASE_DIR = Path(__file__).parent.parent / "uploads"
     PROJECTS_DIR = BASE_DIR / "projects"
+    # Datos internos (cachés, índices): fuera de uploads, que se sirve en /uploads
+    DATA_DIR = Path(__file__).parent.parent / "data"
+    CACHE_DIR = DATA_DIR / "cache"
     
     @classmethod
     def initialize(cls):
@@ -65,6 +68,10 @@ class FileStorage:
             # Calcular tamaño
             file_size = len(file_content)
             
+            # Registrar en el índice de archivos (import local: path_index importa FileStorage)
+            from .path_index import path_index
+            path_index.add(f"projects/{student_id}/{unique_filename}")
+            
             return {
                 "filename": filename,
                 "stored_filename": unique_filename,
@@ -89,6 +96,8 @@ class FileStorage:
         file_path = cls.BASE_DIR / relative_path
         if file_path.exists():
             file_path.unlink()
+            from .path_index import path_index
+            path_index.remove(relative_path)
             return True
         return False
     
@@ -0,0 +1,94 @@
+"""
+HyperLogLog para contar lectores únicos aproximados
+Memoria fija por sketch (2^precision registros de un byte) y fusión por máximo
+"""
+import hashlib
+import math
+from typing import Iterable, Optional
+
+
+class HyperLogLog:
+    """
+    Sketch HyperLogLog
+
+    Con la precisión por defecto (12) usa 4096 registros (4 KB) y el error
+    típico de la estimación es de ~1.6 %, sin importar cuántos lectores haya.
+    """
+
+    DEFAULT_PRECISION = 12
+
+    def __init__(self, precision: int = DEFAULT_PRECISION, registers: Optional[bytes] = None):
+        if not 4 <= precision <= 16:
+            raise ValueError("La precisión debe estar entre 4 y 16")
+        self.precision = precision
+        self.size = 1 << precision
+        if registers is not None:
+            if len(registers) != self.size:
+                raise ValueError(f"Se esperaban {self.size} registros, llegaron {len(registers)}")
+            self.registers = bytearray(registers)
+        else:
+            self.registers = bytearray(self.size)
+
+    @classmethod
+    def from_bytes(cls, registers: bytes) -> "HyperLogLog":
+        """Reconstruir un sketch a partir de sus registros"""
+        precision = len(registers).bit_length() - 1
+        return cls(precision=precision, registers=registers)
+
+    def to_bytes(self) -> bytes:
+        """Registros del sketch, para guardarlos en un campo binario"""
+        return bytes(self.registers)
+
+    def add(self, item: str) -> bool:
+        """
+        Registrar un elemento
+
+        Returns:
+            True si algún registro cambió
+        """
+        hashed = int.from_bytes(hashlib.blake2b(item.encode("utf-8"), digest_size=8).digest(), "big")
+        index = hashed >> (64 - self.precision)
+        remaining_bits = 64 - self.precision
+        remainder = hashed & ((1 << remaining_bits) - 1)
+        rank = remaining_bits - remainder.bit_length() + 1
+
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+            return True
+        return False
+
+    def update(self, items: Iterable[str]):
+        """Registrar varios elementos"""
+        for item in items:
+            self.add(item)
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        """Fusionar otro sketch en este (unión de conjuntos)"""
+        if other.precision != self.precision:
+            raise ValueError("Solo se pueden fusionar sketches con la misma precisión")
+        registers = self.registers
+        for index, value in enumerate(other.registers):
+            if value > registers[index]:
+                registers[index] = value
+        return self
+
+    def is_empty(self) -> bool:
+        """True si no se ha registrado ningún elemento"""
+        return not any(self.registers)
+
+    def count(self) -> int:
+        """Estimación del número de elementos distintos"""
+        size = self.size
+        if size >= 128:
+            alpha = 0.7213 / (1 + 1.079 / size)
+        else:
+            alpha = {16: 0.673, 32: 0.697, 64: 0.709}[size]
+
+        estimate = alpha * size * size / sum(2.0 ** -value for value in self.registers)
+
+        # Corrección para cardinalidades pequeñas (linear counting)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * size and zeros:
+            estimate = size * math.log(size / zeros)
+
+        return int(round(estimate))
@@ -0,0 +1,74 @@
+"""
+Análisis de los PDF al subirlos
+Abre cada documento una sola vez en el pool de procesos y obtiene en esa
+pasada los metadatos, la miniatura de portada y la versión optimizada
+"""
+from datetime import datetime
+from typing import Optional
+
+from .metrics import metrics
+from .pdf_metadata import describe_document, store_text
+from .pdf_optimize import IMAGE_MAX_DPI, OPTIMIZE_ENABLED, optimize_document, record_optimization
+from .thumbnails import THUMBNAIL_WIDTH, Thumbnails, render_thumbnail
+from .workers import WorkerPool
+
+
+def ingest_pdf_content(content: bytes, optimize: bool, image_max_dpi: int, thumbnail_width: int) -> dict:
+    """
+    Procesar un PDF subido (se ejecuta en el pool de procesos)
+
+    La optimización va al final porque puede reducir las imágenes del
+    documento abierto; el análisis y la miniatura usan el original.
+
+    Returns:
+        dict con metadata (ver describe_document), thumbnail ((bytes,
+        extensión) o None) y optimized (bytes o None si no se gana espacio)
+    """
+    import fitz  # PyMuPDF
+
+    with fitz.open(stream=content, filetype="pdf") as doc:
+        metadata = describe_document(doc)
+        thumbnail = render_thumbnail(doc[0], thumbnail_width) if len(doc) else None
+        optimized = optimize_document(doc, len(content), image_max_dpi) if optimize else None
+
+    return {"metadata": metadata, "thumbnail": thumbnail, "optimized": optimized}
+
+
+async def ingest_pdf(content: bytes, student_id: str) -> dict:
+    """
+    Analizar, optimizar y generar la miniatura de un PDF subido
+
+    Nunca falla: si el PDF no se puede procesar se guarda tal cual, sin
+    metadatos ni miniatura.
+
+    Returns:
+        dict con content (PDF a guardar), metadata y thumbnail_url
+    """
+    try:
+        result = await WorkerPool.run(
+            ingest_pdf_content, content, OPTIMIZE_ENABLED, IMAGE_MAX_DPI, THUMBNAIL_WIDTH
+        )
+    except Exception as e:
+        print(f"⚠️ No se pudo analizar el PDF subido: {e}")
+        metrics.increment("pdf_ingest_errors")
+        return {"content": content, "metadata": None, "thumbnail_url": None}
+
+    if OPTIMIZE_ENABLED:
+        content = record_optimization(content, result["optimized"])
+
+    metadata: Optional[dict] = result["metadata"]
+    metadata["analyzed_at"] = datetime.utcnow()
+    try:
+        metadata = await store_text(metadata)
+    except Exception as e:
+        # Sin el texto guardado los metadatos quedan incompletos: se recalculan al consultarlos
+        print(f"⚠️ No se pudo guardar el texto del PDF subido: {e}")
+        metrics.increment("pdf_ingest_errors")
+        metadata = None
+
+    thumbnail_url = None
+    if result["thumbnail"] is not None:
+        image, extension = result["thumbnail"]
+        thumbnail_url = await Thumbnails.store(content, image, extension, student_id)
+
+    return {"content": content, "metadata": metadata, "thumbnail_url": thumbnail_url}
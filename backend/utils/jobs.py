@@ -0,0 +1,99 @@
+"""
+Registro de trabajos en segundo plano
+Permite responder de inmediato con un job_id y consultar el estado después
+"""
+import asyncio
+import time
+import uuid
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Optional
+
+
+class JobRegistry:
+    """
+    Trabajos asíncronos con estado consultable
+
+    Los trabajos se identifican además por una clave (p. ej. la ruta del
+    archivo): si llega una petición con la misma clave mientras otro trabajo
+    sigue pendiente, se devuelve ese trabajo en lugar de crear uno nuevo.
+    """
+
+    # Tiempo que se conservan los trabajos terminados
+    JOB_TTL_SECONDS = 3600
+
+    def __init__(self, name: str):
+        self.name = name
+        self.jobs: Dict[str, dict] = {}
+        self._active_by_key: Dict[str, str] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def submit(self, key: str, run: Callable[[], Awaitable[dict]]) -> dict:
+        """
+        Crear un trabajo o unirse al que ya está en curso para la misma clave
+
+        Args:
+            key: Clave de deduplicación
+            run: Función que devuelve la corrutina a ejecutar; su resultado
+                 se guarda en job["result"]
+        """
+        self._prune()
+
+        active_id = self._active_by_key.get(key)
+        if active_id and active_id in self.jobs:
+            return self.jobs[active_id]
+
+        job_id = uuid.uuid4().hex
+        job = {
+            "job_id": job_id,
+            "status": "queued",
+            "created_at": datetime.utcnow().isoformat(),
+            "finished_at": None,
+            "result": None,
+            "error": None
+        }
+        self.jobs[job_id] = job
+        self._active_by_key[key] = job_id
+        self._tasks[job_id] = asyncio.create_task(self._execute(key, job, run))
+        return job
+
+    def get(self, job_id: str) -> Optional[dict]:
+        """Estado de un trabajo"""
+        return self.jobs.get(job_id)
+
+    async def wait(self, job_id: str) -> Optional[dict]:
+        """Esperar a que termine un trabajo"""
+        task = self._tasks.get(job_id)
+        if task:
+            await asyncio.shield(task)
+        return self.jobs.get(job_id)
+
+    async def _execute(self, key: str, job: dict, run: Callable[[], Awaitable[dict]]):
+        job["status"] = "running"
+        try:
+            job["result"] = await run()
+            job["status"] = "completed"
+        except Exception as e:
+            job["status"] = "failed"
+            job["error"] = str(e)
+            print(f"❌ Error en trabajo de {self.name} {job['job_id']}: {e}")
+        finally:
+            job["finished_at"] = datetime.utcnow().isoformat()
+            job["_finished"] = time.monotonic()
+            if self._active_by_key.get(key) == job["job_id"]:
+                del self._active_by_key[key]
+            self._tasks.pop(job["job_id"], None)
+
+    def _prune(self):
+        """Olvidar trabajos terminados hace más de JOB_TTL_SECONDS"""
+        limit = time.monotonic() - self.JOB_TTL_SECONDS
+        expired = [
+            job_id for job_id, job in self.jobs.items()
+            if job.get("_finished") and job["_finished"] < limit
+        ]
+        for job_id in expired:
+            del self.jobs[job_id]
+
+    @staticmethod
+    def public(job: dict) -> dict:
+        """Representación del trabajo para la respuesta HTTP"""
+        return {key: value for key, value in job.items() if not key.startswith("_")}
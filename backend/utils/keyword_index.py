@@ -0,0 +1,157 @@
+"""
+Índice normalizado de palabras clave
+Autocompletado por prefijo para el formulario de subida y el filtro de la biblioteca
+"""
+import heapq
+import unicodedata
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List
+
+from config.database import Database, DatabaseConfig
+
+
+def normalize_keyword(keyword: str) -> str:
+    """
+    Normalizar una palabra clave: sin acentos, en minúsculas y con
+    espacios colapsados ("  Inteligencia  Artificial " -> "inteligencia artificial")
+    """
+    decomposed = unicodedata.normalize("NFKD", keyword)
+    without_accents = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(without_accents.casefold().split())
+
+
+class KeywordIndex:
+    """
+    Índice en memoria de palabras clave normalizadas
+
+    Mantiene una lista ordenada de claves normalizadas (búsqueda por prefijo
+    con bisect) y el número de proyectos publicados que usa cada una. Las
+    altas y bajas (publicar y retirar de la biblioteca) se aplican en su
+    posición, sin reconstruir la lista completa.
+    """
+
+    # Prefijos cortos abarcan casi todo el índice, se cachea su resultado
+    CACHED_PREFIX_LENGTH = 2
+
+    def __init__(self):
+        self.sorted_keys: List[str] = []
+        self.counts: Dict[str, int] = {}
+        # Variantes escritas por los estudiantes: normalizada -> {variante: usos}
+        self.spellings: Dict[str, Dict[str, int]] = {}
+        self._prefix_cache: Dict[tuple, List[dict]] = {}
+
+    def add(self, keywords: Iterable[str]):
+        """Registrar las palabras clave de un proyecto publicado"""
+        for keyword in keywords:
+            normalized = normalize_keyword(keyword)
+            if not normalized:
+                continue
+
+            if normalized not in self.counts:
+                insort(self.sorted_keys, normalized)
+                self.counts[normalized] = 0
+                self.spellings[normalized] = {}
+
+            self.counts[normalized] += 1
+            label = " ".join(keyword.split())
+            self.spellings[normalized][label] = self.spellings[normalized].get(label, 0) + 1
+
+        self._prefix_cache.clear()
+
+    def remove(self, keywords: Iterable[str]):
+        """Descontar las palabras clave de un proyecto que deja de estar publicado"""
+        for keyword in keywords:
+            normalized = normalize_keyword(keyword)
+            if normalized not in self.counts:
+                continue
+
+            label = " ".join(keyword.split())
+            spellings = self.spellings[normalized]
+            if label in spellings:
+                spellings[label] -= 1
+                if spellings[label] <= 0:
+                    del spellings[label]
+
+            self.counts[normalized] -= 1
+            if self.counts[normalized] <= 0:
+                del self.counts[normalized]
+                del self.spellings[normalized]
+                del self.sorted_keys[bisect_left(self.sorted_keys, normalized)]
+
+        self._prefix_cache.clear()
+
+    def clear(self):
+        """Vaciar el índice"""
+        self.sorted_keys = []
+        self.counts = {}
+        self.spellings = {}
+        self._prefix_cache.clear()
+
+    def label(self, normalized: str) -> str:
+        """Variante más usada de una palabra clave normalizada"""
+        spellings = self.spellings.get(normalized)
+        if not spellings:
+            return normalized
+        return max(spellings.items(), key=lambda item: (item[1], item[0]))[0]
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[dict]:
+        """
+        Sugerencias para un prefijo, ordenadas por número de usos
+
+        Args:
+            prefix: Texto escrito por el usuario (se normaliza igual que las claves)
+            limit: Número máximo de sugerencias
+        """
+        normalized_prefix = normalize_keyword(prefix)
+        cache_key = (normalized_prefix, limit)
+        cacheable = len(normalized_prefix) <= self.CACHED_PREFIX_LENGTH
+        if cacheable and cache_key in self._prefix_cache:
+            return self._prefix_cache[cache_key]
+
+        start = bisect_left(self.sorted_keys, normalized_prefix)
+        # "\uffff" es mayor que cualquier carácter que quede tras normalizar
+        end = bisect_left(self.sorted_keys, normalized_prefix + "\uffff", lo=start)
+
+        best = heapq.nsmallest(
+            limit,
+            self.sorted_keys[start:end],
+            key=lambda key: (-self.counts[key], key)
+        )
+        suggestions = [
+            {"keyword": self.label(key), "normalized": key, "count": self.counts[key]}
+            for key in best
+        ]
+
+        if cacheable:
+            self._prefix_cache[cache_key] = suggestions
+        return suggestions
+
+    async def rebuild(self):
+        """Reconstruir el índice desde las palabras clave de los proyectos publicados"""
+        projects_collection = Database.get_collection(DatabaseConfig.PROJECTS_COLLECTION)
+        pipeline = [
+            {"$match": {"metadata.status": "published", "academic_info.keywords.0": {"$exists": True}}},
+            {"$unwind": "$academic_info.keywords"},
+            {"$group": {"_id": "$academic_info.keywords", "count": {"$sum": 1}}}
+        ]
+        rows = await projects_collection.aggregate(pipeline).to_list(length=None)
+
+        self.clear()
+        for row in rows:
+            keyword = row["_id"]
+            if not isinstance(keyword, str):
+                continue
+            normalized = normalize_keyword(keyword)
+            if not normalized:
+                continue
+            label = " ".join(keyword.split())
+            self.counts[normalized] = self.counts.get(normalized, 0) + row["count"]
+            spellings = self.spellings.setdefault(normalized, {})
+            spellings[label] = spellings.get(label, 0) + row["count"]
+        self.sorted_keys = sorted(self.counts)
+
+        print(f"🔑 Índice de palabras clave cargado: {len(self.sorted_keys)} claves")
+
+
+# Instancia global del índice
+keyword_index = KeywordIndex()
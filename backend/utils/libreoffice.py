@@ -0,0 +1,271 @@
+"""
+Conversión de DOCX a PDF con LibreOffice
+Mantiene instancias de soffice en modo headless ya arrancadas y las
+controla por UNO, para no pagar el arranque de LibreOffice en cada documento
+
+Opcional: se activa con CONVERTER_BACKEND=libreoffice y requiere LibreOffice
+y el módulo uno (paquete python3-uno) en el mismo intérprete del servidor.
+"""
+import asyncio
+import importlib.util
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from .metrics import metrics
+
+
+# Cambiar al modificar las opciones de exportación para invalidar la caché
+LIBREOFFICE_VERSION = "libreoffice-1"
+
+UNO_AVAILABLE = importlib.util.find_spec("uno") is not None
+
+
+class OfficeInstance:
+    """
+    Un proceso soffice con su propio perfil y su conexión UNO por pipe
+
+    Los métodos son bloqueantes: se llaman desde un hilo (asyncio.to_thread).
+    """
+
+    # Documentos por instancia antes de reciclarla (LibreOffice acumula memoria)
+    MAX_JOBS = 200
+    START_TIMEOUT_SECONDS = 30
+
+    def __init__(self, number: int, soffice: str):
+        self.number = number
+        self.soffice = soffice
+        self.pipe_name = f"unexca_office_{os.getpid()}_{number}"
+        self.profile_dir = Path(tempfile.gettempdir()) / f"unexca_office_profile_{os.getpid()}_{number}"
+        self.process: Optional[subprocess.Popen] = None
+        self.desktop = None
+        self.jobs = 0
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def start(self):
+        """Arrancar soffice y esperar a que acepte conexiones UNO"""
+        import uno
+        from com.sun.star.connection import NoConnectException
+
+        self.process = subprocess.Popen(
+            [
+                self.soffice,
+                "--headless", "--invisible", "--nologo", "--nodefault",
+                "--norestore", "--nolockcheck", "--nofirststartwizard",
+                f"-env:UserInstallation={self.profile_dir.as_uri()}",
+                f"--accept=pipe,name={self.pipe_name};urp;StarOffice.ComponentContext"
+            ],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True
+        )
+
+        local_context = uno.getComponentContext()
+        resolver = local_context.ServiceManager.createInstanceWithContext(
+            "com.sun.star.bridge.UnoUrlResolver", local_context
+        )
+        deadline = time.monotonic() + self.START_TIMEOUT_SECONDS
+        while True:
+            try:
+                context = resolver.resolve(
+                    f"uno:pipe,name={self.pipe_name};urp;StarOffice.ComponentContext"
+                )
+                break
+            except NoConnectException:
+                if not self.alive or time.monotonic() > deadline:
+                    self.kill()
+                    raise RuntimeError(f"LibreOffice #{self.number} no respondió al arrancar")
+                time.sleep(0.25)
+
+        self.desktop = context.ServiceManager.createInstanceWithContext(
+            "com.sun.star.frame.Desktop", context
+        )
+        self.jobs = 0
+
+    def convert(self, source_path: str, pdf_path: str):
+        """Abrir el documento oculto y exportarlo a PDF"""
+        import uno
+        from com.sun.star.beans import PropertyValue
+
+        def properties(**values):
+            result = []
+            for name, value in values.items():
+                prop = PropertyValue()
+                prop.Name = name
+                prop.Value = value
+                result.append(prop)
+            return tuple(result)
+
+        document = self.desktop.loadComponentFromURL(
+            uno.systemPathToFileUrl(os.path.abspath(source_path)),
+            "_blank",
+            0,
+            # UpdateDocMode 0 = NO_UPDATE: no seguir vínculos externos
+            properties(Hidden=True, ReadOnly=True, UpdateDocMode=0)
+        )
+        if document is None:
+            raise ValueError("LibreOffice no pudo abrir el documento")
+        try:
+            document.storeToURL(
+                uno.systemPathToFileUrl(os.path.abspath(pdf_path)),
+                properties(FilterName="writer_pdf_Export")
+            )
+        finally:
+            document.close(True)
+        self.jobs += 1
+
+    def kill(self):
+        """Terminar el proceso (desbloquea cualquier llamada UNO pendiente)"""
+        if self.process is not None and self.process.poll() is None:
+            self.process.kill()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                pass
+        self.process = None
+        self.desktop = None
+
+    def stop(self):
+        """Cerrar LibreOffice y borrar su perfil"""
+        if self.desktop is not None and self.alive:
+            try:
+                self.desktop.terminate()
+                self.process.wait(timeout=10)
+            except Exception:
+                pass
+        self.kill()
+        shutil.rmtree(self.profile_dir, ignore_errors=True)
+
+
+class OfficePool:
+    """
+    Instancias de LibreOffice listas para convertir
+
+    Las instancias libres esperan en una cola: cada conversión toma una, la
+    usa en un hilo y la devuelve. Si no hay ninguna libre, la conversión
+    espera su turno. Una conversión que supera JOB_TIMEOUT_SECONDS mata su
+    instancia; una instancia que muere o que llega a MAX_JOBS documentos se
+    reinicia antes de volver a la cola.
+    """
+
+    BACKEND = os.getenv("CONVERTER_BACKEND", "reportlab").lower()
+    INSTANCES = int(os.getenv("LIBREOFFICE_INSTANCES", "2"))
+    JOB_TIMEOUT_SECONDS = float(os.getenv("LIBREOFFICE_TIMEOUT_SECONDS", "120"))
+    SOFFICE = os.getenv("SOFFICE_PATH", "soffice")
+
+    def __init__(self):
+        self.enabled = False
+        self._instances: List[OfficeInstance] = []
+        self._idle: Optional[asyncio.Queue] = None
+
+    async def start(self):
+        """Arrancar las instancias si CONVERTER_BACKEND=libreoffice"""
+        if self.BACKEND != "libreoffice" or self.enabled:
+            return
+
+        soffice = shutil.which(self.SOFFICE)
+        if not UNO_AVAILABLE or soffice is None:
+            print("⚠️ CONVERTER_BACKEND=libreoffice pero falta LibreOffice o el módulo uno; se usa reportlab")
+            return
+
+        instances = [OfficeInstance(number, soffice) for number in range(max(1, self.INSTANCES))]
+        results = await asyncio.gather(
+            *(asyncio.to_thread(instance.start) for instance in instances),
+            return_exceptions=True
+        )
+
+        self._idle = asyncio.Queue()
+        for instance, result in zip(instances, results):
+            if isinstance(result, Exception):
+                print(f"❌ Error arrancando LibreOffice #{instance.number}: {result}")
+                await asyncio.to_thread(instance.stop)
+            else:
+                self._instances.append(instance)
+                self._idle.put_nowait(instance)
+
+        if self._instances:
+            self.enabled = True
+            metrics.register_gauge("libreoffice", self.stats)
+            print(f"📄 LibreOffice listo con {len(self._instances)} instancias")
+        else:
+            print("⚠️ No arrancó ninguna instancia de LibreOffice; se usa reportlab")
+
+    async def stop(self):
+        """Cerrar todas las instancias al apagar la aplicación"""
+        if not self.enabled:
+            return
+        self.enabled = False
+        await asyncio.gather(*(asyncio.to_thread(instance.stop) for instance in self._instances))
+        self._instances = []
+        print("📄 LibreOffice cerrado")
+
+    async def convert(self, source_path: Path, pdf_path: Path) -> dict:
+        """
+        Convertir un DOCX a PDF con una instancia libre
+
+        Raises:
+            TimeoutError: si la conversión supera JOB_TIMEOUT_SECONDS
+        """
+        queued_at = time.monotonic()
+        instance = await self._idle.get()
+        metrics.increment("libreoffice_queue_seconds", time.monotonic() - queued_at)
+        try:
+            if not instance.alive:
+                await self._recycle(instance, "el proceso terminó")
+                if not instance.alive:
+                    raise RuntimeError(f"LibreOffice #{instance.number} no está disponible")
+
+            try:
+                await asyncio.wait_for(
+                    asyncio.to_thread(instance.convert, str(source_path), str(pdf_path)),
+                    timeout=self.JOB_TIMEOUT_SECONDS
+                )
+            except asyncio.TimeoutError:
+                metrics.increment("libreoffice_timeouts")
+                # Matar el proceso libera el hilo bloqueado en la llamada UNO
+                await asyncio.to_thread(instance.kill)
+                await self._recycle(instance, "tiempo de conversión agotado")
+                raise TimeoutError(
+                    f"La conversión con LibreOffice superó {self.JOB_TIMEOUT_SECONDS:g} s"
+                )
+            except Exception:
+                if not instance.alive:
+                    metrics.increment("libreoffice_crashes")
+                    await self._recycle(instance, "el proceso falló durante la conversión")
+                raise
+
+            metrics.increment("libreoffice_conversions")
+            if instance.jobs >= OfficeInstance.MAX_JOBS:
+                await self._recycle(instance, f"{instance.jobs} documentos convertidos")
+
+            return {"backend": "libreoffice"}
+        finally:
+            self._idle.put_nowait(instance)
+
+    async def _recycle(self, instance: OfficeInstance, reason: str):
+        """Reiniciar una instancia; si no arranca, queda muerta y se reintenta en su próximo uso"""
+        print(f"♻️ Reiniciando LibreOffice #{instance.number}: {reason}")
+        await asyncio.to_thread(instance.kill)
+        try:
+            await asyncio.to_thread(instance.start)
+        except Exception as e:
+            print(f"❌ Error reiniciando LibreOffice #{instance.number}: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "instances": len(self._instances),
+            "alive": sum(1 for instance in self._instances if instance.alive),
+            "idle": self._idle.qsize() if self._idle is not None else 0
+        }
+
+
+# Instancia global del pool de LibreOffice
+office_pool = OfficePool()
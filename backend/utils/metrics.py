@@ -0,0 +1,51 @@
+"""
+Métricas internas de la aplicación
+Contadores en memoria expuestos en GET /metrics
+"""
+import threading
+from collections import defaultdict
+from typing import Callable, Dict
+
+
+class Metrics:
+    """
+    Contadores de proceso (aciertos de caché, bytes ahorrados...)
+
+    Se pueden incrementar desde el event loop o desde hilos (asyncio.to_thread),
+    por eso usan un lock. Los valores se pierden al reiniciar la aplicación.
+    """
+
+    def __init__(self):
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._gauges: Dict[str, Callable[[], dict]] = {}
+        self._lock = threading.Lock()
+
+    def increment(self, name: str, value: float = 1):
+        """Sumar `value` al contador `name`"""
+        with self._lock:
+            self._counters[name] += value
+
+    def register_gauge(self, name: str, read: Callable[[], dict]):
+        """Registrar una función que informa valores actuales (tamaño de una caché...)"""
+        self._gauges[name] = read
+
+    def snapshot(self) -> dict:
+        """Valores actuales de todos los contadores y medidores"""
+        with self._lock:
+            counters = {
+                name: int(value) if float(value).is_integer() else value
+                for name, value in sorted(self._counters.items())
+            }
+
+        gauges = {}
+        for name, read in self._gauges.items():
+            try:
+                gauges[name] = read()
+            except Exception as e:
+                gauges[name] = {"error": str(e)}
+
+        return {"counters": counters, "gauges": gauges}
+
+
+# Instancia global de métricas
+metrics = Metrics()
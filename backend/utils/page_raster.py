@@ -0,0 +1,134 @@
+"""
+Imágenes de páginas de PDF renderizadas en el servidor
+Para equipos que no pueden renderizar PDF escaneados grandes con pdf.js
+"""
+import asyncio
+import importlib.util
+import io
+import math
+import os
+from pathlib import Path
+from typing import Tuple
+
+from .content_hash import file_sha256
+from .disk_cache import DiskCache
+from .file_storage import FileStorage
+from .single_flight import SingleFlight
+from .workers import WorkerPool
+
+
+# Cambiar al modificar el renderizado para invalidar la caché
+RASTER_VERSION = "1"
+
+MIN_SCALE = 0.25
+MAX_SCALE = 4.0
+SCALE_STEP = 0.25
+
+# Píxeles máximos de una imagen: una página con MediaBox enorme (hasta
+# 14400 pt) a escala 4 pediría gigas de memoria y mataría el proceso
+MAX_PIXELS = int(os.getenv("PAGE_RASTER_MAX_PIXELS", str(32 * 1024 * 1024)))
+
+IMAGE_FORMATS = {"webp": "image/webp", "png": "image/png"}
+
+# WebP requiere Pillow; sin él se sirve PNG
+WEBP_AVAILABLE = importlib.util.find_spec("PIL") is not None
+
+
+def resolve_format(requested: str) -> str:
+    """Formato de imagen que se puede generar para el formato pedido"""
+    if requested == "webp" and WEBP_AVAILABLE:
+        return "webp"
+    return "png"
+
+
+def normalize_scale(scale: float) -> float:
+    """Ajustar la escala a múltiplos de SCALE_STEP para compartir caché"""
+    scale = min(max(scale, MIN_SCALE), MAX_SCALE)
+    return round(round(scale / SCALE_STEP) * SCALE_STEP, 2)
+
+
+def render_page(pdf_path: str, page_number: int, scale: float, image_format: str) -> bytes:
+    """
+    Renderizar una página de un PDF (se ejecuta en el pool de procesos)
+
+    Args:
+        pdf_path: Ruta del PDF
+        page_number: Página (empezando en 1)
+        scale: Factor de zoom (1.0 = 72 dpi); se reduce si la imagen
+               superaría MAX_PIXELS
+        image_format: "webp" o "png" (ver resolve_format)
+
+    Raises:
+        IndexError: si la página no existe
+    """
+    import fitz  # PyMuPDF
+
+    with fitz.open(pdf_path) as doc:
+        if not 1 <= page_number <= len(doc):
+            raise IndexError(f"El PDF tiene {len(doc)} páginas")
+        page = doc[page_number - 1]
+        width, height = page.rect.width, page.rect.height
+        if width * height * scale * scale > MAX_PIXELS:
+            scale = math.sqrt(MAX_PIXELS / (width * height))
+            # El tamaño en píxeles se redondea hacia arriba
+            while math.ceil(width * scale) * math.ceil(height * scale) > MAX_PIXELS:
+                scale *= 0.999
+        pixmap = page.get_pixmap(matrix=fitz.Matrix(scale, scale), alpha=False)
+
+    if image_format == "webp":
+        from PIL import Image
+        image = Image.frombytes("RGB", (pixmap.width, pixmap.height), pixmap.samples)
+        buffer = io.BytesIO()
+        image.save(buffer, format="WEBP", quality=82, method=4)
+        return buffer.getvalue()
+
+    return pixmap.tobytes("png")
+
+
+class PageRasters:
+    """
+    Caché de páginas renderizadas
+
+    La clave es el SHA-256 del PDF, la página, la escala y el formato, así
+    que una página abierta por varios docentes se renderiza una sola vez.
+    Peticiones simultáneas de la misma página esperan el mismo renderizado.
+    """
+
+    def __init__(self):
+        self.cache = DiskCache(
+            "page_raster",
+            FileStorage.CACHE_DIR / "pages",
+            max_bytes=int(os.getenv("PAGE_CACHE_MAX_MB", "1024")) * 1024 * 1024
+        )
+        self._pending = SingleFlight()
+
+    @staticmethod
+    def cache_key(digest: str, page_number: int, scale: float, image_format: str) -> str:
+        return f"{digest}-r{RASTER_VERSION}-p{page_number}-s{scale:g}.{image_format}"
+
+    async def get_key(self, pdf_path: Path, page_number: int, scale: float, image_format: str) -> str:
+        """Clave de caché (y ETag) de una página"""
+        digest = await asyncio.to_thread(file_sha256, pdf_path)
+        return self.cache_key(digest, page_number, scale, image_format)
+
+    async def get(self, key: str, pdf_path: Path, page_number: int, scale: float,
+                  image_format: str) -> Tuple[Path, bool]:
+        """
+        Ruta de la imagen de una página, renderizándola si no está en caché
+
+        Returns:
+            (ruta en caché, True si venía de caché)
+        """
+        cached_path = await asyncio.to_thread(self.cache.get, key)
+        if cached_path is not None:
+            return cached_path, True
+
+        async def render():
+            image = await WorkerPool.run(render_page, str(pdf_path), page_number, scale, image_format)
+            return await asyncio.to_thread(self.cache.put_bytes, key, image)
+
+        return await self._pending.run(key, render), False
+
+
+# Instancia global de la caché de páginas
+page_rasters = PageRasters()
@@ -0,0 +1,222 @@
+"""
+Índice de archivos subidos
+Nombre de archivo (file_id) -> ruta dentro de uploads/, para encontrar
+archivos cuya ruta guardada en el proyecto quedó desactualizada sin
+recorrer todo el árbol en cada petición
+"""
+import asyncio
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from .file_storage import FileStorage
+
+
+# Cambiar al modificar el formato del archivo del índice
+INDEX_VERSION = 1
+
+
+class PathIndex:
+    """
+    Índice persistido en data/path_index.json (fuera de uploads: lista las
+    rutas de todas las entregas y uploads se sirve público)
+
+    Guarda, por directorio, su mtime, sus archivos y sus subdirectorios.
+    Crear, borrar o renombrar un archivo cambia el mtime de su directorio,
+    así que una actualización solo vuelve a listar los directorios que
+    cambiaron; del resto basta con un stat.
+
+    Se construye al arrancar en segundo plano y FileStorage le avisa de
+    cada archivo guardado o eliminado. Solo un nombre que no está en el
+    índice obliga a actualizarlo; si tampoco aparece, el fallo se recuerda
+    MISS_TTL segundos para que los 404 repetidos no recorran el disco.
+    """
+
+    INDEX_PATH = FileStorage.DATA_DIR / "path_index.json"
+    # Cachés que versiones anteriores guardaban en uploads/cache
+    EXCLUDED_DIRS = {"cache"}
+    MISS_TTL = 60
+
+    def __init__(self):
+        # directorio relativo -> {"mtime": ns, "files": [...], "subdirs": [...]}
+        self._dirs: Dict[str, dict] = {}
+        self._paths: Dict[str, str] = {}
+        # nombre no encontrado -> instante (monotonic) hasta el que se recuerda
+        self._misses: Dict[str, float] = {}
+        self._loaded = False
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Cargar y actualizar el índice en segundo plano al arrancar"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._warm_up())
+
+    async def _warm_up(self):
+        try:
+            async with self._lock:
+                await asyncio.to_thread(self._load_and_refresh)
+        except Exception as e:
+            print(f"⚠️ No se pudo construir el índice de archivos: {e}")
+
+    def _load_and_refresh(self):
+        if not self._loaded:
+            self._load()
+        self.refresh()
+
+    def add(self, relative_path: str):
+        """Registrar un archivo recién guardado (ruta relativa a uploads/)"""
+        name = Path(relative_path).name
+        self._paths[name] = Path(relative_path).as_posix()
+        self._misses.pop(name, None)
+
+    def remove(self, relative_path: str):
+        """Quitar un archivo eliminado"""
+        name = Path(relative_path).name
+        if self._paths.get(name) == Path(relative_path).as_posix():
+            del self._paths[name]
+
+    async def find(self, file_path: Optional[str], file_id: Optional[str]) -> Optional[Path]:
+        """
+        Buscar un archivo por su nombre (file_id o último componente de file_path)
+
+        Los aciertos no esperan al candado. Si no está en el índice o la ruta
+        indexada ya no existe, se actualiza el índice (solo los directorios
+        que cambiaron) y se busca de nuevo, salvo que el mismo nombre haya
+        fallado hace menos de MISS_TTL segundos.
+
+        Returns:
+            Ruta absoluta o None si el archivo no existe en uploads/
+        """
+        names = [name for name in (file_id, Path(file_path).name if file_path else None) if name]
+        if not names:
+            return None
+
+        found = await asyncio.to_thread(self._lookup, names) if self._loaded else None
+        if found is not None:
+            return found
+
+        now = time.monotonic()
+        if all(self._misses.get(name, 0) > now for name in names):
+            return None
+
+        async with self._lock:
+            if not self._loaded:
+                await asyncio.to_thread(self._load)
+
+            # Otra petición pudo actualizar el índice mientras se esperaba el candado
+            found = await asyncio.to_thread(self._lookup, names)
+            if found is None:
+                await asyncio.to_thread(self.refresh)
+                found = await asyncio.to_thread(self._lookup, names)
+
+            if found is None:
+                expires = time.monotonic() + self.MISS_TTL
+                for name in names:
+                    self._misses[name] = expires
+                # Descartar los fallos vencidos para que el diccionario no crezca
+                if len(self._misses) > 1024:
+                    self._misses = {name: until for name, until in self._misses.items() if until > now}
+
+        return found
+
+    def _lookup(self, names: Iterable[str]) -> Optional[Path]:
+        for name in names:
+            relative = self._paths.get(name)
+            if relative is not None:
+                path = FileStorage.BASE_DIR / relative
+                if path.is_file():
+                    return path
+        return None
+
+    def refresh(self) -> int:
+        """
+        Actualizar el índice con los cambios del disco (bloqueante)
+
+        Returns:
+            Número de directorios que se volvieron a listar
+        """
+        relisted = 0
+        seen = set()
+        pending = [""]
+        while pending:
+            relative = pending.pop()
+            directory = FileStorage.BASE_DIR / relative
+            try:
+                mtime = directory.stat().st_mtime_ns
+            except FileNotFoundError:
+                continue
+            seen.add(relative)
+
+            entry = self._dirs.get(relative)
+            if entry is None or entry["mtime"] != mtime:
+                entry = self._list(directory, relative, mtime)
+                if entry is None:
+                    continue
+                self._dirs[relative] = entry
+                relisted += 1
+
+            pending.extend(entry["subdirs"])
+
+        removed = set(self._dirs) - seen
+        for relative in removed:
+            del self._dirs[relative]
+
+        if relisted or removed:
+            self._rebuild_paths()
+            self._save()
+            print(f"🗂️ Índice de archivos actualizado: {relisted} directorios listados, {len(self._paths)} archivos")
+
+        return relisted
+
+    def _list(self, directory: Path, relative: str, mtime: int) -> Optional[dict]:
+        files = []
+        subdirs = []
+        try:
+            with os.scandir(directory) as entries:
+                for item in entries:
+                    if item.name.startswith("."):
+                        continue
+                    if item.is_dir(follow_symlinks=False):
+                        if not (relative == "" and item.name in self.EXCLUDED_DIRS):
+                            subdirs.append(f"{relative}/{item.name}" if relative else item.name)
+                    elif item.is_file():
+                        files.append(item.name)
+        except FileNotFoundError:
+            return None
+        return {"mtime": mtime, "files": files, "subdirs": subdirs}
+
+    def _rebuild_paths(self):
+        self._paths = {
+            name: f"{relative}/{name}" if relative else name
+            for relative, entry in self._dirs.items()
+            for name in entry["files"]
+        }
+
+    def _load(self):
+        self._loaded = True
+        try:
+            data = json.loads(self.INDEX_PATH.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        if data.get("version") == INDEX_VERSION:
+            self._dirs = data.get("dirs", {})
+            self._rebuild_paths()
+
+    def _save(self):
+        temp_path = self.INDEX_PATH.with_suffix(".tmp")
+        try:
+            self.INDEX_PATH.parent.mkdir(parents=True, exist_ok=True)
+            temp_path.write_text(
+                json.dumps({"version": INDEX_VERSION, "dirs": self._dirs}),
+                encoding="utf-8"
+            )
+            os.replace(temp_path, self.INDEX_PATH)
+        except OSError as e:
+            print(f"⚠️ No se pudo guardar el índice de archivos: {e}")
+
+
+# Instancia global del índice
+path_index = PathIndex()
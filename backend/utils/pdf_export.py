@@ -0,0 +1,147 @@
+"""
+Exportación de PDF con anotaciones
+Incrusta las anotaciones del docente (resaltados, subrayados, tachados y
+comentarios) en una copia del PDF del proyecto
+"""
+import asyncio
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import List
+
+from .content_hash import file_sha256
+from .disk_cache import DiskCache
+from .file_storage import FileStorage
+from .single_flight import SingleFlight
+from .workers import WorkerPool
+
+
+# Cambiar al modificar el dibujo de las anotaciones para invalidar la caché
+EXPORT_VERSION = "1"
+
+# Colores del visor (PDFEvaluationViewer) en RGB 0-1
+ANNOTATION_COLORS = {
+    "yellow": (1.0, 0.92, 0.23),
+    "red": (0.94, 0.27, 0.27),
+    "green": (0.13, 0.77, 0.37),
+    "blue": (0.23, 0.51, 0.96)
+}
+
+# Campos de una anotación que cambian el PDF exportado
+RENDERED_FIELDS = ("id", "page", "rect", "color", "type", "comment", "author_name")
+
+
+def burn_annotations(pdf_path: str, annotations: List[dict], output_path: str) -> dict:
+    """
+    Escribir las anotaciones en una copia del PDF (se ejecuta en el pool de procesos)
+
+    Los rectángulos vienen normalizados ([0, 1], origen arriba a la
+    izquierda) como los guarda el visor. Resaltados, subrayados y tachados
+    llevan el comentario como contenido de la ventana emergente; los
+    comentarios sueltos se dibujan como nota en la esquina del rectángulo.
+
+    Returns:
+        dict con el número de anotaciones incrustadas y omitidas
+    """
+    import fitz  # PyMuPDF
+
+    written = 0
+    skipped = 0
+    with fitz.open(pdf_path) as doc:
+        for annotation in annotations:
+            page_number = annotation.get("page", 0)
+            rect_values = annotation.get("rect") or []
+            if not 1 <= page_number <= len(doc) or len(rect_values) != 4:
+                skipped += 1
+                continue
+
+            page = doc[page_number - 1]
+            bounds = page.rect
+            x0, y0, x1, y1 = rect_values
+            rect = fitz.Rect(
+                bounds.x0 + min(x0, x1) * bounds.width,
+                bounds.y0 + min(y0, y1) * bounds.height,
+                bounds.x0 + max(x0, x1) * bounds.width,
+                bounds.y0 + max(y0, y1) * bounds.height
+            )
+            # Las anotaciones se guardan sin rotación de la página
+            rect = rect * page.derotation_matrix
+
+            annotation_type = annotation.get("type", "highlight")
+            if annotation_type == "underline":
+                annot = page.add_underline_annot(rect)
+            elif annotation_type == "strikeout":
+                annot = page.add_strikeout_annot(rect)
+            elif annotation_type == "comment" or rect.is_empty:
+                annot = page.add_text_annot(rect.tl, annotation.get("comment", ""), icon="Comment")
+            else:
+                annot = page.add_highlight_annot(rect)
+
+            color = ANNOTATION_COLORS.get(annotation.get("color"), ANNOTATION_COLORS["yellow"])
+            annot.set_colors(stroke=color)
+            annot.set_info(
+                content=annotation.get("comment", ""),
+                title=annotation.get("author_name", "")
+            )
+            annot.update()
+            written += 1
+
+        doc.save(output_path, garbage=3, deflate=True)
+
+    return {"annotations": written, "skipped": skipped}
+
+
+class AnnotatedPdfExports:
+    """
+    PDF exportados en caché
+
+    La clave combina el SHA-256 del PDF con el de las anotaciones (solo los
+    campos que se dibujan, ordenadas por id): mientras nada cambie, las
+    descargas repetidas se sirven desde disco.
+    """
+
+    def __init__(self):
+        self.cache = DiskCache(
+            "pdf_export",
+            FileStorage.CACHE_DIR / "exports",
+            max_bytes=int(os.getenv("EXPORT_CACHE_MAX_MB", "512")) * 1024 * 1024
+        )
+        self._pending = SingleFlight()
+
+    @staticmethod
+    def annotations_digest(annotations: List[dict]) -> str:
+        rendered = sorted(
+            ({field: annotation.get(field) for field in RENDERED_FIELDS} for annotation in annotations),
+            key=lambda annotation: (str(annotation["id"]), annotation["page"] or 0)
+        )
+        payload = json.dumps(rendered, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def export(self, pdf_path: Path, annotations: List[dict]) -> Path:
+        """Ruta del PDF con anotaciones, generándolo si no está en caché"""
+        pdf_digest = await asyncio.to_thread(file_sha256, pdf_path)
+        combined = hashlib.sha256(
+            f"{pdf_digest}:{self.annotations_digest(annotations)}:{EXPORT_VERSION}".encode()
+        ).hexdigest()
+        key = f"{combined}.pdf"
+
+        cached_path = await asyncio.to_thread(self.cache.get, key)
+        if cached_path is not None:
+            return cached_path
+
+        async def burn():
+            temp_path = self.cache.temp_path(key)
+            try:
+                result = await WorkerPool.run(burn_annotations, str(pdf_path), annotations, str(temp_path))
+                cached_path = await asyncio.to_thread(self.cache.put_file, key, temp_path)
+                print(f"📝 PDF exportado con {result['annotations']} anotaciones ({result['skipped']} omitidas)")
+                return cached_path
+            finally:
+                temp_path.unlink(missing_ok=True)
+
+        return await self._pending.run(key, burn)
+
+
+# Instancia global de las exportaciones
+annotated_pdf_exports = AnnotatedPdfExports()
@@ -0,0 +1,196 @@
+"""
+Metadatos de los PDF de los proyectos
+Páginas, tamaño de cada página, palabras, esquema y títulos de sección,
+calculados en una sola pasada al guardar o convertir el archivo
+"""
+import hashlib
+import re
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Union
+
+from config.database import Database, DatabaseConfig
+from .keyword_index import normalize_keyword
+from .workers import WorkerPool
+
+
+# Cambiar al añadir datos al análisis para volver a analizar los archivos guardados
+ANALYSIS_VERSION = 2
+
+# Una línea es candidata a título si su letra es al menos este factor mayor
+# que la del cuerpo del texto, o si está en negrita y es corta
+HEADING_SIZE_RATIO = 1.15
+MAX_HEADING_CHARS = 90
+MAX_SECTION_TITLES = 200
+
+# "1.", "1.2", "CAPÍTULO I", "II." al inicio de una línea de título
+_NUMBERED_HEADING = re.compile(r"^((cap[ií]tulo|secci[oó]n)\s+\w+|[ivxlc]+\.|\d+(\.\d+)*\.?)\s", re.IGNORECASE)
+
+# Bit de negrita en los flags de los spans de PyMuPDF
+_BOLD_FLAG = 16
+
+
+def describe_document(doc) -> dict:
+    """
+    Analizar un documento PyMuPDF ya abierto recorriendo cada página una vez
+
+    Returns:
+        dict con pages, page_sizes ([ancho, alto] en puntos por página),
+        word_count, pdf_version, outline (marcadores del PDF), section_titles
+        (títulos detectados con la página donde aparecen) y text (texto plano)
+    """
+    page_sizes = []
+    page_texts = []
+    word_count = 0
+    # (texto, página, tamaño de letra, negrita)
+    candidates = []
+    size_chars: Counter = Counter()
+
+    for number, page in enumerate(doc, start=1):
+        page_sizes.append([round(page.rect.width, 2), round(page.rect.height, 2)])
+        lines = []
+        for block in page.get_text("dict")["blocks"]:
+            for line in block.get("lines", ()):
+                spans = [span for span in line["spans"] if span["text"].strip()]
+                if not spans:
+                    continue
+                text = " ".join("".join(span["text"] for span in spans).split())
+                lines.append(text)
+                word_count += len(text.split())
+
+                size = round(max(span["size"] for span in spans), 1)
+                size_chars[size] += len(text)
+                if len(text) <= MAX_HEADING_CHARS:
+                    bold = all(span["flags"] & _BOLD_FLAG for span in spans)
+                    candidates.append((text, number, size, bold))
+        page_texts.append("\n".join(lines))
+
+    toc = doc.get_toc(simple=True)
+    outline = [
+        {"level": level, "title": " ".join(title.split()), "page": page}
+        for level, title, page in toc
+        if title.strip()
+    ]
+
+    if outline:
+        section_titles = [{"title": entry["title"], "page": entry["page"]} for entry in outline]
+    else:
+        section_titles = []
+        body_size = size_chars.most_common(1)[0][0] if size_chars else 0
+        for text, number, size, bold in candidates:
+            larger = body_size and size >= body_size * HEADING_SIZE_RATIO
+            if (larger or (bold and _NUMBERED_HEADING.match(text)) or (bold and text.isupper())) \
+                    and any(c.isalpha() for c in text):
+                section_titles.append({"title": text, "page": number})
+                if len(section_titles) >= MAX_SECTION_TITLES:
+                    break
+
+    return {
+        "pages": len(page_sizes),
+        "page_sizes": page_sizes,
+        "word_count": word_count,
+        "pdf_version": (doc.metadata or {}).get("format"),
+        "outline": outline,
+        "section_titles": section_titles,
+        "text": "\f".join(page_texts),
+        "analysis_version": ANALYSIS_VERSION
+    }
+
+
+def describe_pdf(source: Union[bytes, str]) -> dict:
+    """
+    Extraer los metadatos de un PDF (se ejecuta en el pool de procesos)
+
+    Args:
+        source: Contenido del PDF o ruta del archivo
+    """
+    import fitz  # PyMuPDF
+
+    if isinstance(source, bytes):
+        doc = fitz.open(stream=source, filetype="pdf")
+    else:
+        doc = fitz.open(source)
+
+    with doc:
+        return describe_document(doc)
+
+
+async def store_text(metadata: dict) -> dict:
+    """
+    Guardar el texto plano aparte y dejar en los metadatos solo su referencia
+
+    El texto va a su propia colección (por SHA-256 del texto) para no cargarlo
+    con cada lectura del proyecto.
+    """
+    text = metadata.pop("text", None)
+    if text is None:
+        return metadata
+
+    text_id = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    texts_collection = Database.get_collection(DatabaseConfig.DOCUMENT_TEXTS_COLLECTION)
+    await texts_collection.update_one(
+        {"_id": text_id},
+        {"$setOnInsert": {"text": text, "created_at": datetime.utcnow()}},
+        upsert=True
+    )
+    metadata["text_id"] = text_id
+    metadata["text_length"] = len(text)
+    return metadata
+
+
+async def analyze_pdf(source: Union[bytes, Path]) -> Optional[dict]:
+    """
+    Calcular los metadatos de un PDF en el pool de procesos
+
+    Returns:
+        Metadatos para guardar en el archivo del proyecto o None si el PDF
+        no se pudo leer
+    """
+    try:
+        metadata = await WorkerPool.run(
+            describe_pdf,
+            source if isinstance(source, bytes) else str(source)
+        )
+        metadata["analyzed_at"] = datetime.utcnow()
+        return await store_text(metadata)
+    except Exception as e:
+        print(f"⚠️ No se pudieron obtener los metadatos del PDF: {e}")
+        return None
+
+
+def check_requirements(metadata: dict, requirements: dict) -> dict:
+    """
+    Comparar los metadatos de un documento con los requisitos de la materia
+    (models.subject.SubjectRequirements) sin volver a abrir el archivo
+
+    Una sección requerida se considera presente si algún título detectado la
+    contiene, sin distinguir mayúsculas ni acentos.
+    """
+    pages = metadata.get("pages") or 0
+    min_pages = requirements.get("min_pages")
+    max_pages = requirements.get("max_pages")
+    titles = [
+        (normalize_keyword(entry["title"]), entry)
+        for entry in metadata.get("section_titles", [])
+    ]
+
+    sections = []
+    for required in requirements.get("required_sections", []):
+        wanted = normalize_keyword(required)
+        match = next((entry for title, entry in titles if wanted and wanted in title), None)
+        sections.append({
+            "section": required,
+            "found": match is not None,
+            "title": match["title"] if match else None,
+            "page": match["page"] if match else None
+        })
+
+    pages_ok = (min_pages is None or pages >= min_pages) and (max_pages is None or pages <= max_pages)
+    return {
+        "pages": {"value": pages, "min": min_pages, "max": max_pages, "ok": pages_ok},
+        "sections": sections,
+        "missing_sections": [entry["section"] for entry in sections if not entry["found"]],
+        "ok": pages_ok and all(entry["found"] for entry in sections)
+    }
+
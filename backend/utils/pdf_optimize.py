@@ -0,0 +1,85 @@
+"""
+Optimización de los PDF subidos
+Reescribe el PDF con PyMuPDF (objetos sin uso eliminados, flujos
+comprimidos, imágenes reducidas opcionalmente) antes de guardarlo
+"""
+import inspect
+import os
+from typing import Optional
+
+from .metrics import metrics
+
+
+# Resolución máxima de las imágenes (0 = no reducir)
+IMAGE_MAX_DPI = int(os.getenv("PDF_IMAGE_MAX_DPI", "0"))
+OPTIMIZE_ENABLED = os.getenv("PDF_OPTIMIZE", "true").lower() != "false"
+
+# Solo compensa guardar la copia si ahorra al menos esta fracción
+MIN_SAVING_RATIO = 0.02
+
+# Las versiones recientes de MuPDF ya no linealizan; se detecta una vez por proceso
+_linear_supported: Optional[bool] = None
+
+
+def optimize_document(doc, original_size: int, image_max_dpi: int = 0) -> Optional[bytes]:
+    """
+    Reescribir un documento PyMuPDF ya abierto
+
+    Args:
+        doc: Documento abierto (se modifica si se reducen las imágenes)
+        original_size: Tamaño en bytes del PDF original
+        image_max_dpi: Reducir a esta resolución las imágenes que la superen
+                       (0 = dejarlas como están)
+
+    Returns:
+        El PDF optimizado o None si no resulta más pequeño
+    """
+    global _linear_supported
+    import fitz  # PyMuPDF
+
+    if doc.needs_pass or doc.is_encrypted:
+        return None
+
+    if image_max_dpi and hasattr(doc, "rewrite_images"):
+        doc.rewrite_images(
+            dpi_threshold=int(image_max_dpi * 1.2),
+            dpi_target=image_max_dpi,
+            quality=80
+        )
+
+    options = {
+        "garbage": 3,
+        "deflate": True,
+        "deflate_images": True,
+        "deflate_fonts": True
+    }
+    if "use_objstms" in inspect.signature(fitz.Document.save).parameters:
+        options["use_objstms"] = 1
+
+    optimized = None
+    if _linear_supported is not False:
+        try:
+            # Linealizado: el visor puede mostrar la primera página sin descargar todo
+            optimized = doc.tobytes(linear=True, **options)
+            _linear_supported = True
+        except (RuntimeError, ValueError):
+            _linear_supported = False
+    if optimized is None:
+        optimized = doc.tobytes(**options)
+
+    if len(optimized) > original_size * (1 - MIN_SAVING_RATIO):
+        return None
+    return optimized
+
+
+def record_optimization(content: bytes, optimized: Optional[bytes]) -> bytes:
+    """Registrar en las métricas el resultado y devolver la versión a guardar"""
+    if optimized is None:
+        metrics.increment("pdf_optimize_skipped")
+        return content
+
+    saved = len(content) - len(optimized)
+    metrics.increment("pdf_optimized")
+    metrics.increment("pdf_optimize_bytes_saved", saved)
+    print(f"🗜️ PDF optimizado: {len(content) / 1024:.0f} KB -> {len(optimized) / 1024:.0f} KB")
+    return optimized
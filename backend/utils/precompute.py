@@ -0,0 +1,266 @@
+"""
+Precálculo masivo de entregas
+Convierte a PDF y parsea los DOCX pendientes antes de que los docentes los
+abran (p. ej. la noche después de una fecha de entrega)
+"""
+import asyncio
+import json
+import os
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List, Optional
+
+from config.database import Database, DatabaseConfig
+from .docx_cache import parsed_docx_cache
+from .file_storage import FileStorage
+from .project_conversion import conversion_jobs, finish_project_conversion, submit_project_conversion
+from .workers import WorkerPool
+
+
+class SubmissionPrecompute:
+    """
+    Recorrido de los proyectos con DOCX sin PDF o sin parsear
+
+    Un número acotado de tareas toma los proyectos de una cola, así que
+    nunca hay más de `concurrency` documentos ocupando el pool de procesos.
+    Cada proyecto terminado sin error se anota en un checkpoint en disco:
+    si el recorrido se interrumpe (reinicio del servidor), el siguiente
+    continúa donde quedó y vuelve a intentar los que fallaron.
+    """
+
+    CHECKPOINT_PATH = FileStorage.DATA_DIR / "precompute_checkpoint.json"
+    # Proyectos procesados entre cada mensaje de progreso
+    PROGRESS_EVERY = 10
+    # Hora local del recorrido nocturno ("off" para desactivarlo)
+    NIGHTLY_HOUR = os.getenv("PRECOMPUTE_HOUR", "2")
+
+    def __init__(self):
+        self.progress = {"status": "idle"}
+        self._run_task: Optional[asyncio.Task] = None
+        self._scheduler: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._run_task is not None and not self._run_task.done()
+
+    async def scan(self, limit: Optional[int] = None) -> List[dict]:
+        """
+        Proyectos cuyo DOCX no tiene PDF o no está en la caché de parseo
+
+        Returns:
+            Una entrada por proyecto con project_id, source, needs_pdf y
+            needs_parse
+        """
+        projects_collection = Database.get_collection(DatabaseConfig.PROJECTS_COLLECTION)
+        cursor = projects_collection.find(
+            {"versions.0.files.0.file_path": {"$regex": r"\.docx$", "$options": "i"}},
+            {"title": 1, "created_by": 1, "versions.files": 1}
+        ).sort("updated_at", -1)
+
+        pending = []
+        async for project in cursor:
+            file_info = project["versions"][0]["files"][0]
+            source = FileStorage.BASE_DIR / file_info["file_path"]
+            if not await asyncio.to_thread(source.exists):
+                continue
+
+            pdf_path = file_info.get("pdf_path")
+            needs_pdf = not pdf_path or not await asyncio.to_thread((FileStorage.BASE_DIR / pdf_path).exists)
+            needs_parse = not await asyncio.to_thread(parsed_docx_cache.is_cached, source)
+            if needs_pdf or needs_parse:
+                pending.append({
+                    "project_id": str(project["_id"]),
+                    "project": project,
+                    "source": source,
+                    "needs_pdf": needs_pdf,
+                    "needs_parse": needs_parse
+                })
+                if limit and len(pending) >= limit:
+                    break
+
+        return pending
+
+    async def run(self, concurrency: Optional[int] = None, limit: Optional[int] = None,
+                  resume: bool = True) -> dict:
+        """
+        Ejecutar un recorrido completo
+
+        Args:
+            concurrency: Documentos procesados a la vez (por defecto, los
+                         procesos del pool)
+            limit: Máximo de proyectos a procesar
+            resume: Saltar los proyectos ya terminados por un recorrido
+                    interrumpido
+
+        Returns:
+            Progreso final (ver self.progress)
+        """
+        concurrency = max(1, concurrency or WorkerPool.MAX_WORKERS)
+        checkpoint = await asyncio.to_thread(self._load_checkpoint)
+        if not resume or checkpoint is None or checkpoint.get("finished_at"):
+            checkpoint = {
+                "run_id": uuid.uuid4().hex,
+                "started_at": datetime.utcnow().isoformat(),
+                "finished_at": None,
+                "completed": []
+            }
+        completed = set(checkpoint["completed"])
+
+        self.progress = {
+            "status": "scanning",
+            "run_id": checkpoint["run_id"],
+            "started_at": checkpoint["started_at"],
+            "finished_at": None,
+            "concurrency": concurrency,
+            "total": 0,
+            "processed": 0,
+            "converted": 0,
+            "parsed": 0,
+            "resumed": len(completed),
+            "failed": 0,
+            "errors": {}
+        }
+        print(f"🌙 Precálculo de entregas iniciado ({concurrency} a la vez)")
+
+        pending = [entry for entry in await self.scan(limit) if entry["project_id"] not in completed]
+        self.progress.update({"status": "running", "total": len(pending)})
+
+        queue: asyncio.Queue = asyncio.Queue()
+        for entry in pending:
+            queue.put_nowait(entry)
+        save_lock = asyncio.Lock()
+
+        async def worker():
+            while True:
+                try:
+                    entry = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                if not await self._process(entry):
+                    continue
+                checkpoint["completed"].append(entry["project_id"])
+                payload = json.dumps(checkpoint)
+                async with save_lock:
+                    await asyncio.to_thread(self._save_checkpoint, payload)
+
+        try:
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+        except asyncio.CancelledError:
+            self.progress["status"] = "interrupted"
+            print(f"⏸️ Precálculo interrumpido en {self.progress['processed']}/{self.progress['total']}")
+            raise
+
+        checkpoint["finished_at"] = datetime.utcnow().isoformat()
+        await asyncio.to_thread(self._save_checkpoint, json.dumps(checkpoint))
+        self.progress.update({"status": "completed", "finished_at": checkpoint["finished_at"]})
+        print(
+            f"✅ Precálculo terminado: {self.progress['converted']} convertidos, "
+            f"{self.progress['parsed']} parseados, {self.progress['failed']} con error"
+        )
+        return self.progress
+
+    async def _process(self, entry: dict) -> bool:
+        """
+        Convertir y parsear un proyecto; los errores se registran sin detener el recorrido
+
+        Returns:
+            True si el proyecto quedó precalculado
+        """
+        source = entry["source"]
+        succeeded = False
+        try:
+            if entry["needs_pdf"]:
+                pdf_path = source.with_suffix(".pdf")
+                if await asyncio.to_thread(pdf_path.exists):
+                    # Convertido antes pero sin registrar en el proyecto
+                    await finish_project_conversion(entry["project"], pdf_path, FileStorage.BASE_DIR)
+                else:
+                    # Mismo registro que el endpoint: si un docente abre la entrega
+                    # mientras tanto, ambos esperan una sola conversión
+                    job = submit_project_conversion(entry["project"], source, pdf_path, FileStorage.BASE_DIR)
+                    job = await conversion_jobs.wait(job["job_id"])
+                    if job["status"] == "failed":
+                        raise RuntimeError(job["error"])
+                self.progress["converted"] += 1
+
+            if entry["needs_parse"] and await parsed_docx_cache.warm(source):
+                self.progress["parsed"] += 1
+            succeeded = True
+
+        except Exception as e:
+            self.progress["failed"] += 1
+            self.progress["errors"][entry["project_id"]] = str(e)
+            print(f"❌ Error precalculando proyecto {entry['project_id']}: {e}")
+
+        self.progress["processed"] += 1
+        processed, total = self.progress["processed"], self.progress["total"]
+        if processed % self.PROGRESS_EVERY == 0 or processed == total:
+            print(f"⏳ Precálculo: {processed}/{total} ({self.progress['failed']} con error)")
+        return succeeded
+
+    def trigger(self, concurrency: Optional[int] = None, limit: Optional[int] = None,
+                resume: bool = True) -> bool:
+        """
+        Lanzar un recorrido en segundo plano
+
+        Returns:
+            False si ya había uno en curso
+        """
+        if self.running:
+            return False
+        self._run_task = asyncio.create_task(self._safe_run(concurrency, limit, resume))
+        return True
+
+    async def _safe_run(self, concurrency: Optional[int], limit: Optional[int], resume: bool):
+        try:
+            await self.run(concurrency, limit, resume)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.progress.update({"status": "failed", "error": str(e)})
+            print(f"❌ Error en el precálculo de entregas: {e}")
+
+    def start(self):
+        """Programar el recorrido nocturno"""
+        if self._scheduler is None and self.NIGHTLY_HOUR.isdigit():
+            self._scheduler = asyncio.create_task(self._nightly())
+
+    async def stop(self):
+        """Detener el programador y el recorrido en curso (queda el checkpoint)"""
+        for task in (self._scheduler, self._run_task):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._scheduler = None
+        self._run_task = None
+
+    async def _nightly(self):
+        hour = int(self.NIGHTLY_HOUR) % 24
+        while True:
+            now = datetime.now()
+            next_run = now.replace(hour=hour, minute=0, second=0, microsecond=0)
+            if next_run <= now:
+                next_run += timedelta(days=1)
+            await asyncio.sleep((next_run - now).total_seconds())
+            if not self.trigger():
+                print("⚠️ Precálculo nocturno omitido: ya hay un recorrido en curso")
+
+    def _load_checkpoint(self) -> Optional[dict]:
+        try:
+            return json.loads(self.CHECKPOINT_PATH.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def _save_checkpoint(self, payload: str):
+        self.CHECKPOINT_PATH.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.CHECKPOINT_PATH.with_suffix(".tmp")
+        temp_path.write_text(payload, encoding="utf-8")
+        os.replace(temp_path, self.CHECKPOINT_PATH)
+
+
+# Instancia global del precálculo
+submission_precompute = SubmissionPrecompute()
@@ -0,0 +1,98 @@
+"""
+Conversión a PDF de los DOCX de los proyectos
+Compartida por el endpoint de conversión y el precálculo masivo
+"""
+import asyncio
+import os
+from datetime import datetime
+from pathlib import Path
+
+from config.database import Database
+from .conversion_cache import convert_docx_cached
+from .jobs import JobRegistry
+from .pdf_metadata import analyze_pdf
+
+
+# Conversiones DOCX -> PDF en curso o recientes (endpoint y precálculo)
+conversion_jobs = JobRegistry("conversión a PDF")
+
+
+async def finish_project_conversion(project: dict, pdf_path: Path, base_path: Path) -> dict:
+    """
+    Publicar y registrar un PDF convertido: subida a Cloudinary si está
+    configurado y rutas del PDF en el archivo del proyecto
+    """
+    storage_type = os.getenv("STORAGE_TYPE", "local")
+    pdf_url = f"/uploads/{pdf_path.relative_to(base_path)}"
+    cloudinary_info = {}
+
+    if storage_type == "cloudinary":
+        # Leer el PDF generado y subirlo sin bloquear el event loop
+        pdf_content = await asyncio.to_thread(pdf_path.read_bytes)
+        from utils.cloudinary_storage import CloudinaryStorage
+        cloudinary_result = await asyncio.to_thread(
+            CloudinaryStorage.upload_pdf,
+            pdf_content,
+            f"{project['title']}.pdf",
+            str(project['created_by'])
+        )
+
+        if cloudinary_result["success"]:
+            pdf_url = cloudinary_result["file_url"]
+            cloudinary_info = {
+                "pdf_url": pdf_url,
+                "pdf_cloudinary": True,
+                "pdf_public_id": cloudinary_result["public_id"]
+            }
+            print(f"☁️ PDF subido a Cloudinary: {pdf_url}")
+        else:
+            print(f"❌ Error subiendo a Cloudinary: {cloudinary_result.get('error')}")
+
+    # Guardar la información del PDF en el proyecto
+    update_data = {
+        "versions.0.files.0.pdf_path": str(pdf_path.relative_to(base_path)),
+        "versions.0.files.0.pdf_generated_at": datetime.utcnow(),
+        "versions.0.files.0.pdf_url": pdf_url
+    }
+
+    # Páginas, tamaños y palabras del PDF generado, para pdf-info
+    pdf_metadata = await analyze_pdf(pdf_path)
+    if pdf_metadata:
+        update_data["versions.0.files.0.metadata"] = pdf_metadata
+
+    for key, value in cloudinary_info.items():
+        update_data[f"versions.0.files.0.{key}"] = value
+
+    projects_collection = Database.get_collection("projects")
+    await projects_collection.update_one(
+        {"_id": project["_id"]},
+        {"$set": update_data}
+    )
+
+    return {
+        "message": "DOCX convertido a PDF exitosamente",
+        "pdf_path": str(pdf_path.relative_to(base_path)),
+        "pdf_url": pdf_url,
+        "cloudinary": cloudinary_info.get("pdf_cloudinary", False)
+    }
+
+
+async def run_project_conversion(project: dict, full_path: Path, pdf_path: Path, base_path: Path) -> dict:
+    """Convertir el DOCX (o reutilizar la conversión en caché) y registrar el resultado"""
+    conversion = await convert_docx_cached(full_path, pdf_path)
+    result = await finish_project_conversion(project, pdf_path, base_path)
+    return {**result, "from_cache": conversion["cached"]}
+
+
+def submit_project_conversion(project: dict, full_path: Path, pdf_path: Path, base_path: Path) -> dict:
+    """
+    Encolar la conversión en conversion_jobs, o unirse a la que ya está en
+    curso para el mismo archivo (un docente y el precálculo a la vez)
+
+    Returns:
+        El trabajo (ver JobRegistry)
+    """
+    return conversion_jobs.submit(
+        str(full_path),
+        lambda: run_project_conversion(project, full_path, pdf_path, base_path)
+    )
@@ -0,0 +1,74 @@
+"""
+Contadores de vistas y descargas de proyectos
+Los incrementos se agrupan en memoria y se escriben con un solo bulk_write
+"""
+from collections import defaultdict
+from typing import Dict, List
+
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from config.database import Database, DatabaseConfig
+from .write_behind import WriteBehindBuffer
+
+
+class ProjectCounters(WriteBehindBuffer):
+    """Buffer de incrementos de metadata.view_count y metadata.download_count"""
+
+    FIELDS = ("view_count", "download_count")
+
+    def __init__(self):
+        super().__init__("contadores de proyectos")
+        # project_id -> {campo: incremento pendiente}
+        self._pending: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    def increment(self, project_id: str, field: str, amount: int = 1):
+        """Registrar un incremento (no escribe en la base de datos)"""
+        if field not in self.FIELDS:
+            raise ValueError(f"Contador desconocido: {field}")
+        self._pending[str(project_id)][field] += amount
+
+    def pending(self, project_id: str) -> Dict[str, int]:
+        """Incrementos aún no volcados de un proyecto"""
+        return dict(self._pending.get(str(project_id), {}))
+
+    async def flush(self):
+        """Volcar todos los incrementos como operaciones $inc en un solo bulk_write"""
+        if not self._pending:
+            return
+
+        pending, self._pending = self._pending, defaultdict(lambda: defaultdict(int))
+
+        project_ids = [project_id for project_id in pending if ObjectId.is_valid(project_id)]
+        operations = [
+            UpdateOne(
+                {"_id": ObjectId(project_id)},
+                {"$inc": {f"metadata.{field}": amount for field, amount in pending[project_id].items()}}
+            )
+            for project_id in project_ids
+        ]
+        if not operations:
+            return
+
+        try:
+            projects_collection = Database.get_collection(DatabaseConfig.PROJECTS_COLLECTION)
+            await projects_collection.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            # Sin orden, el resto de operaciones ya se aplicó: devolver al
+            # buffer solo las que fallaron para no contarlas dos veces
+            self._restore(pending, [project_ids[error["index"]] for error in e.details.get("writeErrors", [])])
+            raise
+        except Exception:
+            # Devolver los incrementos al buffer para el siguiente intento
+            self._restore(pending, project_ids)
+            raise
+
+    def _restore(self, pending: Dict[str, Dict[str, int]], project_ids: List[str]):
+        for project_id in project_ids:
+            for field, amount in pending[project_id].items():
+                self._pending[project_id][field] += amount
+
+
+# Instancia global del buffer de contadores
+project_counters = ProjectCounters()
@@ -0,0 +1,150 @@
+"""
+Lectores únicos por proyecto
+Un sketch HyperLogLog por proyecto y mes, fusionable por carrera y periodo
+"""
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from bson import Binary, ObjectId
+from pymongo import UpdateOne
+
+from config.database import Database, DatabaseConfig
+from .hyperloglog import HyperLogLog
+from .write_behind import WriteBehindBuffer
+
+
+def current_period() -> str:
+    """Periodo mensual de los sketches (YYYY-MM)"""
+    return datetime.utcnow().strftime("%Y-%m")
+
+
+class ReaderSketches(WriteBehindBuffer):
+    """
+    Buffer de lectores únicos
+
+    Las lecturas se registran en sketches en memoria y se fusionan con los
+    guardados en MongoDB en cada volcado. Fusionar un sketch dos veces no
+    altera el resultado, por lo que reintentar un volcado es seguro.
+    """
+
+    def __init__(self):
+        super().__init__("lectores únicos")
+        # (project_id, periodo) -> (career_code, sketch pendiente)
+        self._pending: Dict[Tuple[str, str], Tuple[str, HyperLogLog]] = {}
+
+    def record(self, project_id: str, reader_id: str, career_code: str = ""):
+        """Registrar que un usuario leyó un proyecto (no escribe en la base de datos)"""
+        key = (str(project_id), current_period())
+        if key not in self._pending:
+            self._pending[key] = (career_code or "", HyperLogLog())
+        self._pending[key][1].add(str(reader_id))
+
+    async def flush(self):
+        """Fusionar los sketches pendientes con los guardados y escribirlos en un bulk_write"""
+        if not self._pending:
+            return
+
+        pending, self._pending = self._pending, {}
+        pending = {key: value for key, value in pending.items() if ObjectId.is_valid(key[0])}
+        if not pending:
+            return
+
+        collection = Database.get_collection(DatabaseConfig.READER_SKETCHES_COLLECTION)
+        try:
+            stored = await collection.find(
+                {"$or": [
+                    {"project_id": ObjectId(project_id), "period": period}
+                    for project_id, period in pending
+                ]},
+                {"project_id": 1, "period": 1, "registers": 1}
+            ).to_list(length=None)
+
+            for document in stored:
+                key = (str(document["project_id"]), document["period"])
+                pending[key][1].merge(HyperLogLog.from_bytes(document["registers"]))
+
+            now = datetime.utcnow()
+            operations = [
+                UpdateOne(
+                    {"project_id": ObjectId(project_id), "period": period},
+                    {
+                        "$set": {
+                            "career_code": career_code,
+                            "registers": Binary(sketch.to_bytes()),
+                            "updated_at": now
+                        },
+                        "$setOnInsert": {"created_at": now}
+                    },
+                    upsert=True
+                )
+                for (project_id, period), (career_code, sketch) in pending.items()
+            ]
+            await collection.bulk_write(operations, ordered=False)
+        except Exception:
+            # Devolver los sketches al buffer para el siguiente intento
+            for key, (career_code, sketch) in pending.items():
+                if key in self._pending:
+                    self._pending[key][1].merge(sketch)
+                else:
+                    self._pending[key] = (career_code, sketch)
+            raise
+
+    async def estimate(
+        self,
+        project_id: Optional[str] = None,
+        career_code: Optional[str] = None,
+        periods: Optional[List[str]] = None
+    ) -> dict:
+        """
+        Estimar lectores únicos fusionando los sketches que cumplan el filtro
+
+        Args:
+            project_id: Limitar a un proyecto
+            career_code: Limitar a los proyectos de una carrera
+            periods: Limitar a ciertos meses (YYYY-MM)
+        """
+        filter_query = {}
+        if project_id:
+            filter_query["project_id"] = ObjectId(project_id)
+        if career_code:
+            filter_query["career_code"] = career_code
+        if periods:
+            filter_query["period"] = {"$in": periods}
+
+        collection = Database.get_collection(DatabaseConfig.READER_SKETCHES_COLLECTION)
+        stored = await collection.find(
+            filter_query,
+            {"project_id": 1, "period": 1, "career_code": 1, "registers": 1}
+        ).to_list(length=None)
+
+        sketches = [
+            (str(document["project_id"]), document["period"], document.get("career_code", ""),
+             HyperLogLog.from_bytes(document["registers"]))
+            for document in stored
+        ]
+        # Incluir lo que aún no se ha volcado
+        sketches.extend(
+            (pending_project, period, pending_career, sketch)
+            for (pending_project, period), (pending_career, sketch) in self._pending.items()
+        )
+
+        total = HyperLogLog()
+        by_period: Dict[str, HyperLogLog] = {}
+        for sketch_project, period, sketch_career, sketch in sketches:
+            if project_id and sketch_project != str(project_id):
+                continue
+            if career_code and sketch_career != career_code:
+                continue
+            if periods and period not in periods:
+                continue
+            total.merge(sketch)
+            by_period.setdefault(period, HyperLogLog()).merge(sketch)
+
+        return {
+            "unique_readers": total.count(),
+            "by_period": {period: sketch.count() for period, sketch in sorted(by_period.items())}
+        }
+
+
+# Instancia global del buffer de lectores únicos
+reader_sketches = ReaderSketches()
@@ -0,0 +1,59 @@
+"""
+Ejecución única por clave
+Cuando varias peticiones necesitan a la vez el mismo resultado costoso
+(parsear un DOCX, renderizar una página...), solo la primera lo calcula y
+las demás esperan ese mismo resultado
+"""
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Cálculos en curso por clave
+
+    El futuro compartido siempre se resuelve, también si la petición que
+    calcula se cancela (cliente desconectado): en ese caso se cancela y las
+    que esperaban lo intentan de nuevo, una de ellas como nueva líder, en
+    lugar de quedarse esperando para siempre.
+    """
+
+    def __init__(self):
+        self._pending: Dict[Hashable, asyncio.Future] = {}
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._pending
+
+    async def run(self, key: Hashable, compute: Callable[[], Awaitable[T]]) -> T:
+        """Resultado de compute() para key, calculado una sola vez a la vez"""
+        while True:
+            pending = self._pending.get(key)
+            if pending is None:
+                break
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    # Se canceló esta petición, no la que calculaba
+                    raise
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            result = await compute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Evitar el aviso "exception was never retrieved" si nadie más esperaba
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._pending[key]
@@ -0,0 +1,276 @@
+"""
+Comparación del texto de dos versiones de un proyecto
+Alinea las líneas que no cambiaron con anclas únicas (estilo patience
+diff) y solo compara palabra a palabra los tramos modificados. El
+resultado se guarda por par de textos para no volver a calcularlo
+"""
+import difflib
+from bisect import bisect_left
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from pymongo.errors import DuplicateKeyError
+
+from config.database import Database, DatabaseConfig
+from .workers import WorkerPool
+
+
+# Cambiar al modificar el algoritmo o el formato para no servir comparaciones guardadas
+DIFF_VERSION = 1
+
+# Tramos modificados más largos se devuelven como bloque, sin detalle por palabra
+MAX_WORD_DIFF_WORDS = 3000
+
+
+def split_units(text: str) -> Tuple[List[str], List[int]]:
+    """
+    Texto plano de utils.pdf_metadata (páginas separadas por \\f, líneas por \\n)
+    -> líneas con los espacios normalizados y la página de cada una
+    """
+    lines = []
+    pages = []
+    for number, page_text in enumerate(text.split("\f"), start=1):
+        for line in page_text.split("\n"):
+            line = " ".join(line.split())
+            if line:
+                lines.append(line)
+                pages.append(number)
+    return lines, pages
+
+
+def _unique_anchors(a: List[str], b: List[str], a_lo: int, a_hi: int, b_lo: int, b_hi: int) -> List[Tuple[int, int]]:
+    """
+    Líneas que aparecen una sola vez en cada lado del tramo, en el orden más
+    largo en que coinciden en ambos (subsecuencia creciente más larga)
+    """
+    # línea -> [apariciones en a, posición en a, apariciones en b, posición en b]
+    seen: Dict[str, list] = {}
+    for i in range(a_lo, a_hi):
+        entry = seen.get(a[i])
+        if entry is None:
+            seen[a[i]] = [1, i, 0, -1]
+        else:
+            entry[0] += 1
+    for j in range(b_lo, b_hi):
+        entry = seen.get(b[j])
+        if entry is not None:
+            entry[2] += 1
+            entry[3] = j
+
+    pairs = sorted((i, j) for count_a, i, count_b, j in seen.values() if count_a == 1 and count_b == 1)
+    if not pairs:
+        return []
+
+    # Patience sorting sobre la posición en b: O(n log n)
+    tails: List[int] = []
+    tail_index: List[int] = []
+    previous = [-1] * len(pairs)
+    for index, (_, j) in enumerate(pairs):
+        position = bisect_left(tails, j)
+        if position > 0:
+            previous[index] = tail_index[position - 1]
+        if position == len(tails):
+            tails.append(j)
+            tail_index.append(index)
+        else:
+            tails[position] = j
+            tail_index[position] = index
+
+    anchors = []
+    index = tail_index[-1]
+    while index != -1:
+        anchors.append(pairs[index])
+        index = previous[index]
+    anchors.reverse()
+    return anchors
+
+
+def match_lines(a: List[str], b: List[str]) -> List[Tuple[int, int]]:
+    """
+    Pares (i, j) de líneas iguales que se conservan de a en b, en orden
+
+    Se recortan el inicio y el final comunes, se anclan las líneas únicas y
+    se repite en cada hueco entre anclas. Los huecos sin líneas únicas
+    quedan como tramos modificados.
+    """
+    matches = []
+    pending = [(0, len(a), 0, len(b))]
+    while pending:
+        a_lo, a_hi, b_lo, b_hi = pending.pop()
+
+        while a_lo < a_hi and b_lo < b_hi and a[a_lo] == b[b_lo]:
+            matches.append((a_lo, b_lo))
+            a_lo += 1
+            b_lo += 1
+        while a_lo < a_hi and b_lo < b_hi and a[a_hi - 1] == b[b_hi - 1]:
+            a_hi -= 1
+            b_hi -= 1
+            matches.append((a_hi, b_hi))
+        if a_lo == a_hi or b_lo == b_hi:
+            continue
+
+        start_a, start_b = a_lo, b_lo
+        for i, j in _unique_anchors(a, b, a_lo, a_hi, b_lo, b_hi):
+            matches.append((i, j))
+            pending.append((start_a, i, start_b, j))
+            start_a, start_b = i + 1, j + 1
+        if (start_a, start_b) != (a_lo, b_lo):
+            pending.append((start_a, a_hi, start_b, b_hi))
+
+    matches.sort()
+    return matches
+
+
+def diff_words(old_text: str, new_text: str) -> Optional[List[dict]]:
+    """
+    Diferencias palabra a palabra de un tramo modificado
+
+    Returns:
+        Segmentos {"op": "equal" | "delete" | "insert", "text"} o None si el
+        tramo supera MAX_WORD_DIFF_WORDS
+    """
+    old_words = old_text.split()
+    new_words = new_text.split()
+    if len(old_words) + len(new_words) > MAX_WORD_DIFF_WORDS:
+        return None
+
+    segments = []
+    matcher = difflib.SequenceMatcher(None, old_words, new_words, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            segments.append({"op": "equal", "text": " ".join(old_words[i1:i2])})
+            continue
+        if i2 > i1:
+            segments.append({"op": "delete", "text": " ".join(old_words[i1:i2])})
+        if j2 > j1:
+            segments.append({"op": "insert", "text": " ".join(new_words[j1:j2])})
+    return segments
+
+
+def _span(start: int, end: int, pages: List[int]) -> dict:
+    """Tramo de líneas [start, end) con la primera y la última página que toca"""
+    if start < end:
+        return {"start": start, "end": end, "pages": [pages[start], pages[end - 1]]}
+    # Tramo vacío: página de la línea siguiente (o de la última)
+    page = pages[start] if start < len(pages) else (pages[-1] if pages else 1)
+    return {"start": start, "end": end, "pages": [page, page]}
+
+
+def diff_texts(old_text: str, new_text: str) -> dict:
+    """
+    Comparar el texto de dos versiones (se ejecuta en el pool de procesos)
+
+    Returns:
+        dict con hunks (tramos equal, insert, delete o replace; los equal
+        sin texto) y summary (líneas iguales, añadidas, eliminadas,
+        similitud y páginas de la versión nueva con cambios)
+    """
+    a, a_pages = split_units(old_text)
+    b, b_pages = split_units(new_text)
+
+    hunks = []
+    equal_lines = inserted_lines = deleted_lines = 0
+    changed_pages = set()
+    i = j = 0
+    for match_i, match_j in match_lines(a, b) + [(len(a), len(b))]:
+        if match_i > i or match_j > j:
+            kind = "replace" if match_i > i and match_j > j else ("delete" if match_i > i else "insert")
+            hunk = {
+                "type": kind,
+                "old": _span(i, match_i, a_pages),
+                "new": _span(j, match_j, b_pages),
+                "old_text": "\n".join(a[i:match_i]),
+                "new_text": "\n".join(b[j:match_j])
+            }
+            if kind == "replace":
+                hunk["words"] = diff_words(hunk["old_text"], hunk["new_text"])
+            hunks.append(hunk)
+
+            deleted_lines += match_i - i
+            inserted_lines += match_j - j
+            first_page, last_page = hunk["new"]["pages"]
+            changed_pages.update(range(first_page, last_page + 1))
+
+        if match_i < len(a):
+            if hunks and hunks[-1]["type"] == "equal":
+                hunks[-1]["old"] = _span(hunks[-1]["old"]["start"], match_i + 1, a_pages)
+                hunks[-1]["new"] = _span(hunks[-1]["new"]["start"], match_j + 1, b_pages)
+            else:
+                hunks.append({
+                    "type": "equal",
+                    "old": _span(match_i, match_i + 1, a_pages),
+                    "new": _span(match_j, match_j + 1, b_pages)
+                })
+            equal_lines += 1
+        i, j = match_i + 1, match_j + 1
+
+    total = len(a) + len(b)
+    return {
+        "hunks": hunks,
+        "summary": {
+            "old_lines": len(a),
+            "new_lines": len(b),
+            "equal_lines": equal_lines,
+            "inserted_lines": inserted_lines,
+            "deleted_lines": deleted_lines,
+            "changed_hunks": sum(1 for hunk in hunks if hunk["type"] != "equal"),
+            "similarity": round(2 * equal_lines / total, 4) if total else 1.0,
+            "changed_pages": sorted(changed_pages)
+        }
+    }
+
+
+class VersionDiffs:
+    """
+    Comparaciones guardadas por par de textos
+
+    Los textos de document_texts se identifican por su SHA-256, así que la
+    comparación de dos versiones no cambia mientras no cambien sus archivos;
+    se calcula una vez en el pool de procesos y se guarda en version_diffs.
+    """
+
+    @staticmethod
+    def _cache_id(old_text_id: str, new_text_id: str) -> str:
+        return f"{DIFF_VERSION}:{old_text_id}:{new_text_id}"
+
+    async def compare(self, old_text_id: str, new_text_id: str) -> Optional[dict]:
+        """
+        Comparación entre dos textos de document_texts
+
+        Returns:
+            dict con hunks, summary y cached, o None si falta alguno de los textos
+        """
+        diffs_collection = Database.get_collection(DatabaseConfig.VERSION_DIFFS_COLLECTION)
+        cache_id = self._cache_id(old_text_id, new_text_id)
+
+        cached = await diffs_collection.find_one({"_id": cache_id}, {"hunks": 1, "summary": 1})
+        if cached is not None:
+            return {"hunks": cached["hunks"], "summary": cached["summary"], "cached": True}
+
+        texts_collection = Database.get_collection(DatabaseConfig.DOCUMENT_TEXTS_COLLECTION)
+        texts = {
+            document["_id"]: document["text"]
+            async for document in texts_collection.find({"_id": {"$in": [old_text_id, new_text_id]}})
+        }
+        if old_text_id not in texts or new_text_id not in texts:
+            return None
+
+        result = await WorkerPool.run(diff_texts, texts[old_text_id], texts[new_text_id])
+        try:
+            await diffs_collection.update_one(
+                {"_id": cache_id},
+                {"$setOnInsert": {**result, "created_at": datetime.utcnow()}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            # Otra petición guardó la misma comparación a la vez
+            pass
+
+        summary = result["summary"]
+        print(f"🔀 Comparación calculada: {summary['changed_hunks']} tramos con cambios "
+              f"({summary['old_lines']} -> {summary['new_lines']} líneas)")
+        return {**result, "cached": False}
+
+
+# Instancia global de las comparaciones entre versiones
+version_diffs = VersionDiffs()
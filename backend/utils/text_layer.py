@@ -0,0 +1,275 @@
+"""
+Capa de texto de los PDF: cajas de cada palabra por página
+Se extrae una vez con PyMuPDF y se guarda compacta en MongoDB; permite
+ajustar las selecciones y resaltados del visor a palabras completas
+"""
+import asyncio
+import sys
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from bson import Binary
+from pymongo import UpdateOne
+
+from config.database import Database, DatabaseConfig
+from .content_hash import file_sha256
+from .single_flight import SingleFlight
+from .workers import WorkerPool
+
+
+# Cambiar al modificar la extracción para volver a calcular las capas guardadas
+TEXT_LAYER_VERSION = 1
+
+
+def _pack(values: array) -> bytes:
+    """Serializar un array en little-endian"""
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _unpack(typecode: str, data: bytes) -> array:
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def extract_word_boxes(pdf_path: str) -> List[dict]:
+    """
+    Extraer las palabras de cada página (se ejecuta en el pool de procesos)
+
+    Las coordenadas se normalizan a [0, 1] respecto al tamaño de la página,
+    con origen arriba a la izquierda (las mismas que usa el visor en
+    Annotation.rect).
+
+    Returns:
+        Una entrada por página con:
+        - boxes: float32 x0, y0, x1, y1 por palabra
+        - lines: uint32 (bloque << 16 | línea) por palabra
+        - words: texto de cada palabra, en orden de lectura
+    """
+    import fitz  # PyMuPDF
+
+    pages = []
+    with fitz.open(pdf_path) as doc:
+        for number, page in enumerate(doc, start=1):
+            rect = page.rect
+            width, height = rect.width or 1, rect.height or 1
+            boxes = array("f")
+            lines = array("I")
+            words = []
+            for x0, y0, x1, y1, word, block, line, _ in page.get_text("words", sort=True):
+                boxes.extend((
+                    (x0 - rect.x0) / width,
+                    (y0 - rect.y0) / height,
+                    (x1 - rect.x0) / width,
+                    (y1 - rect.y0) / height
+                ))
+                lines.append((block << 16) | line)
+                words.append(word)
+
+            pages.append({
+                "page": number,
+                "width": round(rect.width, 2),
+                "height": round(rect.height, 2),
+                "boxes": _pack(boxes),
+                "lines": _pack(lines),
+                "words": words
+            })
+
+    return pages
+
+
+class PageWordIndex:
+    """
+    Índice espacial de las palabras de una página
+
+    Rejilla uniforme de GRID_SIZE x GRID_SIZE celdas sobre la página
+    normalizada; cada celda guarda las palabras que la tocan. Una consulta
+    solo revisa las palabras de las celdas que cubre el rectángulo.
+    """
+
+    GRID_SIZE = 32
+
+    def __init__(self, boxes: bytes, lines: bytes, words: List[str]):
+        self.boxes = _unpack("f", boxes)
+        self.lines = _unpack("I", lines)
+        self.words = words
+        self.grid: Dict[int, List[int]] = {}
+
+        for index in range(len(words)):
+            x0, y0, x1, y1 = self.box(index)
+            for cell_y in range(self._cell(y0), self._cell(y1) + 1):
+                for cell_x in range(self._cell(x0), self._cell(x1) + 1):
+                    self.grid.setdefault(cell_y * self.GRID_SIZE + cell_x, []).append(index)
+
+    def _cell(self, value: float) -> int:
+        return min(max(int(value * self.GRID_SIZE), 0), self.GRID_SIZE - 1)
+
+    def box(self, index: int) -> Tuple[float, float, float, float]:
+        offset = index * 4
+        return tuple(self.boxes[offset:offset + 4])
+
+    def query(self, rect: List[float], min_overlap: float = 0.5) -> List[int]:
+        """
+        Palabras cubiertas por un rectángulo, en orden de lectura
+
+        Una palabra cuenta si el rectángulo cubre al menos min_overlap de su
+        área.
+        """
+        rx0, ry0, rx1, ry1 = min(rect[0], rect[2]), min(rect[1], rect[3]), max(rect[0], rect[2]), max(rect[1], rect[3])
+
+        candidates = set()
+        for cell_y in range(self._cell(ry0), self._cell(ry1) + 1):
+            for cell_x in range(self._cell(rx0), self._cell(rx1) + 1):
+                candidates.update(self.grid.get(cell_y * self.GRID_SIZE + cell_x, ()))
+
+        covered = []
+        for index in sorted(candidates):
+            x0, y0, x1, y1 = self.box(index)
+            area = (x1 - x0) * (y1 - y0)
+            overlap_width = min(x1, rx1) - max(x0, rx0)
+            overlap_height = min(y1, ry1) - max(y0, ry0)
+            if area <= 0:
+                # Caja degenerada: basta con que su centro quede dentro
+                cx, cy = (x0 + x1) / 2, (y0 + y1) / 2
+                if rx0 <= cx <= rx1 and ry0 <= cy <= ry1:
+                    covered.append(index)
+            elif overlap_width > 0 and overlap_height > 0 and \
+                    overlap_width * overlap_height >= min_overlap * area:
+                covered.append(index)
+
+        return covered
+
+    def snap(self, rect: List[float], min_overlap: float = 0.5) -> dict:
+        """
+        Ajustar un rectángulo a las palabras que cubre
+
+        Returns:
+            dict con las palabras, un rectángulo por línea, el rectángulo
+            total y el texto seleccionado (líneas separadas por saltos de línea)
+        """
+        indices = self.query(rect, min_overlap)
+
+        words = []
+        line_rects = []
+        line_texts = []
+        current_line = None
+        for index in indices:
+            box = [round(value, 5) for value in self.box(index)]
+            words.append({"index": index, "text": self.words[index], "rect": box})
+
+            if self.lines[index] != current_line:
+                current_line = self.lines[index]
+                line_rects.append(list(box))
+                line_texts.append([self.words[index]])
+            else:
+                line_rect = line_rects[-1]
+                line_rect[0] = min(line_rect[0], box[0])
+                line_rect[1] = min(line_rect[1], box[1])
+                line_rect[2] = max(line_rect[2], box[2])
+                line_rect[3] = max(line_rect[3], box[3])
+                line_texts[-1].append(self.words[index])
+
+        bounding_rect = None
+        if line_rects:
+            bounding_rect = [
+                min(r[0] for r in line_rects),
+                min(r[1] for r in line_rects),
+                max(r[2] for r in line_rects),
+                max(r[3] for r in line_rects)
+            ]
+
+        return {
+            "words": words,
+            "rects": line_rects,
+            "rect": bounding_rect,
+            "selected_text": "\n".join(" ".join(line) for line in line_texts)
+        }
+
+
+class TextLayers:
+    """
+    Capas de texto por SHA-256 del PDF
+
+    MongoDB (pdf_text_layers) guarda un documento por página; las páginas
+    usadas recientemente se mantienen indexadas en memoria. La primera
+    consulta de un PDF extrae todas sus páginas en el pool de procesos.
+    """
+
+    MEMORY_PAGES = 128
+
+    def __init__(self):
+        self._pages: "OrderedDict[Tuple[str, int], PageWordIndex]" = OrderedDict()
+        self._pending = SingleFlight()
+
+    async def get_page(self, pdf_path: Path, page: int) -> Optional[PageWordIndex]:
+        """
+        Índice de palabras de una página
+
+        Returns:
+            None si la página no existe
+        """
+        digest = await asyncio.to_thread(file_sha256, pdf_path)
+        key = (digest, page)
+
+        index = self._pages.get(key)
+        if index is not None:
+            self._pages.move_to_end(key)
+            return index
+
+        collection = Database.get_collection(DatabaseConfig.TEXT_LAYERS_COLLECTION)
+        query = {"pdf_sha256": digest, "layer_version": TEXT_LAYER_VERSION}
+        document = await collection.find_one({**query, "page": page})
+
+        if document is None:
+            if await collection.find_one(query, {"_id": 1}):
+                # Capa ya extraída: la página no existe
+                return None
+            pages = await self._extract(digest, pdf_path)
+            document = next((entry for entry in pages if entry["page"] == page), None)
+            if document is None:
+                return None
+
+        index = PageWordIndex(document["boxes"], document["lines"], document["words"])
+        self._pages[key] = index
+        while len(self._pages) > self.MEMORY_PAGES:
+            self._pages.popitem(last=False)
+        return index
+
+    async def _extract(self, digest: str, pdf_path: Path) -> List[dict]:
+        """Extraer y guardar todas las páginas (una sola vez por PDF a la vez)"""
+        return await self._pending.run(digest, lambda: self._extract_and_store(digest, pdf_path))
+
+    async def _extract_and_store(self, digest: str, pdf_path: Path) -> List[dict]:
+        pages = await WorkerPool.run(extract_word_boxes, str(pdf_path))
+
+        collection = Database.get_collection(DatabaseConfig.TEXT_LAYERS_COLLECTION)
+        operations = [
+            UpdateOne(
+                {"pdf_sha256": digest, "layer_version": TEXT_LAYER_VERSION, "page": entry["page"]},
+                {"$set": {
+                    "width": entry["width"],
+                    "height": entry["height"],
+                    "boxes": Binary(entry["boxes"]),
+                    "lines": Binary(entry["lines"]),
+                    "words": entry["words"]
+                }},
+                upsert=True
+            )
+            for entry in pages
+        ]
+        if operations:
+            await collection.bulk_write(operations, ordered=False)
+        print(f"🔤 Capa de texto extraída: {len(pages)} páginas ({digest[:12]})")
+
+        return pages
+
+
+# Instancia global de las capas de texto
+text_layers = TextLayers()
@@ -0,0 +1,72 @@
+"""
+Miniaturas de portada de los proyectos
+Renderiza la primera página del PDF al guardarlo
+"""
+import asyncio
+import hashlib
+import io
+from pathlib import Path
+from typing import Optional, Tuple
+
+from .file_storage import FileStorage
+
+
+THUMBNAIL_WIDTH = 320
+THUMBNAILS_URL = "/api/v1/projects/thumbnails"
+
+
+def render_thumbnail(page, width: int = THUMBNAIL_WIDTH) -> Tuple[bytes, str]:
+    """
+    Renderizar una página de un documento PyMuPDF ya abierto
+
+    Returns:
+        (bytes de la imagen, extensión). WebP si Pillow está disponible, si no PNG.
+    """
+    import fitz  # PyMuPDF
+
+    zoom = width / page.rect.width
+    pixmap = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+
+    try:
+        from PIL import Image
+    except ImportError:
+        return pixmap.tobytes("png"), "png"
+
+    image = Image.frombytes("RGB", (pixmap.width, pixmap.height), pixmap.samples)
+    buffer = io.BytesIO()
+    image.save(buffer, format="WEBP", quality=80, method=4)
+    return buffer.getvalue(), "webp"
+
+
+class Thumbnails:
+    """Miniaturas direccionadas por contenido junto a los archivos del estudiante"""
+
+    @classmethod
+    def get_directory(cls, student_id: str) -> Path:
+        """Directorio de miniaturas de un estudiante"""
+        return FileStorage.PROJECTS_DIR / student_id / "thumbnails"
+
+    @classmethod
+    async def store(cls, pdf_content: bytes, image: bytes, extension: str, student_id: str) -> Optional[str]:
+        """
+        Guardar una miniatura ya renderizada (p. ej. durante el análisis al subir)
+
+        Returns:
+            URL de la miniatura o None si no se pudo guardar
+        """
+        try:
+            digest = await asyncio.to_thread(lambda: hashlib.sha256(pdf_content).hexdigest())
+            return await asyncio.to_thread(cls._write, digest, image, extension, student_id)
+        except Exception as e:
+            print(f"⚠️ No se pudo guardar la miniatura: {e}")
+            return None
+
+    @classmethod
+    def _write(cls, digest: str, image: bytes, extension: str, student_id: str) -> str:
+        thumbnails_dir = cls.get_directory(student_id)
+        thumbnails_dir.mkdir(parents=True, exist_ok=True)
+        thumbnail_path = thumbnails_dir / f"{digest}.{extension}"
+        temp_path = thumbnail_path.with_suffix(".tmp")
+        temp_path.write_bytes(image)
+        temp_path.replace(thumbnail_path)
+        return f"{THUMBNAILS_URL}/{student_id}/{thumbnail_path.name}"
@@ -0,0 +1,208 @@
+"""
+Ranking de proyectos en tendencia
+Puntaje con decaimiento exponencial, actualizado en O(1) por lectura
+"""
+import math
+import time
+from bisect import bisect_left, insort
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Set, Tuple
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from config.database import Database, DatabaseConfig
+from .write_behind import WriteBehindBuffer
+
+
+class TrendingProjects(WriteBehindBuffer):
+    """
+    Puntaje de tendencia de los proyectos publicados
+
+    Cada lectura suma exp(λ·(t - t0)) en lugar de restar puntaje a todos los
+    proyectos con el paso del tiempo: el orden es el mismo que el de la suma
+    con decaimiento exponencial, pero los puntajes guardados nunca bajan y
+    basta con tocar el proyecto leído. El puntaje real en el instante t es
+    puntaje_guardado · exp(-λ·(t - t0)).
+
+    Los TOP_K mejores se mantienen en una lista ordenada; el ranking se sirve
+    desde memoria y se guarda en MongoDB en cada volcado (checkpoint).
+    """
+
+    HALF_LIFE_DAYS = 7
+    TOP_K = 50
+    FLUSH_INTERVAL_SECONDS = 300
+    # Reescalar antes de que exp() se acerque al límite de los float
+    MAX_EXPONENT = 300
+    # Puntajes reales por debajo de este valor se olvidan en el checkpoint
+    MIN_SCORE = 0.01
+
+    def __init__(self):
+        super().__init__("ranking de tendencias")
+        self.decay_rate = math.log(2) / (self.HALF_LIFE_DAYS * 24 * 3600)
+        self.reference_time = time.time()
+        self.scores: Dict[str, float] = {}
+        self.summaries: Dict[str, dict] = {}
+        self._top: List[Tuple[float, str]] = []  # ascendente
+        self._top_members: Set[str] = set()
+        self._dirty: Set[str] = set()
+
+    def record(self, project_id: str, summary: Optional[dict] = None, weight: float = 1.0,
+               timestamp: Optional[float] = None):
+        """
+        Registrar una lectura de un proyecto publicado
+
+        Args:
+            project_id: ID del proyecto
+            summary: Datos para mostrar en el ranking (título, carrera...)
+            weight: Peso de la lectura
+            timestamp: Momento de la lectura (por defecto, ahora)
+        """
+        now = timestamp if timestamp is not None else time.time()
+        exponent = self.decay_rate * (now - self.reference_time)
+        if exponent > self.MAX_EXPONENT:
+            self._rescale(now)
+            exponent = 0.0
+
+        project_id = str(project_id)
+        old_score = self.scores.get(project_id, 0.0)
+        new_score = old_score + weight * math.exp(exponent)
+        self.scores[project_id] = new_score
+        if summary:
+            self.summaries[project_id] = summary
+        self._dirty.add(project_id)
+        self._update_top(project_id, old_score, new_score)
+
+    def discard(self, project_id: str):
+        """Quitar un proyecto del ranking (p. ej. al despublicarlo)"""
+        project_id = str(project_id)
+        score = self.scores.pop(project_id, None)
+        self.summaries.pop(project_id, None)
+        if project_id in self._top_members:
+            self._top.pop(bisect_left(self._top, (score, project_id)))
+            self._top_members.discard(project_id)
+            # Rellenar el hueco con el mejor de los que quedaron fuera
+            candidates = [
+                (value, pid) for pid, value in self.scores.items() if pid not in self._top_members
+            ]
+            if candidates:
+                best = max(candidates)
+                insort(self._top, best)
+                self._top_members.add(best[1])
+        self._dirty.add(project_id)
+
+    def top(self, limit: int = 10, now: Optional[float] = None) -> List[dict]:
+        """Proyectos con mayor puntaje actual, de mayor a menor"""
+        now = now if now is not None else time.time()
+        factor = math.exp(-self.decay_rate * (now - self.reference_time))
+        return [
+            {
+                "project_id": project_id,
+                "score": round(score * factor, 4),
+                **self.summaries.get(project_id, {})
+            }
+            for score, project_id in reversed(self._top[-limit:])
+        ]
+
+    def _update_top(self, project_id: str, old_score: float, new_score: float):
+        if project_id in self._top_members:
+            self._top.pop(bisect_left(self._top, (old_score, project_id)))
+            insort(self._top, (new_score, project_id))
+        elif len(self._top) < self.TOP_K:
+            insort(self._top, (new_score, project_id))
+            self._top_members.add(project_id)
+        elif (new_score, project_id) > self._top[0]:
+            _, evicted = self._top.pop(0)
+            self._top_members.discard(evicted)
+            insort(self._top, (new_score, project_id))
+            self._top_members.add(project_id)
+
+    def _rescale(self, now: float):
+        """Mover el tiempo de referencia a `now` (no cambia el orden)"""
+        factor = math.exp(-self.decay_rate * (now - self.reference_time))
+        self.scores = {project_id: score * factor for project_id, score in self.scores.items()}
+        self._top = [(score * factor, project_id) for score, project_id in self._top]
+        self.reference_time = now
+
+    async def flush(self):
+        """Checkpoint en MongoDB de los puntajes que cambiaron"""
+        now = time.time()
+        self._rescale(now)
+
+        # Olvidar proyectos cuyo puntaje ya es despreciable
+        for project_id, score in list(self.scores.items()):
+            if score < self.MIN_SCORE and project_id not in self._top_members:
+                del self.scores[project_id]
+                self.summaries.pop(project_id, None)
+                self._dirty.add(project_id)
+
+        if not self._dirty:
+            return
+
+        dirty, self._dirty = self._dirty, set()
+        scored_at = datetime.utcfromtimestamp(now)
+        operations = []
+        for project_id in dirty:
+            if not ObjectId.is_valid(project_id):
+                continue
+            if project_id in self.scores:
+                operations.append(UpdateOne(
+                    {"project_id": ObjectId(project_id)},
+                    {"$set": {
+                        "score": self.scores[project_id],
+                        "scored_at": scored_at,
+                        "summary": self.summaries.get(project_id, {})
+                    }},
+                    upsert=True
+                ))
+            else:
+                operations.append(UpdateOne(
+                    {"project_id": ObjectId(project_id)},
+                    {"$set": {"score": 0.0, "scored_at": scored_at}}
+                ))
+
+        if not operations:
+            return
+
+        try:
+            collection = Database.get_collection(DatabaseConfig.TRENDING_COLLECTION)
+            await collection.bulk_write(operations, ordered=False)
+        except Exception:
+            self._dirty |= dirty
+            raise
+
+    async def load(self):
+        """Cargar el último checkpoint al iniciar la aplicación"""
+        collection = Database.get_collection(DatabaseConfig.TRENDING_COLLECTION)
+        documents = await collection.find({"score": {"$gt": 0}}).to_list(length=None)
+
+        now = time.time()
+        self.reference_time = now
+        self.scores = {}
+        self.summaries = {}
+        for document in documents:
+            elapsed = now - document["scored_at"].replace(tzinfo=timezone.utc).timestamp()
+            score = document["score"] * math.exp(-self.decay_rate * max(elapsed, 0))
+            if score >= self.MIN_SCORE:
+                project_id = str(document["project_id"])
+                self.scores[project_id] = score
+                self.summaries[project_id] = document.get("summary", {})
+
+        ranked = sorted((score, project_id) for project_id, score in self.scores.items())
+        self._top = ranked[-self.TOP_K:]
+        self._top_members = {project_id for _, project_id in self._top}
+        print(f"📈 Ranking de tendencias cargado: {len(self.scores)} proyectos")
+
+
+def trending_summary(project: dict) -> dict:
+    """Datos de un proyecto que se muestran en el ranking"""
+    files = project.get("versions", [{}])[0].get("files", []) if project.get("versions") else []
+    return {
+        "title": project.get("title", "Sin título"),
+        "career_name": project.get("academic_info", {}).get("career_name", ""),
+        "thumbnail_url": files[0].get("thumbnail_url") if files else None
+    }
+
+
+# Instancia global del ranking
+trending_projects = TrendingProjects()
@@ -0,0 +1,102 @@
+"""
+Pool de procesos para el procesamiento pesado de documentos
+Ejecuta PyMuPDF, python-docx y reportlab fuera del event loop
+"""
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import Optional
+
+
+def _preload_libraries():
+    """
+    Inicializador de cada proceso: importar las librerías pesadas una sola vez
+    para que el primer trabajo no pague el tiempo de importación
+    """
+    for module in ("fitz", "docx", "reportlab.platypus", "reportlab.lib.styles"):
+        try:
+            __import__(module)
+        except ImportError:
+            pass
+
+
+def _ping() -> bool:
+    return True
+
+
+class WorkerPool:
+    """
+    Pool compartido de procesos de trabajo
+
+    Si un proceso muere (segfault u OOM con un documento dañado), el pool
+    queda roto y rechaza todo trabajo: run() lo descarta para que el
+    siguiente trabajo cree uno nuevo, y el que falló recibe el error.
+    """
+
+    MAX_WORKERS = int(os.getenv("DOCUMENT_WORKERS", "2"))
+    # Espera máxima por trabajo; el proceso sigue ocupado hasta que termine
+    JOB_TIMEOUT_SECONDS = float(os.getenv("DOCUMENT_JOB_TIMEOUT_SECONDS", "300"))
+
+    _executor: Optional[ProcessPoolExecutor] = None
+
+    @classmethod
+    def get_executor(cls) -> ProcessPoolExecutor:
+        """Obtener el pool, creándolo en el primer uso"""
+        if cls._executor is None:
+            cls._executor = ProcessPoolExecutor(
+                max_workers=cls.MAX_WORKERS,
+                initializer=_preload_libraries
+            )
+            print(f"⚙️ Pool de documentos iniciado con {cls.MAX_WORKERS} procesos")
+        return cls._executor
+
+    @classmethod
+    async def run(cls, func, *args, **kwargs):
+        """
+        Ejecutar una función en un proceso del pool
+
+        La función y sus argumentos deben poder serializarse con pickle
+        (funciones definidas a nivel de módulo).
+
+        Raises:
+            asyncio.TimeoutError: si tarda más de JOB_TIMEOUT_SECONDS
+            BrokenProcessPool: si el proceso murió durante el trabajo
+        """
+        loop = asyncio.get_running_loop()
+        executor = cls.get_executor()
+        try:
+            return await asyncio.wait_for(
+                loop.run_in_executor(executor, partial(func, *args, **kwargs)),
+                cls.JOB_TIMEOUT_SECONDS
+            )
+        except BrokenProcessPool:
+            # Solo el primero de los trabajos afectados reemplaza el pool
+            if cls._executor is executor:
+                cls._executor = None
+                executor.shutdown(wait=False, cancel_futures=True)
+                print(f"⚠️ Un proceso de documentos terminó de forma inesperada ({getattr(func, '__name__', func)}); se reinicia el pool")
+            raise
+
+    @classmethod
+    async def warm_up(cls):
+        """
+        Arrancar todos los procesos al iniciar la aplicación
+
+        Se envían tantas tareas como procesos a la vez; como ninguno está libre
+        todavía, el pool crea uno por tarea y cada uno ejecuta el inicializador.
+        """
+        loop = asyncio.get_running_loop()
+        executor = cls.get_executor()
+        await asyncio.gather(*(
+            loop.run_in_executor(executor, _ping) for _ in range(cls.MAX_WORKERS)
+        ))
+
+    @classmethod
+    def shutdown(cls):
+        """Cerrar el pool al apagar la aplicación"""
+        if cls._executor is not None:
+            cls._executor.shutdown(wait=False, cancel_futures=True)
+            cls._executor = None
+            print("⚙️ Pool de documentos cerrado")
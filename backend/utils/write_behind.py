@@ -0,0 +1,57 @@
+"""
+Buffers de escritura diferida (write-behind)
+Acumulan cambios en memoria y los vuelcan a MongoDB en lote cada cierto tiempo
+"""
+import asyncio
+from abc import ABC, abstractmethod
+from typing import Optional
+
+
+class WriteBehindBuffer(ABC):
+    """
+    Base para buffers que se vuelcan periódicamente
+
+    Las subclases implementan flush(). start() lanza la tarea periódica y
+    stop() la detiene haciendo un último volcado, para no perder datos al
+    apagar la aplicación. stop() no cancela la tarea: le avisa y espera a
+    que termine el volcado en curso, que cancelado perdería lo que ya había
+    sacado del buffer.
+    """
+
+    FLUSH_INTERVAL_SECONDS = 10
+
+    def __init__(self, name: str):
+        self.name = name
+        self._task: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+
+    def start(self):
+        """Iniciar el volcado periódico"""
+        if self._task is None:
+            self._stopping = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Detener el volcado periódico y volcar lo pendiente"""
+        if self._task is not None:
+            self._stopping.set()
+            await self._task
+            self._task = None
+        await self._safe_flush()
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.FLUSH_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                await self._safe_flush()
+
+    async def _safe_flush(self):
+        try:
+            await self.flush()
+        except Exception as e:
+            print(f"❌ Error volcando {self.name}: {e}")
+
+    @abstractmethod
+    async def flush(self):
+        """Volcar los cambios acumulados"""
@@ -37,6 +37,8 @@ export function DocxAnnotationViewer({ projectId, onSave }: DocxAnnotationViewer
   const [scale, setScale] = useState(100);
   
   const contentRef = useRef<HTMLDivElement>(null);
+  // Revisión de los comentarios cargados; el backend rechaza (409) guardar sobre una desactualizada
+  const annotationsRevisionRef = useRef<number | null>(null);
 
   useEffect(() => {
     loadDocument();
@@ -66,7 +68,8 @@ export function DocxAnnotationViewer({ projectId, onSave }: DocxAnnotationViewer
       }
       
       const data = await response.json();
-      setHtmlContent(data.html);
+      // Las imágenes del documento se sirven desde el backend
+      setHtmlContent(data.html.split('src="/api/v1/docx/images/').join(`src="${API_BASE_URL}/api/v1/docx/images/`));
       
       // Cargar comentarios existentes desde la base de datos
       try {
@@ -74,6 +77,7 @@ export function DocxAnnotationViewer({ projectId, onSave }: DocxAnnotationViewer
         if (commentsResponse.ok) {
           const commentsData = await commentsResponse.json();
           console.log('Comentarios cargados desde BD:', commentsData);
+          annotationsRevisionRef.current = commentsData.revision ?? null;
           
           if (commentsData.annotations && commentsData.annotations.length > 0) {
             // Convertir formato de BD a formato del componente
@@ -425,14 +429,23 @@ export function DocxAnnotationViewer({ projectId, onSave }: DocxAnnotationViewer
             anchor_id: c.anchorId || null,
             created_by: 'teacher',
             created_at: c.timestamp
-          }))
+          })),
+          revision: annotationsRevisionRef.current ?? undefined
         })
       });
       
+      if (response.status === 409) {
+        alert('Otra sesión modificó los comentarios. Se recargarán antes de continuar.');
+        loadDocument();
+        return;
+      }
+      
       if (!response.ok) {
         throw new Error('Error eliminando comentario');
       }
       
+      annotationsRevisionRef.current = (await response.json()).revision;
+      
       // Eliminar del estado local
       setComments(comments.filter(c => c.id !== commentId));
       
@@ -487,7 +500,8 @@ export function DocxAnnotationViewer({ projectId, onSave }: DocxAnnotationViewer
           anchor_id: c.anchorId || null,
           created_by: 'teacher',
           created_at: c.timestamp
-        }))
+        })),
+        revision: annotationsRevisionRef.current ?? undefined
       };
       
       console.log('=== ENVIANDO DATOS AL BACKEND ===');
@@ -506,12 +520,19 @@ export function DocxAnnotationViewer({ projectId, onSave }: DocxAnnotationViewer
       
       console.log('Response status:', response.status);
       
+      if (response.status === 409) {
+        alert('Otra sesión modificó los comentarios. Se recargarán; vuelve a aplicar tus cambios.');
+        loadDocument();
+        return;
+      }
+      
       if (!response.ok) {
         const errorData = await response.json();
         console.error('Error del servidor:', errorData);
         throw new Error('Error guardando comentarios');
       }
       
+      annotationsRevisionRef.current = (await response.json()).revision;
       alert('Comentarios guardados exitosamente');
       
       if (onSave) {
@@ -542,7 +563,12 @@ export function DocxAnnotationViewer({ projectId, onSave }: DocxAnnotationViewer
       }
       
       const data = await response.json();
-      alert(data.message);
+      if (format === 'pdf' && data.download_url) {
+        // El PDF con las anotaciones se descarga desde el servidor
+        window.open(`${API_BASE_URL}${data.download_url}`, '_blank');
+      } else {
+        alert(data.message);
+      }
     } catch (error) {
       console.error('Error exportando:', error);
       alert('Error al exportar el documento');
@@ -66,7 +66,8 @@ export function DocxEvaluationViewer({ projectId, onSave }: DocxEvaluationViewer
       }
       
       const data = await response.json();
-      setHtmlContent(data.html);
+      // Las imágenes del documento se sirven desde el backend
+      setHtmlContent(data.html.split('src="/api/v1/docx/images/').join(`src="${API_BASE_URL}/api/v1/docx/images/`));
       
       // Cargar anotaciones existentes
       const annotationsResponse = await fetch(`${API_BASE_URL}/api/v1/docx/annotations/${projectId}`);
@@ -357,7 +358,12 @@ export function DocxEvaluationViewer({ projectId, onSave }: DocxEvaluationViewer
       }
       
       const data = await response.json();
-      alert(data.message);
+      if (format === 'pdf' && data.download_url) {
+        // El PDF con las anotaciones se descarga desde el servidor
+        window.open(`${API_BASE_URL}${data.download_url}`, '_blank');
+      } else {
+        alert(data.message);
+      }
     } catch (error) {
       console.error('Error exportando:', error);
       alert('Error al exportar el documento');
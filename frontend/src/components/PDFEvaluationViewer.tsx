@@ -10,6 +10,7 @@ import { useToast } from './ui/Toast';
 import { Modal } from './ui/Modal';
 import { API_BASE_URL } from '../services/api';
 import { notificationsService } from '../services/notifications';
+import { AnnotationOperation, connectAnnotationChannel } from '../services/annotationChannel';
 // Configurar worker de PDF.js
 // Usar la versión del CDN de unpkg que es más confiable
 pdfjs.GlobalWorkerOptions.workerSrc = `https://unpkg.com/pdfjs-dist@${pdfjs.version}/build/pdf.worker.min.mjs`;
@@ -40,6 +41,28 @@ interface Annotation {
   created_at: string;
 }
 
+// Aplicar las operaciones del canal en tiempo real (solo las del visor PDF
+// sobre la versión cargada)
+const applyAnnotationOperations = (
+  current: Annotation[],
+  operations: AnnotationOperation[],
+  version: number | null
+) => {
+  let next = current;
+  for (const operation of operations) {
+    if (operation.source && operation.source !== 'pdf') continue;
+    if (version !== null && operation.version != null && operation.version !== version) continue;
+    if (operation.op === 'delete') {
+      next = next.filter(a => a.id !== operation.id);
+    } else if (next.some(a => a.id === operation.id)) {
+      next = next.map(a => (a.id === operation.id ? operation.annotation : a));
+    } else {
+      next = [...next, operation.annotation];
+    }
+  }
+  return next;
+};
+
 interface PDFEvaluationViewerProps {
   projectId: string;
   teacherId: string;
@@ -62,6 +85,12 @@ export function PDFEvaluationViewer({
   const [pdfUrl, setPdfUrl] = useState<string>('');
   const [isLoading, setIsLoading] = useState(true);
   const [annotations, setAnnotations] = useState<Annotation[]>([]);
+  // Revisión de las anotaciones cargadas; el backend rechaza (409) guardar sobre una desactualizada
+  const annotationsRevisionRef = useRef<number | null>(null);
+  // Versión del documento cuyas anotaciones se muestran
+  const annotationsVersionRef = useRef<number | null>(null);
+  // Canal WebSocket: cambios de otros evaluadores sin recargar la lista completa
+  const channelRef = useRef<ReturnType<typeof connectAnnotationChannel> | null>(null);
   const [selectedText, setSelectedText] = useState<string>('');
   const [selectionRect, setSelectionRect] = useState<DOMRect | null>(null);
   const [showCommentBox, setShowCommentBox] = useState(false);
@@ -162,6 +191,10 @@ export function PDFEvaluationViewer({
     loadPDF();
     loadAnnotations();
     loadGradeAndStatus();
+    return () => {
+      channelRef.current?.close();
+      channelRef.current = null;
+    };
   }, [projectId]);
 
   useEffect(() => {
@@ -230,6 +263,17 @@ export function PDFEvaluationViewer({
       if (response.ok) {
         const data = await response.json();
         setAnnotations(data.annotations || []);
+        annotationsRevisionRef.current = data.revision ?? null;
+        annotationsVersionRef.current = data.version ?? null;
+
+        channelRef.current?.close();
+        channelRef.current = connectAnnotationChannel(projectId, data.revision ?? 0, {
+          onOperations: (operations, seq) => {
+            annotationsRevisionRef.current = seq;
+            setAnnotations(current => applyAnnotationOperations(current, operations, annotationsVersionRef.current));
+          },
+          onError: (detail) => console.error('Error en el canal de anotaciones:', detail)
+        });
       }
     } catch (error) {
       console.error('Error cargando anotaciones:', error);
@@ -314,6 +358,13 @@ export function PDFEvaluationViewer({
     };
 
     setAnnotations([...annotations, newAnnotation]);
+    channelRef.current?.send([{
+      op: 'add',
+      id: newAnnotation.id,
+      source: 'pdf',
+      version: annotationsVersionRef.current ?? undefined,
+      annotation: newAnnotation
+    }]);
     setCommentText('');
     setShowCommentBox(false);
     setSelectedText('');
@@ -354,6 +405,7 @@ export function PDFEvaluationViewer({
 
   const handleDeleteAnnotation = (id: string) => {
     setAnnotations(annotations.filter(a => a.id !== id));
+    channelRef.current?.send([{ op: 'delete', id, source: 'pdf', version: annotationsVersionRef.current ?? undefined }]);
   };
 
   const handleSaveAllAnnotations = async () => {
@@ -368,15 +420,27 @@ export function PDFEvaluationViewer({
           },
           body: JSON.stringify({
             project_id: projectId,
-            annotations: annotations
+            annotations: annotations,
+            revision: annotationsRevisionRef.current ?? undefined,
+            version: annotationsVersionRef.current ?? undefined
           })
         }
       );
 
+      if (response.status === 409) {
+        showToast('error', 'Otra sesión modificó las anotaciones. Se recargaron; vuelve a aplicar tus cambios.');
+        await loadAnnotations();
+        return;
+      }
+
       if (!response.ok) {
         throw new Error('Error guardando anotaciones');
       }
 
+      const result = await response.json();
+      annotationsRevisionRef.current = result.revision;
+      channelRef.current?.setSeq(result.revision);
+
       showToast('success', 'Anotaciones guardadas exitosamente');
       
       if (onSave) {
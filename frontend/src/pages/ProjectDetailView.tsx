@@ -75,7 +75,9 @@ export function ProjectDetailView({ projectId, onBack }: ProjectDetailViewProps)
 
     try {
       console.log('Cargando proyecto:', projectId);
-      const data = await projectsAPI.getById(projectId);
+      // Identificar al lector para el conteo de lectores únicos
+      const viewer = JSON.parse(localStorage.getItem('user') || '{}');
+      const data = await projectsAPI.getById(projectId, viewer._id);
       clearTimeout(timeout);
       setProject(data);
       
@@ -76,7 +76,7 @@ export function PublicLibrary({
               methodology: project.methodology || 'No especificada',
               abstract: project.description || 'Sin descripción disponible',
               methods: [], // Este dato podría venir del backend
-              thumbnail: '/src/config/logoUnexca.jpg',
+              thumbnail: project.thumbnail_url ? `${API_BASE_URL}${project.thumbnail_url}` : '/src/config/logoUnexca.jpg',
               file_id: project.file_id
             };
           });
@@ -104,7 +104,10 @@ export function PublicLibrary({
     }
 
     try {
-      const response = await fetch(`${API_BASE_URL}/api/v1/projects/download/${file_id}`);
+      // Identificar al lector para el conteo de lectores únicos
+      const viewer = JSON.parse(localStorage.getItem('user') || '{}');
+      const viewerQuery = viewer._id ? `?viewer_id=${viewer._id}` : '';
+      const response = await fetch(`${API_BASE_URL}/api/v1/projects/download/${file_id}${viewerQuery}`);
       
       if (!response.ok) {
         throw new Error('Error al descargar el archivo');
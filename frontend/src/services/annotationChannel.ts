@@ -0,0 +1,97 @@
+import { API_BASE_URL } from './api';
+
+/**
+ * Canal en tiempo real de anotaciones de un proyecto
+ * (WebSocket /api/v1/annotations/ws/{projectId})
+ *
+ * Cada cambio llega como operación con su número de secuencia (la revisión
+ * del proyecto). Al reconectar se piden solo las operaciones posteriores a la
+ * última secuencia aplicada.
+ */
+
+export interface AnnotationOperation {
+  op: 'add' | 'update' | 'delete';
+  id: string;
+  seq?: number;
+  source?: string;
+  version?: number;
+  annotation?: any;
+}
+
+interface AnnotationChannelHandlers {
+  // origin: client_id de quien envió las operaciones (null si vienen de un guardado HTTP)
+  onOperations: (operations: AnnotationOperation[], seq: number, origin: string | null) => void;
+  onError?: (detail: string) => void;
+}
+
+const RECONNECT_DELAY_MS = 2000;
+
+export function connectAnnotationChannel(
+  projectId: string,
+  initialSeq: number,
+  handlers: AnnotationChannelHandlers
+) {
+  const clientId = `client_${Date.now()}_${Math.random().toString(36).slice(2, 8)}`;
+  const wsBase = API_BASE_URL.replace('http://', 'ws://').replace('https://', 'wss://');
+  let lastSeq = initialSeq;
+  let socket: WebSocket | null = null;
+  let closed = false;
+  let reconnectTimer: ReturnType<typeof setTimeout> | null = null;
+
+  const open = () => {
+    socket = new WebSocket(`${wsBase}/api/v1/annotations/ws/${projectId}?since=${lastSeq}`);
+
+    socket.onmessage = (event) => {
+      const message = JSON.parse(event.data);
+
+      if (message.type === 'ops' || message.type === 'sync') {
+        // Hueco en la secuencia: pedir lo que falta en lugar de aplicar fuera de orden
+        if (message.type === 'ops' && message.seq > lastSeq + 1) {
+          socket?.send(JSON.stringify({ type: 'sync', since: lastSeq }));
+          return;
+        }
+        // Ya aplicado: un envío retrasado o reordenado traería contenido viejo
+        if (message.seq <= lastSeq) return;
+
+        // En una respuesta de sync, solo las operaciones posteriores a lo aplicado
+        const applied = lastSeq;
+        const operations = (message.ops as AnnotationOperation[]).filter(op => op.seq === undefined || op.seq > applied);
+        lastSeq = message.seq;
+        handlers.onOperations(operations, lastSeq, message.origin ?? null);
+      } else if (message.type === 'error' && handlers.onError) {
+        handlers.onError(message.detail);
+      }
+    };
+
+    socket.onclose = () => {
+      socket = null;
+      if (!closed) {
+        reconnectTimer = setTimeout(open, RECONNECT_DELAY_MS);
+      }
+    };
+  };
+
+  open();
+
+  return {
+    clientId,
+
+    // Enviar operaciones; se aplican al recibirlas de vuelta con su secuencia
+    send(operations: AnnotationOperation[]) {
+      if (socket?.readyState !== WebSocket.OPEN) return false;
+      socket.send(JSON.stringify({ type: 'ops', client_id: clientId, ops: operations }));
+      return true;
+    },
+
+    // Secuencia aplicada tras un guardado HTTP (evita pedir de nuevo esos cambios)
+    setSeq(seq: number) {
+      lastSeq = Math.max(lastSeq, seq);
+    },
+
+    close() {
+      closed = true;
+      if (reconnectTimer) clearTimeout(reconnectTimer);
+      socket?.close();
+    }
+  };
+}
@@ -198,7 +198,8 @@ export const projectsAPI = {
     return get<Project[]>(`/api/v1/projects?${queryParams.toString()}`);
   },
 
-  getById: (projectId: string) => get<Project>(`/api/v1/projects/${projectId}`),
+  getById: (projectId: string, viewerId?: string) =>
+    get<Project>(`/api/v1/projects/${projectId}${viewerId ? `?viewer_id=${viewerId}` : ''}`),
 
   getVersions: (projectId: string) => get<{
     project_id: string;
@@ -308,6 +309,22 @@ export const subjectsAPI = {
   getByCode: (subjectCode: string) => get<Subject>(`/api/v1/subjects/${subjectCode}`),
 };
 
+// API de Palabras Clave
+export interface KeywordSuggestion {
+  keyword: string;
+  normalized: string;
+  count: number;
+}
+
+export const keywordsAPI = {
+  suggest: (query: string, limit: number = 10) =>
+    get<{
+      query: string;
+      suggestions: KeywordSuggestion[];
+      count: number;
+    }>(`/api/v1/keywords/suggest?q=${encodeURIComponent(query)}&limit=${limit}`),
+};
+
 // API de Autenticación
 export const authAPI = {
   loginWithCedula: (cedula: string, password: string) => 
@@ -345,6 +362,9 @@ export const pdfEvaluationAPI = {
   convertToPDF: (projectId: string) => 
     post(`/api/v1/pdf-evaluation/convert-to-pdf/${projectId}`, {}),
 
+  getConversionJob: (jobId: string) =>
+    get(`/api/v1/pdf-evaluation/convert-to-pdf/jobs/${jobId}`),
+
   saveAnnotations: (data: {
     project_id: string;
     annotations: Array<{
@@ -359,6 +379,7 @@ export const pdfEvaluationAPI = {
       author_name: string;
       created_at?: string;
     }>;
+    revision?: number;
   }) => post('/api/v1/pdf-evaluation/annotations/save', data),
 
   getAnnotations: (projectId: string) => 
@@ -367,8 +388,21 @@ export const pdfEvaluationAPI = {
   getPDFInfo: (projectId: string) => 
     get(`/api/v1/pdf-evaluation/pdf-info/${projectId}`),
 
-  deleteAnnotation: (annotationId: string) => 
-    fetch(`${API_BASE_URL}/api/v1/pdf-evaluation/annotations/${annotationId}`, {
+  // URL de la imagen de una página renderizada en el servidor (para equipos lentos)
+  getPageImageUrl: (projectId: string, version: number, page: number, scale = 1.5) =>
+    `${API_BASE_URL}/api/v1/pdf-evaluation/pages/${projectId}/${version}/${page}?scale=${scale}`,
+
+  snapToWords: (projectId: string, data: { page: number; rect: number[]; version?: number }) =>
+    post<{
+      success: boolean;
+      words: Array<{ index: number; text: string; rect: number[] }>;
+      rects: number[][];
+      rect: number[] | null;
+      selected_text: string;
+    }>(`/api/v1/pdf-evaluation/text-layer/${projectId}/snap`, data),
+
+  deleteAnnotation: (projectId: string, annotationId: string) => 
+    fetch(`${API_BASE_URL}/api/v1/pdf-evaluation/annotations/${projectId}/${annotationId}`, {
       method: 'DELETE'
     }).then(res => res.json()),
 };